@@ -0,0 +1,31 @@
+"""
+Standalone benchmark scripts for the backend.
+
+Run them from the ``backend`` directory as modules, e.g.::
+
+    python -m benchmarks.bench_renderers
+
+They use the regular Django settings (and so ``DATABASE_URL`` when set).
+"""
+
+import os
+import statistics
+import time
+
+
+def setup_django():
+    """Configure Django for a script running outside ``manage.py``"""
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "grocery_backend.settings")
+    django.setup()
+
+
+def measure(func, repeat=5):
+    """Run ``func`` ``repeat`` times and return the median wall time in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
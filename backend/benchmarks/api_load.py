@@ -0,0 +1,421 @@
+"""
+API load test with a realistic traffic mix and recorded baselines.
+
+Seeds a known-size synthetic dataset with ``seed_data`` scale mode (skipped
+when enough synthetic users already exist), then replays a weighted mix of
+the requests the app makes: opening a list, paging its items, toggling and
+adding items, autocomplete searches and logins. Latency percentiles and
+queries per request are reported for every scenario::
+
+    # In-process against the configured database (SQLite or DATABASE_URL)
+    python -m benchmarks.api_load --requests 2000
+
+    # Record a baseline, then fail later runs that regress beyond it
+    python -m benchmarks.api_load --save-baseline benchmarks/baselines/api_load.json
+    python -m benchmarks.api_load --baseline benchmarks/baselines/api_load.json
+
+    # Against a running server sharing the same database (latency only)
+    python -m benchmarks.api_load --url http://localhost:8000
+
+The mix mutates data (toggles and added items), so never point it at a
+database you care about.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks import setup_django
+
+PASSWORD = "password123"
+
+# Scenario name -> relative weight in the traffic mix
+MIX = {
+    "open_list": 20,
+    "page_items": 30,
+    "toggle_item": 20,
+    "add_item": 8,
+    "search_items": 12,
+    "search_users": 5,
+    "login": 5,
+}
+SEARCH_TERMS = ["s", "sy", "syn", "org", "fresh", "milk", "coffee", "chips"]
+
+
+class InProcessClient:
+    """Drive the app through Django's test client, counting queries"""
+
+    def __init__(self):
+        from django.db import connection
+        from django.test import Client
+
+        self.client = Client()
+        self.connection = connection
+
+    def request(self, method, path, token=None, data=None):
+        from django.test.utils import CaptureQueriesContext
+
+        headers = {"HTTP_AUTHORIZATION": f"Token {token}"} if token else {}
+        kwargs = {"content_type": "application/json"} if data is not None else {}
+        call = getattr(self.client, method.lower())
+        with CaptureQueriesContext(self.connection) as queries:
+            start = time.perf_counter()
+            response = call(
+                path,
+                json.dumps(data) if data is not None else None,
+                **kwargs,
+                **headers,
+            )
+            seconds = time.perf_counter() - start
+        body = json.loads(response.content) if response.content else None
+        return response.status_code, body, seconds, len(queries)
+
+
+class HTTPClient:
+    """Drive a running server over HTTP; query counts are not available"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, token=None, data=None):
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Token {token}"
+        payload = None
+        if data is not None:
+            payload = json.dumps(data).encode()
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(
+            self.base_url + path, data=payload, headers=headers, method=method
+        )
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                status, content = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, content = error.code, error.read()
+        seconds = time.perf_counter() - start
+        body = json.loads(content) if content else None
+        return status, body, seconds, None
+
+
+class VirtualUser:
+    """A synthetic user with a token and the ids of their lists and items"""
+
+    def __init__(self, username, token, list_sizes, list_items):
+        self.username = username
+        self.token = token
+        self.list_sizes = list_sizes  # {list id: item count}
+        self.lists = list(list_sizes)
+        self.list_items = list_items
+
+
+class LoadTest:
+    def __init__(self, client, users, catalog, seed=0):
+        from django.conf import settings
+
+        self.client = client
+        self.users = users
+        self.catalog = catalog
+        self.random = random.Random(seed)
+        self.results = {name: [] for name in MIX}
+        self.errors = {name: 0 for name in MIX}
+        self.page_size = settings.REST_FRAMEWORK.get("PAGE_SIZE", 20)
+
+    def run(self, requests, warmup=0):
+        names = list(MIX)
+        weights = [MIX[name] for name in names]
+        for n in range(warmup + requests):
+            name = self.random.choices(names, weights)[0]
+            status, seconds, queries = getattr(self, name)(
+                self.random.choice(self.users)
+            )
+            if n < warmup:
+                continue
+            if status >= 400:
+                self.errors[name] += 1
+            self.results[name].append((seconds, queries))
+
+    def call(self, user, method, path, data=None):
+        status, body, seconds, queries = self.client.request(
+            method, path, token=user.token, data=data
+        )
+        return status, seconds, queries
+
+    # Scenarios
+
+    def open_list(self, user):
+        return self.call(user, "GET", f"/api/grocery-lists/{self.pick(user.lists)}/")
+
+    def page_items(self, user):
+        list_id = self.pick(user.lists)
+        # Most visits stop at the first page; longer lists are paged through
+        pages = max(1, -(-user.list_sizes.get(list_id, 0) // self.page_size))
+        page = 1 if self.random.random() < 0.7 else self.random.randint(1, pages)
+        return self.call(
+            user,
+            "GET",
+            f"/api/grocery-list-items/?grocery_list={list_id}&page={page}",
+        )
+
+    def toggle_item(self, user):
+        return self.call(
+            user,
+            "POST",
+            f"/api/grocery-list-items/{self.pick(user.list_items)}/toggle_checked/",
+        )
+
+    def add_item(self, user):
+        return self.call(
+            user,
+            "POST",
+            f"/api/grocery-lists/{self.pick(user.lists)}/add_item/",
+            {"item_id": self.random.choice(self.catalog), "quantity": 1},
+        )
+
+    def search_items(self, user):
+        term = self.random.choice(SEARCH_TERMS)
+        return self.call(user, "GET", f"/api/items/?search={term}")
+
+    def search_users(self, user):
+        term = self.random.choice(self.users).username[: self.random.randint(3, 12)]
+        return self.call(user, "GET", f"/api/users/?search={term}")
+
+    def login(self, user):
+        status, body, seconds, queries = self.client.request(
+            "POST",
+            "/api/auth/login/",
+            data={"username": user.username, "password": PASSWORD},
+        )
+        return status, seconds, queries
+
+    def pick(self, ids):
+        # Lists without items still get requests, just as they do in the app
+        return self.random.choice(ids) if ids else 0
+
+    # Reporting
+
+    def summary(self):
+        scenarios = {}
+        for name, samples in self.results.items():
+            if not samples:
+                continue
+            timings = sorted(seconds * 1000 for seconds, queries in samples)
+            counts = [queries for seconds, queries in samples if queries is not None]
+            scenarios[name] = {
+                "requests": len(samples),
+                "errors": self.errors[name],
+                "p50_ms": round(percentile(timings, 50), 2),
+                "p95_ms": round(percentile(timings, 95), 2),
+                "p99_ms": round(percentile(timings, 99), 2),
+                "queries": round(sum(counts) / len(counts), 2) if counts else None,
+                "max_queries": max(counts) if counts else None,
+            }
+        return scenarios
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def compare(current, baseline, latency_threshold, query_threshold, metrics):
+    """Return a line per metric that regressed beyond its threshold"""
+    failures = []
+    for name, row in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric in metrics:
+            if row[metric] > base[metric] * (1 + latency_threshold):
+                failures.append(
+                    f"{name} {metric}: {row[metric]:.2f}ms vs baseline "
+                    f"{base[metric]:.2f}ms (+{latency_threshold:.0%} allowed)"
+                )
+        if row["queries"] is not None and base.get("queries") is not None:
+            if row["queries"] > base["queries"] + query_threshold:
+                failures.append(
+                    f"{name} queries: {row['queries']} vs baseline {base['queries']}"
+                )
+    return failures
+
+
+def ensure_dataset(args):
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    existing = User.objects.filter(username__startswith="synthetic_").count()
+    if existing >= args.users:
+        print(f"Reusing {existing} synthetic users")
+        return
+    call_command(
+        "seed_data",
+        "--users",
+        str(args.users),
+        "--lists-per-user",
+        str(args.lists_per_user),
+        "--items-per-list",
+        str(args.items_per_list),
+        "--catalog",
+        str(args.catalog),
+        "--random-seed",
+        str(args.seed),
+    )
+
+
+def virtual_users(client, count, seed, use_tokens):
+    """Pick ``count`` synthetic users and load the ids they will request"""
+    from django.contrib.auth.models import User
+    from django.db.models import Count, Q
+
+    from rest_framework.authtoken.models import Token
+
+    from grocery_list.models import GroceryList, GroceryListItem
+
+    usernames = list(
+        User.objects.filter(username__startswith="synthetic_")
+        .order_by("username")
+        .values_list("username", flat=True)
+    )
+    users = []
+    for username in random.Random(seed).sample(usernames, min(count, len(usernames))):
+        if use_tokens:
+            token = Token.objects.get_or_create(
+                user=User.objects.get(username=username)
+            )[0].key
+        else:
+            status, body, seconds, queries = client.request(
+                "POST",
+                "/api/auth/login/",
+                data={"username": username, "password": PASSWORD},
+            )
+            token = body["token"]
+        visible = Q(owner__username=username) | Q(shared_with__username=username)
+        lists = GroceryList.objects.filter(
+            id__in=GroceryList.objects.filter(visible).values("id")
+        ).annotate(size=Count("items"))
+        list_sizes = dict(lists.values_list("id", "size"))
+        list_items = list(
+            GroceryListItem.objects.filter(grocery_list__in=list_sizes).values_list(
+                "id", flat=True
+            )[:200]
+        )
+        users.append(VirtualUser(username, token, list_sizes, list_items))
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Base URL of a running server")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--lists-per-user", type=int, default=5)
+    parser.add_argument("--items-per-list", type=int, default=30)
+    parser.add_argument("--catalog", type=int, default=2000)
+    parser.add_argument("--virtual-users", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="Fail on regressions against this file")
+    parser.add_argument("--save-baseline", help="Write the results to this file")
+    parser.add_argument(
+        "--latency-threshold",
+        type=float,
+        default=0.25,
+        help="Allowed relative latency increase (default: 0.25)",
+    )
+    parser.add_argument(
+        "--query-threshold",
+        type=float,
+        default=0,
+        help="Allowed increase in mean queries per request (default: 0)",
+    )
+    parser.add_argument(
+        "--metrics",
+        nargs="+",
+        choices=["p50_ms", "p95_ms", "p99_ms"],
+        default=["p50_ms", "p95_ms"],
+        help="Latency percentiles checked against the baseline",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+
+    from grocery_list.models import Item
+
+    ensure_dataset(args)
+    client = HTTPClient(args.url) if args.url else InProcessClient()
+    users = virtual_users(client, args.virtual_users, args.seed, not args.url)
+    catalog = list(
+        Item.objects.filter(name__startswith="Synthetic ").values_list("id", flat=True)
+    )
+
+    test = LoadTest(client, users, catalog, seed=args.seed)
+    started = time.perf_counter()
+    test.run(args.requests, warmup=args.warmup)
+    elapsed = time.perf_counter() - started
+    scenarios = test.summary()
+
+    print(
+        f"\n{args.requests} requests in {elapsed:.1f}s "
+        f"({args.requests / elapsed:,.0f} req/s, {connection.vendor})\n"
+    )
+    print(
+        f"{'scenario':<14} {'n':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'queries':>8}"
+    )
+    for name, row in scenarios.items():
+        queries = "-" if row["queries"] is None else f"{row['queries']:.1f}"
+        print(
+            f"{name:<14} {row['requests']:>5} {row['errors']:>4} "
+            f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+            f"{queries:>8}"
+        )
+
+    results = {
+        "meta": {
+            "database": connection.vendor,
+            "mode": "http" if args.url else "in-process",
+            "requests": args.requests,
+            "users": args.users,
+            "lists_per_user": args.lists_per_user,
+            "items_per_list": args.items_per_list,
+            "catalog": args.catalog,
+            "seed": args.seed,
+        },
+        "scenarios": scenarios,
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"] != results["meta"]:
+            print("\nWarning: baseline was recorded with different settings")
+        failures = compare(
+            scenarios,
+            baseline["scenarios"],
+            args.latency_threshold,
+            args.query_threshold,
+            args.metrics,
+        )
+        if failures:
+            print("\nRegressions against the baseline:")
+            for line in failures:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Bytes on the wire and CPU cost of API response compression.
+
+Compresses rendered ``/api/grocery-list-items/`` payloads of several sizes
+with every codec ``APICompressionMiddleware`` can use, at its configured
+levels::
+
+    python -m benchmarks.bench_compression --sizes 20 200 2000
+"""
+
+import argparse
+
+from benchmarks import measure, setup_django
+from benchmarks.bench_renderers import build_payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 200, 2000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from grocery_list.middleware import APICompressionMiddleware
+    from grocery_list.renderers import ORJSONRenderer
+
+    codecs = APICompressionMiddleware(lambda request: None).codecs
+
+    print(
+        f"{'rows':>6} {'raw bytes':>10} {'codec':>6} {'wire bytes':>11} "
+        f"{'ratio':>6} {'ms':>8} {'MB/s':>8}"
+    )
+    for size in args.sizes:
+        body = ORJSONRenderer().render(build_payload(size))
+        for codec in codecs:
+            compressed = codec.compress(body)
+            seconds = measure(lambda: codec.compress(body), args.repeat)
+            print(
+                f"{size:>6} {len(body):>10} {codec.name:>6} {len(compressed):>11} "
+                f"{len(body) / len(compressed):>6.1f} {seconds * 1000:>8.2f} "
+                f"{len(body) / seconds / 1e6:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Catalog dedupe: scan throughput and how many planted duplicates are found.
+
+Creates ``--items`` synthetic items on the first run (kept and reused
+afterwards), spread over a few benchmark categories, with
+``--duplicate-ratio`` of them planted as near-duplicates of another item:
+changed case, extra spaces and punctuation, a plural or a one-letter typo.
+Then it runs the dedupe job over those categories and reports items
+scanned per second and duplicates found::
+
+    python -m benchmarks.bench_dedupe --items 1000000
+
+``--apply`` also merges them, so point ``DATABASE_URL`` at a throwaway
+database.
+"""
+
+import argparse
+import random
+import string
+
+from benchmarks import setup_django
+
+PREFIX = "Dedupebench"
+CATEGORIES = 20
+WORDS = [
+    "organic",
+    "fresh",
+    "whole",
+    "smoked",
+    "sliced",
+    "apple",
+    "milk",
+    "bread",
+    "chicken",
+    "rice",
+    "coffee",
+    "cheese",
+    "tomato",
+    "pepper",
+    "yogurt",
+]
+
+
+def variant(name, rng):
+    """A near-duplicate spelling of ``name``"""
+    kind = rng.randrange(4)
+    if kind == 0:
+        return name.upper()
+    if kind == 1:
+        return f" {name.replace(' ', '  ')}."
+    if kind == 2:
+        return name + "s"
+    position = rng.randrange(1, len(name) - 1)
+    return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1 :]
+
+
+def ensure_items(count, ratio, batch_size, seed=0):
+    from django.db import transaction
+
+    from grocery_list.models import Category, Item
+
+    categories = [
+        Category.objects.get_or_create(name=f"{PREFIX} {n}")[0].id
+        for n in range(CATEGORIES)
+    ]
+    existing = Item.objects.filter(category_id__in=categories).count()
+    if existing >= count:
+        print(f"Reusing {existing} items")
+        return categories
+
+    rng = random.Random(seed)
+    planted = 0
+    for start in range(existing, count, batch_size):
+        items = {}
+        for n in range(start, min(start + batch_size, count)):
+            words = rng.sample(WORDS, 3)
+            name = f"{' '.join(words).title()} {n}"
+            category = categories[n % CATEGORIES]
+            items[name, category] = Item(name=name, category_id=category)
+            if rng.random() < ratio:
+                copy = variant(name, rng)
+                items[copy, category] = Item(name=copy, category_id=category)
+                planted += 1
+        with transaction.atomic():
+            Item.objects.bulk_create(items.values(), ignore_conflicts=True)
+        print(f"  {min(start + batch_size, count)}/{count} items", end="\r")
+    print(f"Created items with {planted} planted duplicates")
+    return categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--window", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument(
+        "--apply", action="store_true", help="Merge the duplicates that are found"
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+
+    from grocery_list import dedupe
+
+    categories = ensure_items(args.items, args.duplicate_ratio, args.batch_size)
+    result = dedupe.run(
+        dry_run=not args.apply,
+        threshold=args.threshold,
+        window=args.window,
+        category_ids=categories,
+    )
+
+    rate = result.scanned / result.scan_seconds if result.scan_seconds else 0
+    print(f"{result.scanned} items on {connection.vendor}")
+    print(f"scan:  {result.scan_seconds:.1f}s ({rate:,.0f} items/sec)")
+    print(f"found: {result.merged} duplicates in {result.groups} groups")
+    if args.apply:
+        print(
+            f"merge: {result.merge_seconds:.1f}s, "
+            f"{result.repointed} list items repointed"
+        )
+
+
+if __name__ == "__main__":
+    main()
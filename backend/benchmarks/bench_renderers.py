@@ -0,0 +1,92 @@
+"""
+Compare DRF's stdlib ``JSONRenderer`` with ``ORJSONRenderer``.
+
+Renders paginated-style payloads of ``GroceryListItemSerializer`` rows (the
+same shape ``/api/grocery-list-items/`` returns) and checks that both
+renderers produce identical bytes::
+
+    python -m benchmarks.bench_renderers --sizes 1000 10000
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from benchmarks import measure, setup_django
+
+
+def build_payload(size):
+    from django.contrib.auth.models import User
+
+    from grocery_list.models import Category, GroceryList, GroceryListItem, Item
+    from grocery_list.serializers import GroceryListItemSerializer
+
+    now = datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+    alice = User(id=1, username="alice")
+    bob = User(id=2, username="bob")
+    produce = Category(id=1, name="Produce")
+    grocery_list = GroceryList(id=1, name="Weekly", owner=alice)
+
+    rows = []
+    for i in range(size):
+        item = Item(id=i, name=f"Item {i} – crème", category=produce)
+        rows.append(
+            GroceryListItem(
+                id=i,
+                grocery_list=grocery_list,
+                item=item,
+                custom_name="" if i % 3 else f"Custom {i}",
+                quantity=Decimal(i % 50) / 4,
+                unit="lb",
+                notes="Pick the ripe ones" if i % 5 == 0 else "",
+                is_checked=i % 4 == 0,
+                checked_at=now if i % 4 == 0 else None,
+                checked_by=bob if i % 4 == 0 else None,
+                added_by=alice,
+                created_at=now - timedelta(minutes=i),
+                updated_at=now,
+            )
+        )
+
+    return {
+        "count": size,
+        "next": None,
+        "previous": None,
+        "results": GroceryListItemSerializer(rows, many=True).data,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from rest_framework.renderers import JSONRenderer
+
+    from grocery_list.renderers import ORJSONRenderer, orjson
+
+    if orjson is None:
+        print("orjson is not installed; ORJSONRenderer falls back to the stdlib")
+
+    print(f"{'rows':>8} {'bytes':>10} {'stdlib ms':>10} {'orjson ms':>10} {'x':>6}")
+    for size in args.sizes:
+        payload = build_payload(size)
+        stdlib, fast = JSONRenderer(), ORJSONRenderer()
+
+        expected = stdlib.render(payload)
+        if fast.render(payload) != expected:
+            raise SystemExit(f"Renderers disagree for {size} rows")
+
+        stdlib_time = measure(lambda: stdlib.render(payload), args.repeat)
+        fast_time = measure(lambda: fast.render(payload), args.repeat)
+        print(
+            f"{size:>8} {len(expected):>10} {stdlib_time * 1000:>10.2f} "
+            f"{fast_time * 1000:>10.2f} {stdlib_time / fast_time:>6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Per-row cost of the list serializers: ModelSerializer vs values serializer.
+
+Creates a temporary list with ``--rows`` items inside a transaction that is
+rolled back afterwards, then times the query plus serialization for both
+read paths::
+
+    python -m benchmarks.bench_serializers --rows 1000 5000
+"""
+
+import argparse
+
+from benchmarks import measure, setup_django
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_rows(count):
+    from django.contrib.auth.models import User
+
+    from grocery_list.models import Category, GroceryList, GroceryListItem, Item
+
+    owner = User.objects.create(username="bench_serializers_owner")
+    category = Category.objects.create(name="bench_serializers")
+    items = Item.objects.bulk_create(
+        Item(name=f"bench item {i}", category=category) for i in range(count)
+    )
+    grocery_list = GroceryList.objects.create(name="bench", owner=owner)
+    GroceryListItem.objects.bulk_create(
+        GroceryListItem(
+            grocery_list=grocery_list,
+            item=item,
+            unit="piece",
+            quantity=i % 7 + 0.5,
+            is_checked=i % 3 == 0,
+            checked_by=owner if i % 3 == 0 else None,
+            added_by=owner,
+        )
+        for i, item in enumerate(items)
+    )
+    return grocery_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import transaction
+
+    from grocery_list.models import GroceryListItem
+    from grocery_list.serializers import (
+        GroceryListItemSerializer,
+        GroceryListItemValuesSerializer,
+    )
+
+    print(f"{'rows':>8} {'model us/row':>13} {'values us/row':>14} {'x':>6}")
+    for count in args.rows:
+        try:
+            with transaction.atomic():
+                grocery_list = create_rows(count)
+                queryset = GroceryListItem.objects.filter(
+                    grocery_list=grocery_list
+                ).select_related("item__category", "added_by", "checked_by")
+
+                def model_path():
+                    return GroceryListItemSerializer(queryset.all(), many=True).data
+
+                def values_path():
+                    rows = GroceryListItemValuesSerializer.get_values(queryset)
+                    return GroceryListItemValuesSerializer(rows, many=True).data
+
+                if model_path() != values_path():
+                    raise SystemExit("Serializers disagree")
+
+                model_time = measure(model_path, args.repeat)
+                values_time = measure(values_path, args.repeat)
+                print(
+                    f"{count:>8} {model_time / count * 1e6:>13.1f} "
+                    f"{values_time / count * 1e6:>14.1f} "
+                    f"{model_time / values_time:>6.1f}"
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+
+if __name__ == "__main__":
+    main()
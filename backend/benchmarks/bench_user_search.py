@@ -0,0 +1,113 @@
+"""
+Share dialog user search: the old ``icontains`` scan vs the search index.
+
+Creates ``--users`` synthetic users on the first run (kept and reused
+afterwards, like the load test dataset) and times the first page of results
+for exact, prefix, substring and missing terms with both queries::
+
+    python -m benchmarks.bench_user_search --users 1000000
+
+Run it against PostgreSQL (``DATABASE_URL``) to measure the trigram and
+pattern indexes; SQLite has neither, so there it only shows the ranking
+overhead.
+"""
+
+import argparse
+
+from benchmarks import measure, setup_django
+
+PREFIX = "usersearch"
+
+
+def ensure_users(count, batch_size):
+    from django.contrib.auth.models import User
+
+    from grocery_list.seeding import SyntheticDataGenerator
+
+    existing = User.objects.filter(username__startswith=f"{PREFIX}_").count()
+    if existing >= count:
+        print(f"Reusing {existing} users")
+        return
+    generator = SyntheticDataGenerator(
+        users=count,
+        lists_per_user=1,
+        items_per_list=1,
+        catalog=0,
+        batch_size=batch_size,
+        prefix=PREFIX,
+    )
+    generator.password = "!"  # unusable; these users never log in
+    for start in range(existing, count, batch_size):
+        generator.create_users(start, min(batch_size, count - start))
+        print(f"  {min(start + batch_size, count)}/{count} users", end="\r")
+    print(f"Created {count - existing} users")
+
+
+def legacy_search(queryset, term):
+    from django.db.models import Q
+
+    return queryset.filter(
+        Q(username__icontains=term)
+        | Q(first_name__icontains=term)
+        | Q(last_name__icontains=term)
+    ).order_by("username")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--explain", action="store_true", help="Print the plan of each search query"
+    )
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from grocery_list import user_search
+
+    ensure_users(args.users, args.batch_size)
+
+    middle = args.users // 2
+    terms = {
+        "exact": f"{PREFIX}_{middle:07d}",
+        "prefix": f"{PREFIX}_{middle:07d}"[:-2],
+        "short prefix": PREFIX[:2],
+        "substring": f"{middle + 4321:07d}"[-5:],
+        "no match": "zzqx",
+    }
+    base = User.objects.filter(is_active=True)
+
+    print(f"{args.users} users on {connection.vendor}")
+    print(
+        f"{'term':<14} {'icontains ms':>13} {'index ms':>9} {'x':>7} "
+        f"{'queries':>8}  top result"
+    )
+    for label, term in terms.items():
+        legacy = legacy_search(base, term)[:10]
+        legacy_time = measure(lambda: list(legacy.all()), args.repeat)
+        indexed_time = measure(lambda: user_search.search(base, term), args.repeat)
+        with CaptureQueriesContext(connection) as queries:
+            users = user_search.search(base, term)
+        print(
+            f"{label:<14} {legacy_time * 1000:>13.2f} {indexed_time * 1000:>9.2f} "
+            f"{legacy_time / indexed_time:>7.1f} {len(queries):>8}  "
+            f"{users[0].username if users else '-'}"
+        )
+        if args.explain:
+            with connection.cursor() as cursor:
+                for query in queries:
+                    cursor.execute(
+                        f"{connection.ops.explain_query_prefix()} {query['sql']}"
+                    )
+                    for row in cursor.fetchall():
+                        print("    " + " ".join(map(str, row)))
+
+
+if __name__ == "__main__":
+    main()
@@ -55,6 +55,11 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    "grocery_list.middleware.MetricsMiddleware",
+    "grocery_list.middleware.PerformanceMiddleware",
+    "grocery_list.slow_queries.SlowQueryMiddleware",
+    "grocery_list.middleware.APICompressionMiddleware",
+    "grocery_list.profiling.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -102,6 +107,19 @@ else:
     }
 
 
+# Caches
+# "local" lives in each process, for large values that are checked against
+# the database before use (the catalog snapshot)
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -164,6 +182,16 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ],
+    # orjson-backed JSON; both fall back to the stdlib when orjson is missing
+    "DEFAULT_RENDERER_CLASSES": [
+        "grocery_list.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "grocery_list.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
         "rest_framework.filters.SearchFilter",
@@ -173,6 +201,44 @@ REST_FRAMEWORK = {
     "PAGE_SIZE": 20,
 }
 
+# Compression of API responses (static files are compressed by WhiteNoise)
+API_COMPRESSION_MIN_SIZE = int(os.environ.get("API_COMPRESSION_MIN_SIZE", 1024))
+API_COMPRESSION_ENCODINGS = ["zstd", "br", "gzip"]
+
+# Per-request timing: Server-Timing headers and grocery_list.perf log lines.
+# Every request is sampled in development, 1% otherwise
+PERF_SAMPLE_RATE = float(os.environ.get("PERF_SAMPLE_RATE", 1.0 if DEBUG else 0.01))
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", 500))
+
+# Slow query log (off unless SLOW_QUERY_LOG_MS is set); see
+# grocery_list/slow_queries.py and `manage.py slow_queries`
+if os.environ.get("SLOW_QUERY_LOG_MS"):
+    SLOW_QUERY_LOG_MS = float(os.environ["SLOW_QUERY_LOG_MS"])
+    SLOW_QUERY_ANALYZE_RATE = float(os.environ.get("SLOW_QUERY_ANALYZE_RATE", 0))
+
+# Request profiling (off unless PROFILING_DIR is set); see
+# grocery_list/profiling.py and `manage.py profiling_report`
+if os.environ.get("PROFILING_DIR"):
+    PROFILING_DIR = os.environ["PROFILING_DIR"]
+    PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", 0))
+    PROFILING_MODE = os.environ.get("PROFILING_MODE", "sample")
+
+# Prometheus scrapes of /metrics must send "Authorization: Bearer <token>";
+# without a token the endpoint is only served while DEBUG is on
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "grocery_list": {
+            "handlers": ["console"],
+            "level": os.environ.get("GROCERY_LOG_LEVEL", "WARNING"),
+        },
+    },
+}
+
 # CORS settings for frontend connection
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:4200",  # Angular dev server
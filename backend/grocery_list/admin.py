@@ -1 +1,61 @@
-# Register your models here.
+from django.contrib import admin
+
+from .models import (
+    ArchivedGroceryList,
+    Category,
+    GroceryList,
+    GroceryListItem,
+    Item,
+    Task,
+)
+
+# The __str__ of items, lists and list items reads their category, owner or
+# item, so every changelist joins those instead of loading them per row, and
+# foreign keys use raw id inputs rather than rendering every choice.
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ["name", "updated_at"]
+    search_fields = ["name"]
+
+
+@admin.register(Item)
+class ItemAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "default_unit", "barcode"]
+    list_select_related = ["category"]
+    list_filter = ["category"]
+    search_fields = ["name", "barcode"]
+    raw_id_fields = ["category"]
+
+
+@admin.register(GroceryList)
+class GroceryListAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "is_active", "updated_at"]
+    list_select_related = ["owner"]
+    list_filter = ["is_active"]
+    search_fields = ["name", "owner__username"]
+    raw_id_fields = ["owner", "shared_with"]
+
+
+@admin.register(GroceryListItem)
+class GroceryListItemAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "grocery_list", "is_checked", "checked_by"]
+    list_select_related = ["item", "grocery_list__owner", "checked_by"]
+    list_filter = ["is_checked"]
+    raw_id_fields = ["grocery_list", "item", "added_by", "checked_by"]
+
+
+@admin.register(ArchivedGroceryList)
+class ArchivedGroceryListAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "is_active", "updated_at", "archived_at"]
+    list_select_related = ["owner"]
+    search_fields = ["name", "owner__username"]
+    raw_id_fields = ["owner", "shared_with"]
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "attempts", "run_at", "finished_at"]
+    list_filter = ["status", "name"]
+    search_fields = ["idempotency_key"]
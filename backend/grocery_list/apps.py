@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class GroceryListConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "grocery_list"
+
+    def ready(self):
+        from . import catalog, slow_queries, user_search
+        from .models import Category, Item
+
+        # Let this process see its own catalog writes without waiting for
+        # the next version check
+        for model in (Category, Item):
+            post_save.connect(catalog.catalog_changed, sender=model)
+            post_delete.connect(catalog.catalog_changed, sender=model)
+        post_migrate.connect(catalog.create_version, sender=self)
+
+        # Keep the normalized user search columns current
+        post_save.connect(user_search.user_saved, sender=get_user_model())
+
+        # Opt-in slow query log on every database connection
+        if slow_queries.enabled():
+            connection_created.connect(slow_queries.install)
@@ -0,0 +1,239 @@
+"""
+Move old grocery lists out of the live tables.
+
+A list is stale when neither it nor any of its items has been updated for
+``days`` days, or ``inactive_days`` days once it is marked inactive.
+``archive_stale`` moves stale lists, in batches of ``batch_size`` lists per
+transaction, into ``ArchivedGroceryList`` and ``ArchivedGroceryListItem``:
+one ``INSERT ... SELECT`` per table copies the rows (ids included) and a
+plain ``DELETE`` removes the originals, so no model instances are built and
+no cascade collector runs. The live tables, and every query the app makes
+on them, then only hold lists that are in use; archived ones are read
+through ``?archived=1`` and can be moved back with ``restore``.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import (
+    ArchivedGroceryList,
+    ArchivedGroceryListItem,
+    GroceryList,
+    GroceryListItem,
+)
+
+DEFAULT_DAYS = 365
+DEFAULT_INACTIVE_DAYS = 30
+
+
+@dataclass
+class ArchiveResult:
+    lists: int = 0
+    items: int = 0
+    seconds: float = 0.0
+
+
+def stale_lists(days=DEFAULT_DAYS, inactive_days=DEFAULT_INACTIVE_DAYS, now=None):
+    """Live lists that are due to be archived, oldest id first"""
+    now = now or timezone.now()
+
+    def idle_since(cutoff):
+        recent_items = GroceryListItem.objects.filter(
+            grocery_list=OuterRef("pk"), updated_at__gte=cutoff
+        )
+        return Q(updated_at__lt=cutoff) & ~Exists(recent_items)
+
+    return GroceryList.objects.filter(
+        idle_since(now - timedelta(days=days))
+        | Q(is_active=False) & idle_since(now - timedelta(days=inactive_days))
+    ).order_by("id")
+
+
+def _copy(cursor, source, target, columns, key, ids, extra=(), where=None):
+    """
+    ``INSERT INTO target SELECT ... FROM source WHERE key IN ids``;
+    ``columns`` are ``(target, source)`` column pairs, ``extra`` adds
+    ``(target column, value)`` constants and ``where`` another condition.
+    Returns the rows copied.
+    """
+    quote = connection.ops.quote_name
+    targets = [quote(target_column) for target_column, _ in columns]
+    sources = [quote(source_column) for _, source_column in columns]
+    targets += [quote(target_column) for target_column, _ in extra]
+    sources += ["%s"] * len(extra)
+    placeholders = ", ".join(["%s"] * len(ids))
+    condition = f" AND {where}" if where else ""
+    cursor.execute(
+        f"INSERT INTO {quote(target)} ({', '.join(targets)}) "
+        f"SELECT {', '.join(sources)} FROM {quote(source)} "
+        f"WHERE {quote(key)} IN ({placeholders}){condition}",
+        [value for _, value in extra] + list(ids),
+    )
+    return cursor.rowcount
+
+
+def _delete(cursor, table, key, ids):
+    quote = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(ids))
+    cursor.execute(
+        f"DELETE FROM {quote(table)} WHERE {quote(key)} IN ({placeholders})",
+        list(ids),
+    )
+
+
+def _archived_columns(model):
+    """Columns the live and archive tables share: all but ``deleted_at``"""
+    return [
+        field.column
+        for field in model._meta.concrete_fields
+        if field.name != "deleted_at"
+    ]
+
+
+def _move(ids, source, target, extra=()):
+    """
+    Copy the lists ``ids`` with their shares and items from the ``source``
+    to the ``target`` ``(list model, item model)`` pair, then delete them
+    from ``source``. Returns the number of items moved.
+    """
+    source_list, source_item = source
+    target_list, target_item = target
+    list_columns = _archived_columns(GroceryList)
+    item_columns = _archived_columns(GroceryListItem)
+    source_shares = source_list.shared_with.field
+    target_shares = target_list.shared_with.field
+    share_columns = [
+        (target_shares.m2m_column_name(), source_shares.m2m_column_name()),
+        (target_shares.m2m_reverse_name(), source_shares.m2m_reverse_name()),
+    ]
+    item_key = source_item._meta.get_field("grocery_list").column
+
+    if connection.features.has_select_for_update:
+        # Hold the items still until they are deleted, so that no update
+        # made after the copy is lost; new items wait on the list lock
+        list(
+            source_item._base_manager.filter(grocery_list_id__in=ids)
+            .select_for_update()
+            .order_by()
+            .values_list("id")
+        )
+
+    with connection.cursor() as cursor:
+        _copy(
+            cursor,
+            source_list._meta.db_table,
+            target_list._meta.db_table,
+            [(column, column) for column in list_columns],
+            "id",
+            ids,
+            extra,
+        )
+        _copy(
+            cursor,
+            source_shares.m2m_db_table(),
+            target_shares.m2m_db_table(),
+            share_columns,
+            source_shares.m2m_column_name(),
+            ids,
+        )
+        items = _copy(
+            cursor,
+            source_item._meta.db_table,
+            target_item._meta.db_table,
+            [(column, column) for column in item_columns],
+            item_key,
+            ids,
+            # Soft-deleted items are dropped rather than archived
+            where="deleted_at IS NULL" if source_item is GroceryListItem else None,
+        )
+        _delete(cursor, source_item._meta.db_table, item_key, ids)
+        _delete(
+            cursor, source_shares.m2m_db_table(), source_shares.m2m_column_name(), ids
+        )
+        _delete(cursor, source_list._meta.db_table, "id", ids)
+    return items
+
+
+@transaction.atomic
+def archive(list_ids, lists=None):
+    """
+    Archive the live lists ``list_ids`` that are also in ``lists`` (any
+    list by default); returns the ``(lists, items)`` moved
+    """
+    if lists is None:
+        lists = GroceryList.objects.all()
+    ids = list(
+        lists.filter(pk__in=list_ids)
+        .select_for_update()
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    if not ids:
+        return 0, 0
+    items = _move(
+        ids,
+        (GroceryList, GroceryListItem),
+        (ArchivedGroceryList, ArchivedGroceryListItem),
+        extra=[("archived_at", timezone.now())],
+    )
+    return len(ids), items
+
+
+@transaction.atomic
+def restore(list_ids):
+    """Move archived lists back to the live tables; returns ``(lists, items)``"""
+    ids = list(
+        ArchivedGroceryList.objects.filter(pk__in=list_ids)
+        .select_for_update()
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    if not ids:
+        return 0, 0
+    items = _move(
+        ids,
+        (ArchivedGroceryList, ArchivedGroceryListItem),
+        (GroceryList, GroceryListItem),
+    )
+    # Counts as use, so the next archive run does not take them straight back
+    GroceryList.objects.filter(pk__in=ids).update(updated_at=timezone.now())
+    return len(ids), items
+
+
+def archive_stale(
+    days=DEFAULT_DAYS,
+    inactive_days=DEFAULT_INACTIVE_DAYS,
+    batch_size=500,
+    dry_run=False,
+):
+    """Archive every stale list, ``batch_size`` lists per transaction"""
+    result = ArchiveResult()
+    started = time.perf_counter()
+    candidates = stale_lists(days, inactive_days)
+    if dry_run:
+        result.lists = candidates.count()
+        result.items = GroceryListItem.objects.filter(
+            grocery_list__in=candidates.values("pk")
+        ).count()
+    else:
+        last_id = 0
+        while True:
+            batch = list(
+                candidates.filter(id__gt=last_id).values_list("id", flat=True)[
+                    :batch_size
+                ]
+            )
+            if not batch:
+                break
+            # Checked again under lock: a list may be used or deleted since
+            lists, items = archive(batch, candidates)
+            result.lists += lists
+            result.items += items
+            last_id = batch[-1]
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,193 @@
+"""
+Pre-rendered snapshot of the item catalog.
+
+The snapshot is a single compact JSON document holding every ``Category`` and
+``Item`` so that clients can run autocomplete locally. It is rendered once per
+process and kept in the process-local cache together with its gzip/brotli
+variants and a content hash.
+
+Database triggers bump ``CatalogVersion`` and log the touched row in
+``CatalogChange`` inside every transaction that writes the catalog, whichever
+process or code path made the write. A lookup serves the cached snapshot
+without any query while its version was confirmed within the last
+``VERSION_CHECK_INTERVAL`` seconds; after that it reads the version (one
+primary key lookup) and, when it moved, re-reads only the logged rows and
+patches them into the cached rows before re-rendering. Commits in this
+process expire the check at once, so the writer sees its own change.
+"""
+
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from django.apps import apps as global_apps
+from django.core.cache import caches
+from django.db import transaction
+
+from .metrics import record_cache_lookup
+from .models import CatalogChange, CatalogVersion, Category, Item
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+SNAPSHOT_CACHE_KEY = "grocery_list:catalog:snapshot"
+ROWS_CACHE_KEY = "grocery_list:catalog:rows"
+CHECKED_CACHE_KEY = "grocery_list:catalog:checked"
+# Bounds how long a process holds on to a snapshot it no longer serves
+SNAPSHOT_TIMEOUT = 3600
+# How stale another process's write may look here, in seconds
+VERSION_CHECK_INTERVAL = 1
+# Past this many changes a full reload is cheaper than patching
+INCREMENTAL_LIMIT = 500
+
+CATEGORY_FIELDS = ["id", "name"]
+ITEM_FIELDS = ["id", "name", "category", "default_unit", "barcode"]
+ITEM_COLUMNS = ["id", "name", "category_id", "default_unit", "barcode"]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    body: bytes
+    gzip_body: bytes
+    brotli_body: Optional[bytes]
+    version: str
+
+    @property
+    def etag(self):
+        return f'"{self.version}"'
+
+    def variant(self, accept_encoding):
+        """Return ``(body, content_encoding)`` for an Accept-Encoding header"""
+        accepted = {
+            token.split(";")[0].strip().lower()
+            for token in (accept_encoding or "").split(",")
+        }
+        if self.brotli_body is not None and "br" in accepted:
+            return self.brotli_body, "br"
+        if "gzip" in accepted:
+            return self.gzip_body, "gzip"
+        return self.body, None
+
+
+def load_rows():
+    """Read the catalog rows from the database"""
+    return {
+        "categories": {
+            row[0]: list(row)
+            for row in Category.objects.order_by().values_list(*CATEGORY_FIELDS)
+        },
+        "items": {
+            row[0]: list(row)
+            for row in Item.objects.order_by().values_list(*ITEM_COLUMNS)
+        },
+    }
+
+
+def render_snapshot(rows):
+    """Render catalog rows into a compressed, content-hashed snapshot"""
+    document = {
+        "category_fields": CATEGORY_FIELDS,
+        "categories": [rows["categories"][pk] for pk in sorted(rows["categories"])],
+        "item_fields": ITEM_FIELDS,
+        "items": [rows["items"][pk] for pk in sorted(rows["items"])],
+    }
+    body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode()
+    return CatalogSnapshot(
+        body=body,
+        # mtime=0 keeps the compressed bytes stable for identical content
+        gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+        brotli_body=brotli.compress(body) if brotli is not None else None,
+        version=hashlib.sha256(body).hexdigest()[:32],
+    )
+
+
+def current_version():
+    """The catalog version"""
+    return CatalogVersion.objects.values_list("version", flat=True).get(pk=1)
+
+
+def apply_changes(rows, since, version):
+    """
+    Bring ``rows`` loaded at version ``since`` up to ``version`` by re-reading
+    the rows logged in between. Returns None when the log no longer covers
+    the gap or it is too long to be worth patching.
+    """
+    if since == version:
+        return rows
+    changes = list(
+        CatalogChange.objects.filter(version__gt=since)
+        .order_by("version")
+        .values_list("version", "kind", "row_id")[: INCREMENTAL_LIMIT + 1]
+    )
+    if not changes or changes[0][0] != since + 1 or len(changes) > INCREMENTAL_LIMIT:
+        return None
+
+    changed = {"categories": set(), "items": set()}
+    for _, kind, row_id in changes:
+        changed[kind].add(row_id)
+    for section, model, columns in (
+        ("categories", Category, CATEGORY_FIELDS),
+        ("items", Item, ITEM_COLUMNS),
+    ):
+        ids = changed[section]
+        if not ids:
+            continue
+        # Deleted rows are simply not read back
+        for pk in ids:
+            rows[section].pop(pk, None)
+        for row in model.objects.filter(pk__in=ids).order_by().values_list(*columns):
+            rows[section][row[0]] = list(row)
+    return rows
+
+
+def get_snapshot():
+    """Return the current snapshot, rendering it only when it is stale"""
+    cache = caches["local"]
+    cached = cache.get(SNAPSHOT_CACHE_KEY)
+    checked = cache.get(CHECKED_CACHE_KEY)
+    if cached is not None and checked is not None and cached[0] == checked:
+        record_cache_lookup("catalog_snapshot", True)
+        return cached[1]
+
+    version = current_version()
+    cache.set(CHECKED_CACHE_KEY, version, VERSION_CHECK_INTERVAL)
+    hit = cached is not None and cached[0] == version
+    record_cache_lookup("catalog_snapshot", hit)
+    if hit:
+        return cached[1]
+
+    # The version is read before the rows, so a write landing in between
+    # is patched in again on the next check rather than missed
+    stored = cache.get(ROWS_CACHE_KEY)
+    rows = apply_changes(stored[1], stored[0], version) if stored else None
+    record_cache_lookup("catalog_rows", rows is not None)
+    if rows is None:
+        rows = load_rows()
+    cache.set(ROWS_CACHE_KEY, (version, rows), SNAPSHOT_TIMEOUT)
+
+    snapshot = render_snapshot(rows)
+    cache.set(SNAPSHOT_CACHE_KEY, (version, snapshot), SNAPSHOT_TIMEOUT)
+    return snapshot
+
+
+def expire_check():
+    """Make this process check the catalog version on its next lookup"""
+    caches["local"].delete(CHECKED_CACHE_KEY)
+
+
+def create_version(sender, apps=global_apps, using="default", **kwargs):
+    """Recreate the counter row after a flush (``post_migrate``)"""
+    try:
+        model = apps.get_model("grocery_list", "CatalogVersion")
+    except LookupError:  # migrated back past 0012
+        return
+    model.objects.using(using).get_or_create(pk=1)
+
+
+def catalog_changed(sender, **kwargs):
+    # Rolled back writes leave the version alone, so there is nothing to check
+    transaction.on_commit(expire_check)
@@ -0,0 +1,225 @@
+"""
+Bulk import and export of the item catalog as CSV or JSON Lines.
+
+Both directions stream: imports read the input line by line and upsert it in
+chunks of ``batch_size`` rows, exports iterate the items with a database
+cursor and yield encoded chunks, so memory use does not grow with the file.
+
+Every record names an item and its category by name, with the columns in
+``FIELDS``. Items are upserted on their ``(name, category)`` unique key with
+``bulk_create(update_conflicts=True)``, so re-importing a file updates units,
+barcodes and descriptions in place. Category names are resolved through an
+in-memory map loaded once per import, and unknown categories are created as
+they first appear; the insert reports back the rows it created, so a
+category another import created first is not counted. Each chunk commits
+on its own: an interrupted import keeps the chunks before it, and running
+it again is safe.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import List
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .catalog import expire_check
+from .models import Category, Item
+
+FORMATS = ("csv", "jsonl")
+FIELDS = ["name", "category", "default_unit", "barcode", "description"]
+UPDATE_FIELDS = ["default_unit", "barcode", "description", "updated_at"]
+MAX_ERRORS = 100
+
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+FORMAT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/jsonlines": "jsonl",
+}
+
+NAME_LENGTH = Item._meta.get_field("name").max_length
+CATEGORY_LENGTH = Category._meta.get_field("name").max_length
+UNIT_LENGTH = Item._meta.get_field("default_unit").max_length
+BARCODE_LENGTH = Item._meta.get_field("barcode").max_length
+DEFAULT_UNIT = Item._meta.get_field("default_unit").default
+
+
+@dataclass
+class ImportResult:
+    """Counts for an import, and the first ``MAX_ERRORS`` rejected lines"""
+
+    imported: int = 0
+    skipped: int = 0
+    categories_created: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def reject(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+
+def format_for_path(path):
+    """Guess the format from a file name, defaulting to CSV"""
+    return "jsonl" if str(path).lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def decode_lines(lines):
+    """Decode an iterable of UTF-8 byte lines, dropping a leading BOM"""
+    for number, line in enumerate(lines):
+        text = line.decode("utf-8", errors="replace")
+        yield text.lstrip("\ufeff") if number == 0 else text
+
+
+def read_csv(lines):
+    """Yield ``(line number, record)`` for a CSV file with a header row"""
+    reader = csv.DictReader(lines)
+    for record in reader:
+        yield reader.line_num, record
+
+
+def read_jsonl(lines):
+    """Yield ``(line number, record)``; records that are not objects are None"""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield number, record if isinstance(record, dict) else None
+
+
+def read_records(lines, format):
+    if format not in FORMATS:
+        raise ValueError(f"Unknown catalog format {format!r}")
+    return read_csv(lines) if format == "csv" else read_jsonl(lines)
+
+
+def clean(record):
+    """Return the record's values by field name, or raise ValueError"""
+    if record is None:
+        raise ValueError("Not a JSON object")
+    values = {
+        name: "" if record.get(name) is None else str(record[name]).strip()
+        for name in FIELDS
+    }
+    if not values["name"]:
+        raise ValueError("Missing name")
+    if not values["category"]:
+        raise ValueError("Missing category")
+    for name, limit in (
+        ("name", NAME_LENGTH),
+        ("category", CATEGORY_LENGTH),
+        ("default_unit", UNIT_LENGTH),
+        ("barcode", BARCODE_LENGTH),
+    ):
+        if len(values[name]) > limit:
+            raise ValueError(f"{name} is longer than {limit} characters")
+    return values
+
+
+def import_catalog(lines, format="csv", batch_size=1000):
+    """Upsert the items in ``lines`` (an iterable of text lines)"""
+    result = ImportResult()
+    categories = dict(Category.objects.values_list("name", "id"))
+    chunk = []
+    for line, record in read_records(lines, format):
+        try:
+            chunk.append(clean(record))
+        except ValueError as error:
+            result.reject(line, str(error))
+            continue
+        if len(chunk) >= batch_size:
+            _upsert(chunk, categories, result)
+            chunk = []
+    if chunk:
+        _upsert(chunk, categories, result)
+    return result
+
+
+@transaction.atomic
+def _upsert(chunk, categories, result):
+    new_names = {values["category"] for values in chunk} - categories.keys()
+    if new_names:
+        created = _create_categories(sorted(new_names))
+        categories.update(created)
+        result.categories_created += len(created)
+        if len(created) < len(new_names):
+            # Created meanwhile by someone else
+            categories.update(
+                Category.objects.filter(
+                    name__in=new_names - created.keys()
+                ).values_list("name", "id")
+            )
+
+    # One statement cannot upsert the same key twice, so the last row wins
+    items = {}
+    for values in chunk:
+        category_id = categories[values["category"]]
+        items[values["name"], category_id] = Item(
+            name=values["name"],
+            category_id=category_id,
+            default_unit=values["default_unit"] or DEFAULT_UNIT,
+            barcode=values["barcode"] or None,
+            description=values["description"],
+        )
+    Item.objects.bulk_create(
+        list(items.values()),
+        update_conflicts=True,
+        unique_fields=["name", "category"],
+        update_fields=UPDATE_FIELDS,
+    )
+    # bulk_create sends no signals; let this process see the import at once
+    transaction.on_commit(expire_check)
+    result.imported += len(chunk)
+
+
+def _create_categories(names):
+    """Insert the categories that do not exist yet; ``{name: id}`` of those"""
+    quote = connection.ops.quote_name
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {quote(Category._meta.db_table)} "
+            f"(name, description, created_at, updated_at) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(names))} "
+            f"ON CONFLICT (name) DO NOTHING RETURNING name, id",
+            [value for name in names for value in (name, "", now, now)],
+        )
+        return dict(cursor.fetchall())
+
+
+def export_catalog(format="csv", chunk_size=2000):
+    """Yield the catalog as encoded chunks of ``chunk_size`` items"""
+    if format not in FORMATS:
+        raise ValueError(f"Unknown catalog format {format!r}")
+    rows = (
+        Item.objects.order_by("id")
+        .values_list("name", "category__name", "default_unit", "barcode", "description")
+        .iterator(chunk_size=chunk_size)
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if format == "csv":
+        writer.writerow(FIELDS)
+    while True:
+        batch = list(islice(rows, chunk_size))
+        if not batch:
+            break
+        if format == "csv":
+            writer.writerows(batch)
+        else:
+            for row in batch:
+                buffer.write(json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
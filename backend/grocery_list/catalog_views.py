@@ -0,0 +1,83 @@
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from . import catalog_io
+from .catalog import get_snapshot
+
+# A request pinned to the current content hash (?v=<version>) can be cached
+# forever; the bare URL has to be revalidated with the ETag every time.
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+
+@api_view(["GET"])
+def snapshot(request):
+    catalog = get_snapshot()
+
+    if request.query_params.get("v") == catalog.version:
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = REVALIDATE_CACHE_CONTROL
+
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if catalog.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        response = HttpResponseNotModified()
+    else:
+        body, encoding = catalog.variant(request.META.get("HTTP_ACCEPT_ENCODING"))
+        response = HttpResponse(body, content_type="application/json")
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+    response["ETag"] = catalog.etag
+    response["Cache-Control"] = cache_control
+    response["X-Catalog-Version"] = catalog.version
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def import_items(request):
+    """Upsert items from a CSV or JSON Lines request body, read as it streams"""
+    content_type = request.content_type.split(";")[0].strip().lower()
+    format = catalog_io.FORMAT_CONTENT_TYPES.get(content_type)
+    if format is None:
+        return Response(
+            {"error": "Send text/csv or application/x-ndjson"},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+
+    # request.stream is the raw body; request.data would read it all at once
+    lines = catalog_io.decode_lines(request.stream or [])
+    result = catalog_io.import_catalog(lines, format)
+    return Response(
+        {
+            "imported": result.imported,
+            "skipped": result.skipped,
+            "categories_created": result.categories_created,
+            "errors": result.errors,
+        }
+    )
+
+
+@api_view(["GET"])
+def export_items(request):
+    """Stream the catalog as ``?output=csv`` (default) or ``?output=jsonl``"""
+    format = request.query_params.get("output", "csv")
+    if format not in catalog_io.FORMATS:
+        return Response(
+            {"error": f"output must be one of {', '.join(catalog_io.FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    response = StreamingHttpResponse(
+        catalog_io.export_catalog(format),
+        content_type=catalog_io.CONTENT_TYPES[format],
+    )
+    response["Content-Disposition"] = f'attachment; filename="catalog.{format}"'
+    return response
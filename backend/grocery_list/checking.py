@@ -0,0 +1,101 @@
+"""
+Toggle a list item's checked state in one statement.
+
+``toggle_checked`` flips ``is_checked`` and sets or clears ``checked_by``
+and ``checked_at`` with a single conditional ``UPDATE``. The access check is
+part of its ``WHERE`` clause and the new state comes back with ``RETURNING``,
+so the row is never read first: two shoppers toggling the same item at once
+are serialized by the row lock and each flip is applied, none is lost.
+Backends without ``UPDATE ... RETURNING`` lock the row, read it and update
+only the changed columns instead.
+"""
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import GroceryList, GroceryListItem
+
+Shares = GroceryList.shared_with.through
+
+
+def can_return():
+    if connection.vendor == "postgresql":
+        return True
+    return (
+        connection.vendor == "sqlite"
+        and connection.Database.sqlite_version_info >= (3, 35)
+    )
+
+
+def toggle_checked(item_id, user):
+    """
+    Flip the item's checked state for ``user``. Returns the changed fields,
+    or None if the item does not exist or is on a list ``user`` cannot see.
+    """
+    now = timezone.now()
+    if can_return():
+        is_checked = _toggle_returning(item_id, user.id, now)
+    else:
+        is_checked = _toggle_locked(item_id, user.id, now)
+    if is_checked is None:
+        return None
+    return {
+        "id": item_id,
+        "is_checked": is_checked,
+        "checked_by": user.id if is_checked else None,
+        "checked_by_username": user.username if is_checked else None,
+        "checked_at": now if is_checked else None,
+        "updated_at": now,
+    }
+
+
+def _toggle_returning(item_id, user_id, now):
+    quote = connection.ops.quote_name
+    items = quote(GroceryListItem._meta.db_table)
+    lists = quote(GroceryList._meta.db_table)
+    shares = quote(Shares._meta.db_table)
+    # SET expressions all see the row as it was before the update
+    sql = f"""
+        UPDATE {items} SET
+            is_checked = NOT is_checked,
+            checked_by_id = CASE WHEN is_checked THEN NULL ELSE %s END,
+            checked_at = CASE WHEN is_checked THEN NULL ELSE %s END,
+            updated_at = %s
+        WHERE id = %s AND deleted_at IS NULL AND grocery_list_id IN (
+            SELECT id FROM {lists} WHERE deleted_at IS NULL AND (
+                owner_id = %s
+                OR id IN (SELECT grocerylist_id FROM {shares} WHERE user_id = %s)
+            )
+        )
+        RETURNING is_checked
+    """
+    stamp = connection.ops.adapt_datetimefield_value(now)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, stamp, stamp, item_id, user_id, user_id])
+        row = cursor.fetchone()
+    return None if row is None else bool(row[0])
+
+
+def _toggle_locked(item_id, user_id, now):
+    visible = GroceryListItem.objects.filter(
+        Q(grocery_list__owner=user_id) | Q(grocery_list__shared_with=user_id),
+        pk=item_id,
+    )
+    with transaction.atomic():
+        was_checked = (
+            GroceryListItem.objects.select_for_update()
+            .filter(pk__in=visible.values("pk"))
+            .values_list("is_checked", flat=True)
+            .first()
+        )
+        if was_checked is None:
+            return None
+        is_checked = not was_checked
+        GroceryListItem.objects.filter(pk=item_id).update(
+            is_checked=is_checked,
+            checked_by=user_id if is_checked else None,
+            checked_at=now if is_checked else None,
+            updated_at=now,
+        )
+    return is_checked
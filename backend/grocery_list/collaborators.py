@@ -0,0 +1,128 @@
+"""
+Frequent collaborator suggestions for the share dialog.
+
+``CollaboratorAffinity`` holds, for every pair of users, how many lists one
+of them has shared with the other, stored in both directions so a user's
+suggestions are one indexed range read. Rows are updated incrementally
+where shares change (``share_with``, ``remove_user``, list deletion);
+``rebuild`` recomputes them from ``GroceryList.shared_with`` after bulk
+writes. A user's suggestions are read straight from the table: the read
+is a single indexed range scan, about what a cache lookup would cost, and
+it is never stale in any worker.
+"""
+
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .models import CollaboratorAffinity, GroceryList
+
+SUGGESTION_LIMIT = 10
+FIELDS = ["id", "username", "email", "first_name", "last_name"]
+
+
+def _pairs(owner_id, user_ids):
+    return Q(user_id=owner_id, collaborator_id__in=user_ids) | Q(
+        user_id__in=user_ids, collaborator_id=owner_id
+    )
+
+
+def record_shares(owner_id, user_ids):
+    """Count one more shared list between ``owner_id`` and each of ``user_ids``"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    table = connection.ops.quote_name(CollaboratorAffinity._meta.db_table)
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    pairs = [
+        pair
+        for user_id in user_ids
+        for pair in ((owner_id, user_id), (user_id, owner_id))
+    ]
+    # One upsert for all pairs; the increment happens in the database, so
+    # concurrent shares cannot lose a count
+    sql = (
+        f"INSERT INTO {table} (user_id, collaborator_id, shared_lists, "
+        f"last_shared_at) VALUES {', '.join(['(%s, %s, 1, %s)'] * len(pairs))} "
+        f"ON CONFLICT (user_id, collaborator_id) DO UPDATE SET "
+        f"shared_lists = {table}.shared_lists + 1, "
+        f"last_shared_at = excluded.last_shared_at"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for pair in pairs for value in (*pair, now)])
+
+
+def record_unshares(owner_id, user_ids):
+    """Count one shared list less between ``owner_id`` and each of ``user_ids``"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    pairs = CollaboratorAffinity.objects.filter(_pairs(owner_id, user_ids))
+    # Decrement first, then drop the pairs that reached zero: a share that
+    # lands in between revives a zero row instead of being lost, and no row
+    # is ever taken below zero, without locking anything
+    pairs.filter(shared_lists__gt=0).update(shared_lists=F("shared_lists") - 1)
+    pairs.filter(shared_lists=0).delete()
+
+
+def suggestions(user_id):
+    """The user's most frequent collaborators, as user dicts"""
+    rows = (
+        CollaboratorAffinity.objects.filter(
+            user_id=user_id, shared_lists__gt=0, collaborator__is_active=True
+        )
+        .order_by("-shared_lists", "-last_shared_at")
+        .values_list(*(f"collaborator__{field}" for field in FIELDS), "shared_lists")[
+            :SUGGESTION_LIMIT
+        ]
+    )
+    return [dict(zip(FIELDS + ["shared_lists"], row)) for row in rows]
+
+
+def rebuild(user_ids=None, batch_size=5000):
+    """
+    Recompute affinities from list shares, for everyone or only the pairs
+    involving ``user_ids``. Returns the number of rows written.
+    """
+    shares = GroceryList.shared_with.through.objects.filter(
+        grocerylist__deleted_at__isnull=True
+    )
+    affinities = CollaboratorAffinity.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        shares = shares.filter(
+            Q(user_id__in=user_ids) | Q(grocerylist__owner_id__in=user_ids)
+        )
+        affinities = affinities.filter(
+            Q(user_id__in=user_ids) | Q(collaborator_id__in=user_ids)
+        )
+
+    counts = defaultdict(int)
+    latest = {}
+    grouped = (
+        shares.order_by()
+        .values_list("grocerylist__owner_id", "user_id")
+        .annotate(lists=Count("id"), last=Max("grocerylist__created_at"))
+    )
+    for owner_id, user_id, lists, last in grouped.iterator():
+        for pair in ((owner_id, user_id), (user_id, owner_id)):
+            counts[pair] += lists
+            latest[pair] = max(latest.get(pair, last), last)
+
+    with transaction.atomic():
+        affinities.delete()
+        CollaboratorAffinity.objects.bulk_create(
+            (
+                CollaboratorAffinity(
+                    user_id=user,
+                    collaborator_id=other,
+                    shared_lists=count,
+                    last_shared_at=latest[user, other],
+                )
+                for (user, other), count in counts.items()
+            ),
+            batch_size=batch_size,
+        )
+    return len(counts)
@@ -0,0 +1,249 @@
+"""
+Find and merge near-duplicate catalog items.
+
+Items are only compared within their category. ``find_duplicates`` streams
+the catalog ordered by category and, per category, normalizes every name
+into a key (case and accents folded, punctuation dropped, a trailing plural
+``s`` removed), so ``"Milk"``, ``"milk "`` and ``"MILK."`` share one key.
+Near matches are found with sorted-neighbourhood blocking instead of
+comparing every pair: the keys are sorted twice, as written and with their
+words sorted, and each key is only compared with the next ``window`` keys
+in either order. Pairs within a small edit distance (``threshold`` is the
+share of characters that must match) are joined, so the work is
+O(n log n) rather than O(n^2).
+
+``merge`` keeps the item with the most list references in each group (the
+oldest on a tie), repoints the others' ``GroceryListItem`` rows to it with
+one ``UPDATE`` per batch (archived lists' items included) and deletes them.
+"""
+
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, Value, When
+
+from .catalog import expire_check
+from .models import ArchivedGroceryListItem, GroceryListItem, Item
+from .user_search import normalize
+
+PUNCTUATION = re.compile(r"[^\w\s]")
+DIGITS = re.compile(r"\d+")
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_WINDOW = 5
+
+
+def item_key(name):
+    """Normalized name; items with equal keys are duplicates"""
+    words = PUNCTUATION.sub(" ", normalize(name)).split()
+    return " ".join(
+        word[:-1] if len(word) > 3 and word.endswith("s") and word[-2] != "s" else word
+        for word in words
+    )
+
+
+@dataclass
+class DuplicateGroup:
+    """Items of one category that are the same product; ``ids[0]`` is kept"""
+
+    category_id: int
+    ids: List[int]
+    names: Dict[int, str]
+
+    @property
+    def winner(self):
+        return self.ids[0]
+
+    @property
+    def losers(self):
+        return self.ids[1:]
+
+
+@dataclass
+class DedupeResult:
+    scanned: int = 0
+    groups: int = 0
+    merged: int = 0
+    repointed: int = 0
+    scan_seconds: float = 0.0
+    merge_seconds: float = 0.0
+    examples: List[DuplicateGroup] = field(default_factory=list)
+
+
+class _Clusters:
+    """Union-find over item ids"""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item_id):
+        parent = self.parent.setdefault(item_id, item_id)
+        if parent != item_id:
+            parent = self.parent[item_id] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        self.parent[self.find(a)] = self.find(b)
+
+    def groups(self):
+        members = {}
+        for item_id in self.parent:
+            members.setdefault(self.find(item_id), []).append(item_id)
+        return [ids for ids in members.values() if len(ids) > 1]
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance of ``a`` and ``b``, or ``limit + 1`` if above it"""
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, start=1):
+        current = [i]
+        for j, other in enumerate(b, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char != other),
+                )
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def similar(a, b, threshold):
+    """
+    Whether two keys differ by at most ``(1 - threshold)`` edits per
+    character. Numbers must match exactly: "milk 1" and "milk 2" are
+    different products however close their spelling.
+    """
+    # The epsilon keeps 0.1 * 10 from rounding down to 0 edits
+    limit = int((1 - threshold) * max(len(a), len(b)) + 1e-9)
+    if abs(len(a) - len(b)) > limit or DIGITS.findall(a) != DIGITS.findall(b):
+        return False
+    # Neighbours in sort order share a prefix, so little is left to compare
+    start = len(os.path.commonprefix([a, b]))
+    a, b = a[start:], b[start:]
+    end = len(os.path.commonprefix([a[::-1], b[::-1]]))
+    return edit_distance(a[: len(a) - end], b[: len(b) - end], limit) <= limit
+
+
+def _cluster(items, threshold, window):
+    """Duplicate id groups among ``(id, key)`` pairs of one category"""
+    clusters = _Clusters()
+    for sort_key in (itemgetter(1), lambda item: " ".join(sorted(item[1].split()))):
+        ordered = sorted(((sort_key(item), item[0]) for item in items))
+        for position, (key, item_id) in enumerate(ordered):
+            for other_key, other_id in ordered[position + 1 : position + 1 + window]:
+                if key == other_key or similar(key, other_key, threshold):
+                    clusters.union(item_id, other_id)
+    return clusters.groups()
+
+
+def find_duplicates(
+    threshold=DEFAULT_THRESHOLD, window=DEFAULT_WINDOW, category_ids=None
+):
+    """Yield a ``DuplicateGroup`` per set of duplicates, unranked"""
+    rows = Item.objects.order_by("category_id", "id")
+    if category_ids:
+        rows = rows.filter(category_id__in=category_ids)
+    rows = rows.values_list("category_id", "id", "name").iterator(chunk_size=5000)
+    for category_id, category_rows in groupby(rows, key=itemgetter(0)):
+        names = {item_id: name for _, item_id, name in category_rows}
+        items = [(item_id, item_key(name)) for item_id, name in names.items()]
+        for ids in _cluster(items, threshold, window):
+            yield DuplicateGroup(
+                category_id, sorted(ids), {item_id: names[item_id] for item_id in ids}
+            )
+
+
+def rank(groups):
+    """Put the most referenced (then oldest) item of each group first"""
+    ids = [item_id for group in groups for item_id in group.ids]
+    references = dict(
+        GroceryListItem.objects.filter(item_id__in=ids)
+        .order_by()
+        .values("item_id")
+        .annotate(count=Count("id"))
+        .values_list("item_id", "count")
+    )
+    for group in groups:
+        group.ids.sort(key=lambda item_id: (-references.get(item_id, 0), item_id))
+    return groups
+
+
+@transaction.atomic
+def merge(groups):
+    """Repoint the losers' list items to the winners and delete the losers"""
+    winners = {loser: group.winner for group in groups for loser in group.losers}
+    if not winners:
+        return 0
+    repoint = Case(
+        *[When(item_id=loser, then=Value(winner)) for loser, winner in winners.items()]
+    )
+    # Soft-deleted rows too, or deleting the losers would break their keys
+    repointed = GroceryListItem.all_objects.filter(item_id__in=winners).update(
+        item=repoint
+    )
+    ArchivedGroceryListItem.objects.filter(item_id__in=winners).update(item=repoint)
+    # Item.objects.delete() would load every loser to send post_delete; the
+    # catalog triggers log the deletes, and this process checks them on commit
+    table = connection.ops.quote_name(Item._meta.db_table)
+    with connection.cursor() as cursor:
+        placeholders = ", ".join(["%s"] * len(winners))
+        cursor.execute(
+            f"DELETE FROM {table} WHERE id IN ({placeholders})", list(winners)
+        )
+    transaction.on_commit(expire_check)
+    return repointed
+
+
+def run(
+    dry_run=True,
+    threshold=DEFAULT_THRESHOLD,
+    window=DEFAULT_WINDOW,
+    batch_size=500,
+    category_ids=None,
+    examples=20,
+):
+    """Find duplicates and, unless ``dry_run``, merge them in batches"""
+    result = DedupeResult()
+    result.scanned = (
+        Item.objects.filter(category_id__in=category_ids).count()
+        if category_ids
+        else Item.objects.count()
+    )
+    batch = []
+    merge_seconds = 0.0
+    started = time.perf_counter()
+
+    def flush():
+        nonlocal merge_seconds
+        rank(batch)
+        room = examples - len(result.examples)
+        result.examples.extend(batch[: max(room, 0)])
+        result.groups += len(batch)
+        result.merged += sum(len(group.losers) for group in batch)
+        if not dry_run:
+            merge_started = time.perf_counter()
+            result.repointed += merge(batch)
+            merge_seconds += time.perf_counter() - merge_started
+        batch.clear()
+
+    pending = 0
+    for group in find_duplicates(threshold, window, category_ids):
+        batch.append(group)
+        pending += len(group.losers)
+        if pending >= batch_size:
+            flush()
+            pending = 0
+    if batch:
+        flush()
+    result.merge_seconds = merge_seconds
+    result.scan_seconds = time.perf_counter() - started - merge_seconds
+    return result
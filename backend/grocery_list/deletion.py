@@ -0,0 +1,153 @@
+"""
+Soft delete of grocery lists and list items, and their later purge.
+
+Deleting through the API only stamps ``deleted_at``: on the item, or on
+the list and its items with one ``UPDATE`` each, and records a
+``Tombstone`` for the owner and every user the list is shared with. The
+default managers hide soft-deleted rows from then on with a filter on
+their own table, so reading items never joins the lists. ``purge`` later removes the
+rows for good, from the ``purge_deleted`` command, in short transactions
+of ``batch_size`` rows each, so no single statement holds locks on
+thousands of items. Clients read the tombstones from ``/api/tombstones/``
+to drop deleted lists and items on their next sync; they are kept for
+``DEFAULT_TOMBSTONE_DAYS`` days.
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import GroceryList, GroceryListItem, Tombstone
+
+Shares = GroceryList.shared_with.through
+
+DEFAULT_GRACE_MINUTES = 60
+DEFAULT_TOMBSTONE_DAYS = 30
+
+
+@dataclass
+class PurgeResult:
+    lists: int = 0
+    items: int = 0
+    tombstones: int = 0
+    seconds: float = 0.0
+
+
+def _audience(list_id, owner_id, shared_ids=None):
+    """The users who could see the list: its owner and its collaborators"""
+    if shared_ids is None:
+        shared_ids = Shares.objects.filter(grocerylist_id=list_id).values_list(
+            "user_id", flat=True
+        )
+    return [owner_id, *shared_ids]
+
+
+@transaction.atomic
+def delete_list(grocery_list, shared_ids=None):
+    """Soft-delete ``grocery_list`` and leave tombstones for its users"""
+    now = timezone.now()
+    GroceryList.all_objects.filter(pk=grocery_list.pk).update(deleted_at=now)
+    GroceryListItem.all_objects.filter(
+        grocery_list_id=grocery_list.pk, deleted_at__isnull=True
+    ).update(deleted_at=now)
+    Tombstone.objects.bulk_create(
+        Tombstone(
+            user_id=user_id,
+            kind=Tombstone.LIST,
+            object_id=grocery_list.pk,
+            list_id=grocery_list.pk,
+            deleted_at=now,
+        )
+        for user_id in _audience(grocery_list.pk, grocery_list.owner_id, shared_ids)
+    )
+
+
+@transaction.atomic
+def delete_item(list_item):
+    """Soft-delete ``list_item`` and leave tombstones for its list's users"""
+    now = timezone.now()
+    GroceryListItem.all_objects.filter(pk=list_item.pk).update(deleted_at=now)
+    grocery_list = list_item.grocery_list
+    Tombstone.objects.bulk_create(
+        Tombstone(
+            user_id=user_id,
+            kind=Tombstone.ITEM,
+            object_id=list_item.pk,
+            list_id=grocery_list.pk,
+            deleted_at=now,
+        )
+        for user_id in _audience(grocery_list.pk, grocery_list.owner_id)
+    )
+
+
+def _delete_rows(table, key, ids):
+    quote = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(table)} WHERE {quote(key)} IN ({placeholders})",
+            list(ids),
+        )
+        return cursor.rowcount
+
+
+def _purge_in_batches(queryset, table, batch_size):
+    """Delete the rows of ``queryset`` ``batch_size`` at a time"""
+    deleted = 0
+    ids = queryset.order_by().values_list("id", flat=True)
+    while True:
+        with transaction.atomic():
+            batch = list(ids[:batch_size])
+            if not batch:
+                return deleted
+            deleted += _delete_rows(table, "id", batch)
+
+
+def purge(
+    grace_minutes=DEFAULT_GRACE_MINUTES,
+    tombstone_days=DEFAULT_TOMBSTONE_DAYS,
+    batch_size=1000,
+):
+    """
+    Physically delete lists and items soft-deleted more than
+    ``grace_minutes`` ago, and tombstones older than ``tombstone_days``
+    """
+    result = PurgeResult()
+    started = time.perf_counter()
+    now = timezone.now()
+    cutoff = now - timedelta(minutes=grace_minutes)
+    items_table = GroceryListItem._meta.db_table
+
+    result.items += _purge_in_batches(
+        GroceryListItem.all_objects.filter(deleted_at__lt=cutoff),
+        items_table,
+        batch_size,
+    )
+    lists = GroceryList.all_objects.filter(deleted_at__lt=cutoff).order_by("id")
+    while True:
+        list_ids = list(lists.values_list("id", flat=True)[:batch_size])
+        if not list_ids:
+            break
+        # A list's items go in batches first, then the list in one short
+        # transaction with its shares
+        result.items += _purge_in_batches(
+            GroceryListItem.all_objects.filter(grocery_list_id__in=list_ids),
+            items_table,
+            batch_size,
+        )
+        with transaction.atomic():
+            # Catches any item added while the batches ran
+            _delete_rows(items_table, "grocery_list_id", list_ids)
+            _delete_rows(Shares._meta.db_table, "grocerylist_id", list_ids)
+            result.lists += _delete_rows(GroceryList._meta.db_table, "id", list_ids)
+
+    result.tombstones = _purge_in_batches(
+        Tombstone.objects.filter(deleted_at__lt=now - timedelta(days=tombstone_days)),
+        Tombstone._meta.db_table,
+        batch_size,
+    )
+    result.seconds = time.perf_counter() - started
+    return result
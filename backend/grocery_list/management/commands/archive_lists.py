@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+
+from grocery_list import archiving
+
+
+class Command(BaseCommand):
+    help = "Move stale grocery lists and their items to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=archiving.DEFAULT_DAYS,
+            help="Archive lists unused for this many days "
+            f"(default: {archiving.DEFAULT_DAYS})",
+        )
+        parser.add_argument(
+            "--inactive-days",
+            type=int,
+            default=archiving.DEFAULT_INACTIVE_DAYS,
+            help="Archive inactive lists unused for this many days "
+            f"(default: {archiving.DEFAULT_INACTIVE_DAYS})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Lists archived per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the lists that would be archived",
+        )
+        parser.add_argument(
+            "--restore",
+            type=int,
+            nargs="+",
+            metavar="LIST_ID",
+            help="Move these archived lists back instead",
+        )
+
+    def handle(self, *args, **options):
+        if options["restore"]:
+            lists, items = archiving.restore(options["restore"])
+            self.stdout.write(
+                self.style.SUCCESS(f"Restored {lists} lists with {items} items")
+            )
+            return
+
+        result = archiving.archive_stale(
+            days=options["days"],
+            inactive_days=options["inactive_days"],
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+        if options["dry_run"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Dry run: {result.lists} lists with {result.items} items "
+                    f"would be archived"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Archived {result.lists} lists with {result.items} items "
+                    f"in {result.seconds:.1f}s"
+                )
+            )
@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand
+
+from grocery_list import dedupe
+
+
+class Command(BaseCommand):
+    help = "Find near-duplicate catalog items and merge them into one"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--apply",
+            action="store_true",
+            help="Merge the duplicates; without it only a report is printed",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=dedupe.DEFAULT_THRESHOLD,
+            help="Name similarity (0-1) for near matches "
+            f"(default: {dedupe.DEFAULT_THRESHOLD})",
+        )
+        parser.add_argument(
+            "--window",
+            type=int,
+            default=dedupe.DEFAULT_WINDOW,
+            help="Neighbouring names each name is compared with "
+            f"(default: {dedupe.DEFAULT_WINDOW})",
+        )
+        parser.add_argument(
+            "--category",
+            type=int,
+            action="append",
+            dest="categories",
+            help="Only look at this category id (repeatable)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Items merged per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--examples",
+            type=int,
+            default=20,
+            help="Groups listed in the report (default: 20)",
+        )
+
+    def handle(self, *args, **options):
+        result = dedupe.run(
+            dry_run=not options["apply"],
+            threshold=options["threshold"],
+            window=options["window"],
+            batch_size=options["batch_size"],
+            category_ids=options["categories"],
+            examples=options["examples"],
+        )
+
+        for group in result.examples:
+            losers = ", ".join(
+                f"{group.names[item_id]!r} ({item_id})" for item_id in group.losers
+            )
+            self.stdout.write(
+                f"keep {group.names[group.winner]!r} ({group.winner}) <- {losers}"
+            )
+        if result.groups > len(result.examples):
+            self.stdout.write(f"... and {result.groups - len(result.examples)} more")
+
+        rate = result.scanned / result.scan_seconds if result.scan_seconds else 0
+        self.stdout.write(
+            f"Scanned {result.scanned} items in {result.scan_seconds:.1f}s "
+            f"({rate:,.0f} items/sec)"
+        )
+        if options["apply"]:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Merged {result.merged} items into {result.groups}, "
+                    f"repointed {result.repointed} list items in "
+                    f"{result.merge_seconds:.1f}s"
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Dry run: {result.merged} items would merge into "
+                    f"{result.groups}; rerun with --apply to merge them"
+                )
+            )
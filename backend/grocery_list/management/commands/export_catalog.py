@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from grocery_list import catalog_io
+
+
+class Command(BaseCommand):
+    help = "Write the item catalog as CSV or JSON Lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="File to write (default: standard output)")
+        parser.add_argument(
+            "--format",
+            choices=catalog_io.FORMATS,
+            help="File format (default: from the output extension, else csv)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["output"]
+        format = options["format"] or catalog_io.format_for_path(path or "")
+        if path is None:
+            for chunk in catalog_io.export_catalog(format):
+                self.stdout.write(chunk.decode(), ending="")
+            return
+
+        with open(path, "wb") as f:
+            for chunk in catalog_io.export_catalog(format):
+                f.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
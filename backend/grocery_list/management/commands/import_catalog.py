@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from grocery_list import catalog_io
+
+
+class Command(BaseCommand):
+    help = "Upsert items and categories from a CSV or JSON Lines catalog file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Catalog file to import")
+        parser.add_argument(
+            "--format",
+            choices=catalog_io.FORMATS,
+            help="File format (default: from the file extension, else csv)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per upsert (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"] or catalog_io.format_for_path(path)
+        started = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                result = catalog_io.import_catalog(
+                    catalog_io.decode_lines(f), format, options["batch_size"]
+                )
+        except OSError as error:
+            raise CommandError(f"Cannot read {path}: {error}")
+
+        for error in result.errors:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if result.skipped > len(result.errors):
+            self.stderr.write(
+                f"... and {result.skipped - len(result.errors)} more rejected lines"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.imported} items ({result.skipped} skipped, "
+                f"{result.categories_created} new categories) in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,85 @@
+import io
+import pstats
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from grocery_list.profiling import read_folded, write_folded
+
+
+class Command(BaseCommand):
+    help = "Merge the request profiles in PROFILING_DIR and print the hot spots"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dir",
+            default=getattr(settings, "PROFILING_DIR", None),
+            help="Profile directory (default: PROFILING_DIR)",
+        )
+        parser.add_argument(
+            "--route", help="Only merge profiles of this URL name, e.g. item-list"
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Functions to show (default: 20)"
+        )
+        parser.add_argument(
+            "--sort",
+            default="cumulative",
+            help="pstats sort key for cProfile data (default: cumulative)",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the merged folded stacks here, for flamegraph.pl or speedscope",
+        )
+
+    def handle(self, *args, **options):
+        if not options["dir"]:
+            raise CommandError("Set PROFILING_DIR or pass --dir")
+        directory = Path(options["dir"])
+        pattern = f"{options['route']}.*" if options["route"] else "*"
+
+        folded = sorted(directory.glob(f"{pattern}.folded"))
+        profiles = sorted(directory.glob(f"{pattern}.prof"))
+        if not folded and not profiles:
+            self.stdout.write(f"No profiles found in {directory}")
+            return
+
+        if folded:
+            stacks = Counter()
+            for path in folded:
+                stacks.update(read_folded(path))
+            self.print_samples(stacks, len(folded), options["limit"])
+            if options["output"]:
+                write_folded(Path(options["output"]), stacks)
+                self.stdout.write(
+                    self.style.SUCCESS(f"Wrote merged stacks to {options['output']}")
+                )
+
+        if profiles:
+            stream = io.StringIO()
+            stats = pstats.Stats(*map(str, profiles), stream=stream)
+            stats.sort_stats(options["sort"]).print_stats(options["limit"])
+            self.stdout.write(f"cProfile data from {len(profiles)} file(s):")
+            self.stdout.write(stream.getvalue())
+
+    def print_samples(self, stacks, files, limit):
+        total = sum(stacks.values())
+        own = Counter()
+        inclusive = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            # Count recursive functions once per stack
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        self.stdout.write(f"{total} samples from {files} file(s)")
+        self.stdout.write(f"{'self %':>7} {'total %':>8}  function")
+        for frame, count in own.most_common(limit):
+            self.stdout.write(
+                f"{100 * count / total:>7.1f} "
+                f"{100 * inclusive[frame] / total:>8.1f}  {frame}"
+            )
+        self.stdout.write("")
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from grocery_list.profiling import MODES, make_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile header value that profiles a request"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--mode",
+            choices=MODES,
+            default="sample",
+            help="Stack sampling or cProfile (default: sample)",
+        )
+
+    def handle(self, *args, **options):
+        max_age = getattr(settings, "PROFILING_TOKEN_MAX_AGE", 3600)
+        self.stdout.write(f"X-Profile: {make_token(options['mode'])}")
+        self.stdout.write(
+            f"Valid for {max_age} seconds on servers sharing this SECRET_KEY."
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from grocery_list import deletion
+
+
+class Command(BaseCommand):
+    help = "Physically remove soft-deleted grocery lists, list items and old tombstones"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-minutes",
+            type=int,
+            default=deletion.DEFAULT_GRACE_MINUTES,
+            help="Only purge rows deleted at least this long ago "
+            f"(default: {deletion.DEFAULT_GRACE_MINUTES})",
+        )
+        parser.add_argument(
+            "--tombstone-days",
+            type=int,
+            default=deletion.DEFAULT_TOMBSTONE_DAYS,
+            help="Keep tombstones this long for client sync "
+            f"(default: {deletion.DEFAULT_TOMBSTONE_DAYS})",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows deleted per transaction (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        result = deletion.purge(
+            grace_minutes=options["grace_minutes"],
+            tombstone_days=options["tombstone_days"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Purged {result.lists} lists, {result.items} list items and "
+                f"{result.tombstones} tombstones in {result.seconds:.1f}s"
+            )
+        )
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from grocery_list import collaborators
+
+
+class Command(BaseCommand):
+    help = "Recompute share dialog suggestions from the current list shares"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="users",
+            help="Only rebuild pairs involving this user id (repeatable)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per INSERT (default: 5000)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rows = collaborators.rebuild(options["users"], options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {rows} collaborator affinities in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,125 @@
+import signal
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from grocery_list import tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks on a thread or process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Tasks run at once (default: 4)",
+        )
+        parser.add_argument(
+            "--pool",
+            choices=["thread", "process"],
+            default="thread",
+            help="Run tasks on threads, or on processes for CPU-bound work "
+            "(default: thread)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds between checks for new tasks (default: 1)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no task is due instead of waiting for more",
+        )
+
+    def record(self, future, counts):
+        try:
+            status = future.result()
+        except Exception as exc:
+            # execute() records task errors itself; this is the worker's own
+            # failure, such as a lost database connection
+            self.stderr.write(f"Worker error: {exc!r}")
+            status = "error"
+        counts[status] = counts.get(status, 0) + 1
+
+    def collect(self, running, counts, timeout):
+        """Wait up to ``timeout`` seconds for running tasks and record them"""
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            del running[future]
+            self.record(future, counts)
+
+    def recover_stale(self):
+        requeued, failed = tasks.requeue_stale()
+        if requeued or failed:
+            self.stdout.write(
+                f"Requeued {requeued} and failed {failed} tasks of lost workers"
+            )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        worker = tasks.worker_id()
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+
+        signal.signal(signal.SIGTERM, stop)
+        if options["pool"] == "process":
+            # Forked children must not share the parent's connection
+            connections.close_all()
+            pool = ProcessPoolExecutor(concurrency)
+        else:
+            pool = ThreadPoolExecutor(concurrency)
+
+        self.stdout.write(f"Worker {worker} running {concurrency} {options['pool']}(s)")
+        self.recover_stale()
+        interval = tasks.HEARTBEAT_INTERVAL.total_seconds()
+        last_beat = time.monotonic()
+
+        counts = {}
+        # Future -> task id; a crashed task's future ends, so it stops
+        # getting heartbeats and is recovered as stale
+        running = {}
+        try:
+            while not stopping:
+                if time.monotonic() - last_beat >= interval:
+                    tasks.heartbeat(running.values())
+                    self.recover_stale()
+                    last_beat = time.monotonic()
+                free = concurrency - len(running)
+                for task_id in tasks.claim(worker, free) if free else []:
+                    running[pool.submit(tasks.execute_in_pool, task_id)] = task_id
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                self.collect(running, counts, options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Let running tasks finish, still beating; unclaimed ones stay
+            # queued
+            while running:
+                tasks.heartbeat(running.values())
+                self.collect(running, counts, interval)
+            pool.shutdown()
+
+        summary = ", ".join(
+            f"{count} {status}" for status, count in sorted(counts.items())
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Worker stopped: {summary or 'no tasks'}")
+        )
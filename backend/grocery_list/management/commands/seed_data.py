@@ -1,10 +1,23 @@
+import time
 from decimal import Decimal
 
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
-from django.db import transaction
-
-from grocery_list.models import Category, GroceryList, GroceryListItem, Item
+from django.db import connections, transaction
+from django.db.models import Value
+from django.db.models.functions import Concat
+
+from grocery_list import collaborators
+from grocery_list.models import (
+    ArchivedGroceryList,
+    ArchivedGroceryListItem,
+    Category,
+    GroceryList,
+    GroceryListItem,
+    Item,
+)
+from grocery_list.seeding import SyntheticDataGenerator
 
 
 class Command(BaseCommand):
@@ -26,15 +39,64 @@ class Command(BaseCommand):
             action="store_true",
             help="Allow running in production (use with extreme caution)",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per INSERT/COPY or cleanup DELETE batch (default: 5000)",
+        )
+
+        scale = parser.add_argument_group(
+            "scale mode",
+            "Generate synthetic load-testing data instead of the demo fixtures",
+        )
+        scale.add_argument(
+            "--users", type=int, help="Number of synthetic users to create"
+        )
+        scale.add_argument(
+            "--lists-per-user",
+            type=int,
+            default=5,
+            help="Average grocery lists per user (default: 5)",
+        )
+        scale.add_argument(
+            "--items-per-list",
+            type=int,
+            default=20,
+            help="Average items per grocery list (default: 20)",
+        )
+        scale.add_argument(
+            "--catalog",
+            type=int,
+            default=1000,
+            help="Number of catalog items to create (default: 1000)",
+        )
+        scale.add_argument(
+            "--use-copy",
+            action="store_true",
+            help="Load list items and shares with COPY on PostgreSQL",
+        )
+        scale.add_argument(
+            "--random-seed",
+            type=int,
+            default=0,
+            help="Seed for the random generator, for reproducible datasets",
+        )
 
     def handle(self, *args, **options):
         # Production safety checks
         self.perform_safety_checks(options)
 
-        with transaction.atomic():
-            if options["clean"]:
-                self.clean_demo_data(options)
+        if options["users"]:
+            self.seed_scale(options)
+            return
+
+        # Cleanup commits batch by batch, so it runs before the seeding
+        # transaction rather than holding it open
+        if options["clean"]:
+            self.clean_demo_data(options)
 
+        with transaction.atomic():
             self.stdout.write(self.style.SUCCESS("Creating comprehensive seed data..."))
 
             # Create demo users
@@ -68,6 +130,45 @@ class Command(BaseCommand):
                 )
             )
 
+    def seed_scale(self, options):
+        """Generate a synthetic dataset of the requested size"""
+        if options["clean"]:
+            self.clean_demo_data(options)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generating synthetic data: {options['users']} users, "
+                f"~{options['lists_per_user']} lists/user, "
+                f"~{options['items_per_list']} items/list, "
+                f"{options['catalog']} catalog items"
+            )
+        )
+
+        generator = SyntheticDataGenerator(
+            users=options["users"],
+            lists_per_user=options["lists_per_user"],
+            items_per_list=options["items_per_list"],
+            catalog=options["catalog"],
+            batch_size=options["batch_size"],
+            use_copy=options["use_copy"],
+            seed=options["random_seed"],
+            progress=lambda message: self.stdout.write(f"   {message}"),
+        )
+        stats = generator.run()
+        # Shares were bulk inserted, so derive the suggestions in one pass
+        affinities = collaborators.rebuild(batch_size=options["batch_size"])
+
+        for line in stats.lines():
+            self.stdout.write(f"   ✅ {line}")
+        rate = stats.total_rows / stats.total_seconds if stats.total_seconds else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"🎉 Synthetic data created: {stats.total_rows} rows in "
+                f"{stats.total_seconds:.1f}s ({rate:,.0f} rows/sec)"
+            )
+        )
+        self.stdout.write(f"   ✅ {affinities} collaborator affinities")
+
     def perform_safety_checks(self, options):
         """Perform safety checks to protect production data"""
         import os
@@ -165,15 +266,15 @@ class Command(BaseCommand):
             f"(IDs: {demo_user_ids})"
         )
 
-        # Phase 1: Clean grocery list items (respecting foreign key constraints)
-        demo_list_items = GroceryListItem.objects.filter(
-            grocery_list__owner__in=demo_user_objects
+        # all_objects: soft-deleted lists and items are demo data too
+        demo_list_items = GroceryListItem.all_objects.filter(
+            grocery_list__owner__in=demo_user_ids
         )
 
         # Additional safety: verify no shared items with non-demo users
         shared_items_with_real_users = demo_list_items.filter(
             grocery_list__shared_with__isnull=False
-        ).exclude(grocery_list__shared_with__in=demo_user_objects)
+        ).exclude(grocery_list__shared_with__in=demo_user_ids)
 
         if (
             shared_items_with_real_users.exists()
@@ -190,23 +291,52 @@ class Command(BaseCommand):
             )
             return
 
-        deleted_items = demo_list_items.delete()[0]
-        if deleted_items:
-            self.stdout.write(
-                f"   ✅ Deleted {deleted_items} grocery list items (demo users only)"
-            )
+        batch_size = (options or {}).get("batch_size") or 5000
+        started = time.perf_counter()
 
-        # Phase 2: Clean grocery lists (owned by demo users only)
-        demo_lists = GroceryList.objects.filter(owner__in=demo_user_objects)
-        deleted_lists = demo_lists.delete()[0]
-        if deleted_lists:
-            self.stdout.write(
-                f"   ✅ Deleted {deleted_lists} grocery lists (demo users only)"
-            )
+        # Phase 1: Clean sharing rows and grocery list items. Neither has
+        # dependents or signal handlers, so plain DELETEs are safe.
+        demo_shares = GroceryList.shared_with.through.objects.filter(
+            grocerylist__owner__in=demo_user_ids
+        )
+        self.delete_in_batches(demo_shares, "list shares", batch_size, raw=True)
+        collaborators.rebuild(demo_user_ids)
+        self.delete_in_batches(
+            demo_list_items, "grocery list items", batch_size, raw=True
+        )
+
+        # The same for lists the demo users had archived
+        archived_shares = ArchivedGroceryList.shared_with.through.objects.filter(
+            archivedgrocerylist__owner__in=demo_user_ids
+        )
+        self.delete_in_batches(
+            archived_shares, "archived list shares", batch_size, raw=True
+        )
+        archived_items = ArchivedGroceryListItem.objects.filter(
+            grocery_list__owner__in=demo_user_ids
+        )
+        self.delete_in_batches(
+            archived_items, "archived grocery list items", batch_size, raw=True
+        )
+
+        # Phase 2: Clean grocery lists (owned by demo users only). Their rows
+        # are gone from the child tables already, so the ORM's cascade
+        # collection finds nothing to load.
+        demo_lists = GroceryList.all_objects.filter(owner__in=demo_user_ids)
+        self.delete_in_batches(demo_lists, "grocery lists", batch_size)
+        archived_lists = ArchivedGroceryList.objects.filter(owner__in=demo_user_ids)
+        self.delete_in_batches(
+            archived_lists, "archived grocery lists", batch_size, raw=True
+        )
 
         # Phase 3: Clean orphaned items (only if they're not referenced elsewhere)
-        # This is safer as it only removes truly unused items
-        orphaned_items = Item.objects.filter(grocerylistitem__isnull=True).exclude(
+        # This is safer as it only removes truly unused items. The orphan
+        # check is part of every DELETE, so rows referenced in the meantime
+        # survive. Archived list items count as references: the raw DELETE
+        # would not cascade to them.
+        orphaned_items = Item.objects.filter(
+            grocerylistitem__isnull=True, archived_list_items__isnull=True
+        ).exclude(
             # Keep items that might be referenced by non-demo users
             name__in=[
                 "Whole Milk",
@@ -221,40 +351,84 @@ class Command(BaseCommand):
                 "Apples",
             ]  # Keep common items that real users might reference
         )
-
-        deleted_catalog_items = orphaned_items.delete()[0]
-        if deleted_catalog_items:
-            self.stdout.write(
-                f"   ✅ Deleted {deleted_catalog_items} orphaned catalog items"
-            )
+        self.delete_in_batches(
+            orphaned_items, "orphaned catalog items", batch_size, raw=True
+        )
 
         # Phase 4: Clean orphaned categories (only if no items reference them)
         orphaned_categories = Category.objects.filter(items__isnull=True)
-        deleted_categories = orphaned_categories.delete()[0]
-        if deleted_categories:
-            self.stdout.write(f"   ✅ Deleted {deleted_categories} orphaned categories")
+        self.delete_in_batches(
+            orphaned_categories, "orphaned categories", batch_size, raw=True
+        )
 
         # Phase 5: Clean up demo user passwords but don't delete users
         # (They might be referenced in logs or have other important metadata)
-        for user in demo_user_objects:
-            # Reset to default demo password
-            user.set_password("password123")
-            user.email = f"{user.username}@example.com"
-            user.save()
-
-        self.stdout.write(
-            f"   ✅ Reset {demo_user_objects.count()} demo user credentials"
+        # Reset to default demo password, hashed once for all of them
+        reset_users = User.objects.filter(id__in=demo_user_ids).update(
+            password=make_password("password123"),
+            email=Concat("username", Value("@example.com")),
         )
+        self.stdout.write(f"   ✅ Reset {reset_users} demo user credentials")
 
         self.stdout.write(
             self.style.SUCCESS(
-                "✅ Demo data cleanup completed safely\n"
+                f"✅ Demo data cleanup completed safely in "
+                f"{time.perf_counter() - started:.1f}s\n"
                 f"   • Only demo users ({', '.join(demo_usernames)}) were affected\n"
                 f"   • All other user data was preserved\n"
                 f"   • Orphaned data was cleaned up\n"
             )
         )
 
+    def delete_in_batches(self, queryset, label, batch_size, raw=False):
+        """
+        Delete ``queryset`` in primary-key ranges of at most ``batch_size``
+        rows, committing after each range so locks are only held briefly.
+
+        With ``raw=True`` each range is removed with a single DELETE, skipping
+        cascade collection and signals; only use it for rows nothing else
+        references. Returns the number of rows deleted.
+        """
+        model = queryset.model
+        connection = connections[queryset.db]
+        quote = connection.ops.quote_name
+        deleted = 0
+        batches = 0
+        started = time.perf_counter()
+        remaining = queryset.order_by("pk")
+
+        while True:
+            pks = list(remaining.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            with transaction.atomic(using=queryset.db):
+                if raw:
+                    placeholders = ", ".join(["%s"] * len(pks))
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            f"DELETE FROM {quote(model._meta.db_table)} "
+                            f"WHERE {quote(model._meta.pk.column)} "
+                            f"IN ({placeholders})",
+                            pks,
+                        )
+                        deleted += cursor.rowcount
+                else:
+                    window = queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+                    deleted += window.delete()[1].get(model._meta.label, 0)
+            batches += 1
+            remaining = queryset.order_by("pk").filter(pk__gt=pks[-1])
+            if batches > 1 or len(pks) == batch_size:
+                self.stdout.write(f"      … {deleted} {label} deleted")
+
+        if deleted:
+            seconds = time.perf_counter() - started
+            rate = deleted / seconds if seconds else 0
+            self.stdout.write(
+                f"   ✅ Deleted {deleted} {label} in {batches} batch(es), "
+                f"{seconds:.1f}s ({rate:,.0f} rows/sec)"
+            )
+        return deleted
+
     def create_demo_users(self):
         """Create demo users with consistent passwords"""
         users = {}
@@ -458,9 +632,11 @@ class Command(BaseCommand):
         john = users["john_doe"]
         jane = users["jane_smith"]
 
-        # Clean existing lists for these users
-        GroceryListItem.objects.filter(grocery_list__owner__in=[john, jane]).delete()
-        GroceryList.objects.filter(owner__in=[john, jane]).delete()
+        # Clean existing lists for these users, soft-deleted ones included
+        GroceryListItem.all_objects.filter(
+            grocery_list__owner__in=[john, jane]
+        ).delete()
+        GroceryList.all_objects.filter(owner__in=[john, jane]).delete()
 
         # 1. Big Shopping List (John) - For pagination showcase (30+ items)
         big_list = GroceryList.objects.create(
@@ -570,6 +746,7 @@ class Command(BaseCommand):
         # 3. Party Planning List (Jane) - Shared with John
         party_list = GroceryList.objects.create(name="🎉 Party Planning", owner=jane)
         party_list.shared_with.add(john)
+        collaborators.record_shares(jane.id, [john.id])
 
         party_items = [
             ("Tortilla Chips", "4", "bag"),
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from grocery_list.models import SlowQuery
+
+ORDERINGS = {
+    "total": F("total_ms").desc(),
+    "mean": (F("total_ms") / F("calls")).desc(),
+    "max": F("max_ms").desc(),
+    "calls": F("calls").desc(),
+}
+
+
+class Command(BaseCommand):
+    help = "Print the slowest recorded queries, grouped by SQL fingerprint"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--order",
+            choices=sorted(ORDERINGS),
+            default="total",
+            help="Rank by total, mean or max time, or by calls (default: total)",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=10, help="Entries to show (default: 10)"
+        )
+        parser.add_argument(
+            "--explain",
+            action="store_true",
+            help="Show the example query, its parameters and its plan",
+        )
+        parser.add_argument(
+            "--reset", action="store_true", help="Delete all recorded slow queries"
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} slow queries"))
+            return
+
+        entries = SlowQuery.objects.order_by(ORDERINGS[options["order"]])[
+            : options["limit"]
+        ]
+        if not entries:
+            self.stdout.write("No slow queries recorded. Is SLOW_QUERY_LOG_MS set?")
+            return
+
+        self.stdout.write(
+            f"{'#':>3} {'calls':>7} {'total ms':>10} {'mean ms':>9} "
+            f"{'max ms':>9}  view / sql"
+        )
+        for rank, entry in enumerate(entries, start=1):
+            self.stdout.write(
+                f"{rank:>3} {entry.calls:>7} {entry.total_ms:>10.1f} "
+                f"{entry.mean_ms:>9.1f} {entry.max_ms:>9.1f}  {entry.view or '-'}"
+            )
+            self.stdout.write(f"{'':>42}{entry.normalized_sql[:400]}")
+            if options["explain"]:
+                self.stdout.write(f"    example: {entry.example_sql}")
+                if entry.example_params:
+                    self.stdout.write(f"    params:  {entry.example_params}")
+                label = "EXPLAIN ANALYZE" if entry.explain_analyzed else "EXPLAIN"
+                self.stdout.write(f"    {label}:")
+                for line in (entry.explain or "(not available)").splitlines():
+                    self.stdout.write(f"      {line}")
+            self.stdout.write("")
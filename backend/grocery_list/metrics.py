@@ -0,0 +1,114 @@
+"""
+Prometheus metrics for the API, the database and caches.
+
+Metrics are only collected when ``prometheus_client`` is installed. Under
+gunicorn, set ``PROMETHEUS_MULTIPROC_DIR`` (``gunicorn.conf.py`` does) so
+every forked worker writes its samples to a shared directory and
+``/metrics`` aggregates them, whichever worker serves the scrape.
+"""
+
+import os
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:  # pragma: no cover - prometheus_client is optional
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        "grocery_http_request_duration_seconds",
+        "API request latency by route",
+        ["route", "method", "status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUEST_QUERIES = prometheus_client.Histogram(
+        "grocery_http_request_db_queries",
+        "Database queries per API request",
+        ["route"],
+        buckets=QUERY_BUCKETS,
+    )
+    REQUEST_DB_TIME = prometheus_client.Histogram(
+        "grocery_http_request_db_duration_seconds",
+        "Time spent in database queries per API request",
+        ["route"],
+        buckets=LATENCY_BUCKETS,
+    )
+    REQUESTS_IN_PROGRESS = prometheus_client.Gauge(
+        "grocery_http_requests_in_progress",
+        "API requests being handled, summed over live workers",
+        multiprocess_mode="livesum",
+    )
+    WORKERS = prometheus_client.Gauge(
+        "grocery_workers",
+        "Live server worker processes",
+        multiprocess_mode="livesum",
+    )
+    CACHE_LOOKUPS = prometheus_client.Counter(
+        "grocery_cache_lookups",
+        "Cache lookups by cache and result (hit or miss)",
+        ["cache", "result"],
+    )
+
+
+def enabled():
+    return prometheus_client is not None
+
+
+def multiprocess_mode():
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def observe_request(route, method, status, seconds, queries, db_seconds):
+    REQUEST_LATENCY.labels(route, method, status).observe(seconds)
+    REQUEST_QUERIES.labels(route).observe(queries)
+    REQUEST_DB_TIME.labels(route).observe(db_seconds)
+
+
+def record_cache_lookup(cache, hit):
+    """Count a lookup in ``cache``; hit ratios are derived from these counts"""
+    if prometheus_client is not None:
+        CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+class DatabaseCollector:
+    """Gauges read from the database at scrape time"""
+
+    def collect(self):
+        from rest_framework.authtoken.models import Token
+
+        tokens = GaugeMetricFamily(
+            "grocery_auth_tokens", "Issued API authentication tokens"
+        )
+        tokens.add_metric([], Token.objects.count())
+        yield tokens
+
+
+def generate_latest():
+    """Render all metrics in the Prometheus text format"""
+    if multiprocess_mode():
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        process_metrics = prometheus_client.generate_latest(registry)
+    else:
+        process_metrics = prometheus_client.generate_latest()
+
+    scrape = prometheus_client.CollectorRegistry()
+    scrape.register(DatabaseCollector())
+    return process_metrics + prometheus_client.generate_latest(scrape)
+
+
+def worker_started():
+    """Count this process as a live worker (gunicorn ``post_fork``)"""
+    if prometheus_client is not None:
+        WORKERS.set(1)
+
+
+def worker_exited(pid):
+    """Drop a dead worker's live gauges (gunicorn ``child_exit``)"""
+    if prometheus_client is not None and multiprocess_mode():
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from . import metrics
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint, guarded by METRICS_TOKEN. Without a token it
+    only answers while DEBUG is on, so a deployment that forgets to set one
+    does not publish its traffic figures.
+    """
+    if not metrics.enabled():
+        return HttpResponse(
+            "prometheus_client is not installed\n",
+            status=501,
+            content_type="text/plain",
+        )
+
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not token and not settings.DEBUG:
+        return HttpResponse(
+            "METRICS_TOKEN is not set\n", status=403, content_type="text/plain"
+        )
+    if token:
+        supplied = request.META.get("HTTP_AUTHORIZATION", "")
+        if not constant_time_compare(supplied, f"Bearer {token}"):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+
+    return HttpResponse(
+        metrics.generate_latest(),
+        content_type=metrics.prometheus_client.CONTENT_TYPE_LATEST,
+    )
@@ -0,0 +1,365 @@
+import gzip
+import logging
+import random
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from . import metrics, timing
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+perf_logger = logging.getLogger("grocery_list.perf")
+
+
+class GzipCodec:
+    name = "gzip"
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def stream(self, chunks):
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+class BrotliCodec:
+    name = "br"
+
+    def __init__(self, level=4):
+        self.level = level
+
+    def compress(self, data):
+        return brotli.compress(data, quality=self.level)
+
+    def stream(self, chunks):
+        compressor = brotli.Compressor(quality=self.level)
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+
+
+class ZstdCodec:
+    name = "zstd"
+
+    def __init__(self, level=3):
+        self.level = level
+
+    def compress(self, data):
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def stream(self, chunks):
+        compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        yield compressor.flush()
+
+
+def available_codecs():
+    """Return every codec usable in this install, keyed by encoding name"""
+    codecs = {"gzip": GzipCodec}
+    if brotli is not None:
+        codecs["br"] = BrotliCodec
+    if zstandard is not None:
+        codecs["zstd"] = ZstdCodec
+    return codecs
+
+
+def parse_accept_encoding(header):
+    """Return ``{encoding: q}`` for an Accept-Encoding header"""
+    accepted = {}
+    for token in (header or "").split(","):
+        name, _, params = token.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+class APICompressionMiddleware:
+    """
+    Compress API responses with the best encoding the client accepts.
+
+    Settings:
+
+    * ``API_COMPRESSION_PATH_PREFIX`` - only paths under it are compressed
+      (default ``"/api/"``)
+    * ``API_COMPRESSION_MIN_SIZE`` - smaller bodies are sent as-is
+      (default 1024 bytes)
+    * ``API_COMPRESSION_ENCODINGS`` - server preference order
+      (default zstd, br, gzip; encodings whose library is missing are skipped)
+    * ``API_COMPRESSION_LEVELS`` - per-encoding level overrides
+
+    Responses that already carry a ``Content-Encoding`` (such as the
+    pre-compressed catalog snapshot) or opt out with ``no-transform`` are
+    left alone. Streaming responses are compressed chunk by chunk with a
+    flush after each chunk, so clients still receive data incrementally.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.path_prefix = getattr(settings, "API_COMPRESSION_PATH_PREFIX", "/api/")
+        self.min_size = getattr(settings, "API_COMPRESSION_MIN_SIZE", 1024)
+        levels = getattr(settings, "API_COMPRESSION_LEVELS", {})
+        codecs = available_codecs()
+        self.codecs = [
+            codecs[name](**({"level": levels[name]} if name in levels else {}))
+            for name in getattr(
+                settings, "API_COMPRESSION_ENCODINGS", ["zstd", "br", "gzip"]
+            )
+            if name in codecs
+        ]
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.path.startswith(self.path_prefix):
+            return response
+        return self.compress(request, response)
+
+    def select_codec(self, request):
+        accepted = parse_accept_encoding(request.META.get("HTTP_ACCEPT_ENCODING"))
+        for codec in self.codecs:
+            if accepted.get(codec.name, accepted.get("*", 0)) > 0:
+                return codec
+        return None
+
+    def compress(self, request, response):
+        if (
+            response.has_header("Content-Encoding")
+            or response.status_code in (204, 304)
+            or "no-transform" in response.get("Cache-Control", "")
+            or getattr(response, "is_async", False)
+        ):
+            return response
+
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        # The representation depends on Accept-Encoding from here on, even
+        # if this particular client gets it uncompressed.
+        patch_vary_headers(response, ["Accept-Encoding"])
+
+        codec = self.select_codec(request)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = codec.stream(response.streaming_content)
+            del response["Content-Length"]
+        else:
+            compressed = codec.compress(response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # Compressed bytes differ from the identity encoding's, so a strong
+        # ETag would no longer be valid
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = codec.name
+        return response
+
+
+class QueryTimer:
+    """``execute_wrapper`` adding each query's duration to request timings"""
+
+    def __init__(self, timings):
+        self.timings = timings
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.timings.add("db", time.perf_counter() - start)
+
+
+def timed_queries(timings):
+    """Add every query on every connection to ``timings`` inside the block"""
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(QueryTimer(timings)))
+    return stack
+
+
+class MetricsMiddleware:
+    """
+    Record Prometheus metrics (see ``grocery_list.metrics``) for API
+    requests: latency, queries and database time per route, and requests
+    in progress. Routes are labelled with their URL name, e.g.
+    ``grocerylist-add-item``, so labels stay bounded whatever the ids in
+    the path. Disabled when ``prometheus_client`` is not installed.
+
+    Settings:
+
+    * ``METRICS_PATH_PREFIX`` - only paths under it are recorded
+      (default ``"/api/"``)
+    """
+
+    def __init__(self, get_response):
+        if not metrics.enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.path_prefix = getattr(settings, "METRICS_PATH_PREFIX", "/api/")
+        metrics.worker_started()
+
+    def __call__(self, request):
+        if not request.path.startswith(self.path_prefix):
+            return self.get_response(request)
+
+        timings = timing.RequestTimings()
+        start = time.perf_counter()
+        metrics.REQUESTS_IN_PROGRESS.inc()
+        try:
+            with timed_queries(timings):
+                response = self.get_response(request)
+        finally:
+            metrics.REQUESTS_IN_PROGRESS.dec()
+
+        match = request.resolver_match
+        metrics.observe_request(
+            route=match.url_name if match and match.url_name else "unmatched",
+            method=request.method,
+            status=response.status_code,
+            seconds=time.perf_counter() - start,
+            queries=timings.counts["db"],
+            db_seconds=timings.seconds["db"],
+        )
+        return response
+
+
+class PerformanceMiddleware:
+    """
+    Time API requests and report where the time went.
+
+    Sampled requests record database query count and time, serializer time
+    (see ``timing.measure``) and template/renderer time. They get a
+    ``Server-Timing`` header and an INFO line on the ``grocery_list.perf``
+    logger. Requests slower than the threshold are logged at WARNING
+    whether they were sampled or not. Log lines are ``key=value`` pairs,
+    and the same fields are attached to the record as ``perf``.
+
+    Settings:
+
+    * ``PERF_PATH_PREFIX`` - only paths under it are timed (default ``"/api/"``)
+    * ``PERF_SAMPLE_RATE`` - fraction of requests fully instrumented
+      (default 1.0 with ``DEBUG``, 0.01 otherwise)
+    * ``PERF_SLOW_REQUEST_MS`` - slow request threshold (default 500)
+    * ``PERF_SERVER_TIMING`` - send ``Server-Timing`` on sampled responses
+      (default True)
+
+    Total time ends when the response leaves the middleware, so the body
+    of a streaming response is not included.
+    """
+
+    PHASES = ("db", "serialize", "render")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.path_prefix = getattr(settings, "PERF_PATH_PREFIX", "/api/")
+        self.sample_rate = getattr(
+            settings, "PERF_SAMPLE_RATE", 1.0 if settings.DEBUG else 0.01
+        )
+        self.slow_ms = getattr(settings, "PERF_SLOW_REQUEST_MS", 500)
+        self.server_timing = getattr(settings, "PERF_SERVER_TIMING", True)
+
+    def __call__(self, request):
+        if not request.path.startswith(self.path_prefix):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        if random.random() >= self.sample_rate:
+            timings = None
+            response = self.get_response(request)
+        else:
+            timings = timing.RequestTimings()
+            token = timing.activate(timings)
+            try:
+                with timed_queries(timings):
+                    response = self.get_response(request)
+            finally:
+                timing.deactivate(token)
+
+        self.report(request, response, timings, time.perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        timings = timing.current()
+        if timings is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.add("render", time.perf_counter() - start)
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def report(self, request, response, timings, seconds):
+        total_ms = seconds * 1000
+        slow = total_ms >= self.slow_ms
+        if timings is None and not slow:
+            return
+
+        match = request.resolver_match
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "route": match.url_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+        }
+        if timings is not None:
+            fields["db_queries"] = timings.counts["db"]
+            for phase in self.PHASES:
+                fields[f"{phase}_ms"] = round(timings.seconds[phase] * 1000, 1)
+            if self.server_timing:
+                response["Server-Timing"] = self.server_timing_header(timings, total_ms)
+
+        perf_logger.log(
+            logging.WARNING if slow else logging.INFO,
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            extra={"perf": fields},
+        )
+
+    def server_timing_header(self, timings, total_ms):
+        metrics = [
+            f'db;dur={timings.seconds["db"] * 1000:.1f};'
+            f'desc="{timings.counts["db"]} queries"'
+        ]
+        for phase in self.PHASES[1:]:
+            metrics.append(f"{phase};dur={timings.seconds[phase] * 1000:.1f}")
+        metrics.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(metrics)
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.6 on 2026-10-19 11:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grocery_list", "0003_add_custom_name_field"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlowQuery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fingerprint", models.CharField(max_length=40, unique=True)),
+                ("normalized_sql", models.TextField()),
+                ("example_sql", models.TextField()),
+                ("example_params", models.TextField(blank=True)),
+                ("view", models.CharField(blank=True, max_length=200)),
+                ("calls", models.PositiveIntegerField(default=0)),
+                ("total_ms", models.FloatField(default=0)),
+                ("max_ms", models.FloatField(default=0)),
+                ("explain", models.TextField(blank=True)),
+                ("explain_analyzed", models.BooleanField(default=False)),
+                ("first_seen", models.DateTimeField(auto_now_add=True)),
+                ("last_seen", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name_plural": "Slow queries",
+                "ordering": ["-total_ms"],
+            },
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 4.2.6 on 2026-10-19 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+from grocery_list.user_search import normalize
+
+BATCH_SIZE = 5000
+
+
+def backfill(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    UserSearchIndex = apps.get_model("grocery_list", "UserSearchIndex")
+    db = schema_editor.connection.alias
+
+    def entry(user_id, username, first_name, last_name):
+        username, first_name, last_name = map(
+            normalize, (username, first_name, last_name)
+        )
+        return UserSearchIndex(
+            user_id=user_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            search_text=" ".join(filter(None, (username, first_name, last_name))),
+        )
+
+    users = (
+        User.objects.using(db)
+        .order_by("id")
+        .values_list("id", "username", "first_name", "last_name")
+    )
+    batch = []
+    for row in users.iterator(chunk_size=BATCH_SIZE):
+        batch.append(entry(*row))
+        if len(batch) >= BATCH_SIZE:
+            UserSearchIndex.objects.using(db).bulk_create(batch)
+            batch = []
+    UserSearchIndex.objects.using(db).bulk_create(batch)
+
+
+def add_postgres_indexes(apps, schema_editor):
+    """
+    Byte-order collation makes prefix ranges match exactly what LIKE
+    'term%' would; trigrams serve LIKE '%term%'.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for column in ("username", "first_name", "last_name"):
+        schema_editor.execute(
+            f"ALTER TABLE grocery_list_usersearchindex "
+            f'ALTER COLUMN {column} TYPE varchar(150) COLLATE "C"'
+        )
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX usersearch_text_trgm ON grocery_list_usersearchindex "
+        "USING gin (search_text gin_trgm_ops)"
+    )
+
+
+def drop_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS usersearch_text_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("grocery_list", "0004_slowquery"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserSearchIndex",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("username", models.CharField(max_length=150)),
+                ("first_name", models.CharField(max_length=150)),
+                ("last_name", models.CharField(max_length=150)),
+                ("search_text", models.CharField(max_length=452)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["username"], name="usersearch_username_idx"),
+                    models.Index(
+                        fields=["first_name"], name="usersearch_first_name_idx"
+                    ),
+                    models.Index(fields=["last_name"], name="usersearch_last_name_idx"),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.RunPython(add_postgres_indexes, drop_postgres_indexes),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.6 on 2026-10-19 11:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+BATCH_SIZE = 5000
+
+
+def backfill(apps, schema_editor):
+    """Count the lists every pair of users shares, in both directions"""
+    GroceryList = apps.get_model("grocery_list", "GroceryList")
+    CollaboratorAffinity = apps.get_model("grocery_list", "CollaboratorAffinity")
+    db = schema_editor.connection.alias
+
+    counts = {}
+    shares = (
+        GroceryList.shared_with.through.objects.using(db)
+        .order_by()
+        .values_list("grocerylist__owner_id", "user_id")
+        .annotate(
+            lists=models.Count("id"), last=models.Max("grocerylist__created_at")
+        )
+    )
+    for owner_id, user_id, lists, last in shares.iterator():
+        for pair in ((owner_id, user_id), (user_id, owner_id)):
+            count, latest = counts.get(pair, (0, last))
+            counts[pair] = (count + lists, max(latest, last))
+
+    CollaboratorAffinity.objects.using(db).bulk_create(
+        [
+            CollaboratorAffinity(
+                user_id=user, collaborator_id=other, shared_lists=count, last_shared_at=last
+            )
+            for (user, other), (count, last) in counts.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("grocery_list", "0005_usersearchindex"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollaboratorAffinity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("shared_lists", models.PositiveIntegerField(default=0)),
+                (
+                    "last_shared_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "collaborator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="collaborator_affinities",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Collaborator affinities",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-shared_lists", "-last_shared_at"],
+                        name="collaborator_ranking_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="collaboratoraffinity",
+            constraint=models.UniqueConstraint(
+                fields=("user", "collaborator"), name="unique_collaborator_affinity"
+            ),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.6 on 2026-10-19 12:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grocery_list", "0009_task"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="archivedgrocerylistitem",
+            name="item",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_list_items",
+                to="grocery_list.item",
+            ),
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 4.2.6 on 2026-10-19 13:05
+
+from django.db import migrations, models
+
+# Changes older than this many versions are pruned by the triggers; a
+# process whose snapshot is further behind reloads the whole catalog
+RETAINED_CHANGES = 10000
+
+TABLES = {"grocery_list_item": "items", "grocery_list_category": "categories"}
+
+POSTGRES_FUNCTION = f"""
+CREATE FUNCTION grocery_catalog_changed() RETURNS trigger AS $$
+DECLARE
+    changed_version bigint;
+    changed_id bigint;
+BEGIN
+    -- The row lock on the counter orders concurrent writers, so versions
+    -- commit in the order they are handed out
+    UPDATE grocery_list_catalogversion SET version = version + 1
+        RETURNING version INTO changed_version;
+    IF changed_version IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'DELETE' THEN
+        changed_id := OLD.id;
+    ELSE
+        changed_id := NEW.id;
+    END IF;
+    INSERT INTO grocery_list_catalogchange (version, kind, row_id)
+        VALUES (changed_version, TG_ARGV[0], changed_id);
+    DELETE FROM grocery_list_catalogchange
+        WHERE version <= changed_version - {RETAINED_CHANGES};
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+SQLITE_TRIGGER = f"""
+CREATE TRIGGER grocery_catalog_{{kind}}_{{event}} AFTER {{event}} ON {{table}}
+BEGIN
+    UPDATE grocery_list_catalogversion SET version = version + 1;
+    INSERT INTO grocery_list_catalogchange (version, kind, row_id)
+        SELECT version, '{{kind}}', {{row}}.id FROM grocery_list_catalogversion;
+    DELETE FROM grocery_list_catalogchange WHERE version <=
+        (SELECT version FROM grocery_list_catalogversion) - {RETAINED_CHANGES};
+END
+"""
+
+EVENTS = {"insert": "NEW", "update": "NEW", "delete": "OLD"}
+
+
+def create_version(apps, schema_editor):
+    CatalogVersion = apps.get_model("grocery_list", "CatalogVersion")
+    CatalogVersion.objects.using(schema_editor.connection.alias).create(pk=1)
+
+
+def add_triggers(apps, schema_editor):
+    """
+    Every write to the catalog tables bumps the version and logs the row in
+    the same transaction, including bulk_create, update() and raw SQL.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_FUNCTION)
+        for table, kind in TABLES.items():
+            schema_editor.execute(
+                f"CREATE TRIGGER grocery_catalog_{kind}_changed "
+                f"AFTER INSERT OR UPDATE OR DELETE ON {table} FOR EACH ROW "
+                f"EXECUTE FUNCTION grocery_catalog_changed('{kind}')"
+            )
+    elif vendor == "sqlite":
+        for table, kind in TABLES.items():
+            for event, row in EVENTS.items():
+                schema_editor.execute(
+                    SQLITE_TRIGGER.format(kind=kind, event=event, table=table, row=row)
+                )
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for table, kind in TABLES.items():
+            schema_editor.execute(
+                f"DROP TRIGGER IF EXISTS grocery_catalog_{kind}_changed ON {table}"
+            )
+        schema_editor.execute("DROP FUNCTION IF EXISTS grocery_catalog_changed()")
+    elif vendor == "sqlite":
+        for kind in TABLES.values():
+            for event in EVENTS:
+                schema_editor.execute(
+                    f"DROP TRIGGER IF EXISTS grocery_catalog_{kind}_{event}"
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grocery_list", "0011_archived_item_related_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogChange",
+            fields=[
+                ("version", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("kind", models.CharField(max_length=10)),
+                ("row_id", models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CatalogVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+        migrations.RunPython(add_triggers, drop_triggers),
+    ]
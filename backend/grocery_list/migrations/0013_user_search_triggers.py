@@ -0,0 +1,124 @@
+# Generated by Django 4.2.6 on 2026-10-19 13:40
+
+from django.db import migrations
+
+from grocery_list.user_search import normalize
+
+BATCH_SIZE = 5000
+INDEX = "grocery_list_usersearchindex"
+
+# What normalize() does, short of accent folding and whitespace collapsing;
+# the post_save receiver overwrites it with the exact form on ORM saves
+UPSERT = f"""
+    INSERT INTO {INDEX} (user_id, username, first_name, last_name, search_text)
+    VALUES (
+        NEW.id, lower(NEW.username), lower(NEW.first_name), lower(NEW.last_name),
+        lower(NEW.username)
+        || CASE WHEN NEW.first_name = '' THEN '' ELSE ' ' || lower(NEW.first_name) END
+        || CASE WHEN NEW.last_name = '' THEN '' ELSE ' ' || lower(NEW.last_name) END
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        username = excluded.username,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        search_text = excluded.search_text;
+"""
+
+POSTGRES_FUNCTION = f"""
+CREATE FUNCTION grocery_user_search_index() RETURNS trigger AS $$
+BEGIN
+    {UPSERT}
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+POSTGRES_TRIGGERS = [
+    "CREATE TRIGGER grocery_user_search_insert AFTER INSERT ON auth_user "
+    "FOR EACH ROW EXECUTE FUNCTION grocery_user_search_index()",
+    "CREATE TRIGGER grocery_user_search_update "
+    "AFTER UPDATE OF username, first_name, last_name ON auth_user FOR EACH ROW "
+    "WHEN (OLD.username IS DISTINCT FROM NEW.username "
+    "OR OLD.first_name IS DISTINCT FROM NEW.first_name "
+    "OR OLD.last_name IS DISTINCT FROM NEW.last_name) "
+    "EXECUTE FUNCTION grocery_user_search_index()",
+]
+
+SQLITE_TRIGGERS = [
+    f"CREATE TRIGGER grocery_user_search_insert AFTER INSERT ON auth_user "
+    f"BEGIN {UPSERT} END",
+    f"CREATE TRIGGER grocery_user_search_update "
+    f"AFTER UPDATE OF username, first_name, last_name ON auth_user "
+    f"WHEN OLD.username IS NOT NEW.username OR OLD.first_name IS NOT NEW.first_name "
+    f"OR OLD.last_name IS NOT NEW.last_name "
+    f"BEGIN {UPSERT} END",
+]
+
+
+def add_triggers(apps, schema_editor):
+    """
+    Give users written without the ORM (bulk_create, update(), raw SQL) an
+    index row in the same statement, so search can always find them.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(POSTGRES_FUNCTION)
+        statements = POSTGRES_TRIGGERS
+    elif vendor == "sqlite":
+        statements = SQLITE_TRIGGERS
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ("postgresql", "sqlite"):
+        return
+    suffix = " ON auth_user" if vendor == "postgresql" else ""
+    for name in ("grocery_user_search_insert", "grocery_user_search_update"):
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}{suffix}")
+    if vendor == "postgresql":
+        schema_editor.execute("DROP FUNCTION IF EXISTS grocery_user_search_index()")
+
+
+def backfill(apps, schema_editor):
+    """Index the users written without the ORM since 0005"""
+    User = apps.get_model("auth", "User")
+    UserSearchIndex = apps.get_model("grocery_list", "UserSearchIndex")
+    db = schema_editor.connection.alias
+
+    def entry(user_id, username, first_name, last_name):
+        username, first_name, last_name = map(
+            normalize, (username, first_name, last_name)
+        )
+        return UserSearchIndex(
+            user_id=user_id,
+            username=username,
+            first_name=first_name,
+            last_name=last_name,
+            search_text=" ".join(filter(None, (username, first_name, last_name))),
+        )
+
+    missing = (
+        User.objects.using(db)
+        .filter(search_index__isnull=True)
+        .values_list("id", "username", "first_name", "last_name")
+    )
+    UserSearchIndex.objects.using(db).bulk_create(
+        [entry(*row) for row in missing.iterator()], batch_size=BATCH_SIZE
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("grocery_list", "0012_catalog_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.RunPython(add_triggers, drop_triggers),
+    ]
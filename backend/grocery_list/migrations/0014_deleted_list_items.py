@@ -0,0 +1,29 @@
+# Generated by Django 4.2.6 on 2026-10-19 15:10
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def stamp_items(apps, schema_editor):
+    """Items of lists deleted so far inherit the list's ``deleted_at``"""
+    GroceryList = apps.get_model("grocery_list", "GroceryList")
+    GroceryListItem = apps.get_model("grocery_list", "GroceryListItem")
+    deleted_lists = GroceryList.objects.filter(deleted_at__isnull=False)
+    GroceryListItem.objects.filter(
+        deleted_at__isnull=True, grocery_list__in=deleted_lists
+    ).update(
+        deleted_at=Subquery(
+            deleted_lists.filter(pk=OuterRef("grocery_list_id")).values("deleted_at")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("grocery_list", "0013_user_search_triggers"),
+    ]
+
+    operations = [
+        migrations.RunPython(stamp_items, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 
 
 class Category(models.Model):
@@ -35,6 +36,37 @@ class Item(models.Model):
         return f"{self.name} ({self.category.name})"
 
 
+class CatalogVersion(models.Model):
+    """
+    Single row counting writes to ``Category`` and ``Item``. Database
+    triggers (migration 0012) bump it in the writing transaction, whatever
+    made the write; ``catalog`` compares its snapshot against it.
+    """
+
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.version)
+
+
+class CatalogChange(models.Model):
+    """The catalog row each ``CatalogVersion`` bump touched, recent ones only"""
+
+    version = models.BigIntegerField(primary_key=True)
+    kind = models.CharField(max_length=10)  # "items" or "categories"
+    row_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.version}: {self.kind} {self.row_id}"
+
+
+class LiveGroceryListManager(models.Manager):
+    """Lists that are not soft-deleted (see ``deletion``)"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class GroceryList(models.Model):
     name = models.CharField(max_length=200)
     owner = models.ForeignKey(
@@ -46,6 +78,10 @@ class GroceryList(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = LiveGroceryListManager()
+    all_objects = models.Manager()
 
     class Meta:
         ordering = ["-updated_at"]
@@ -54,6 +90,21 @@ class GroceryList(models.Model):
         return f"{self.name} (by {self.owner.username})"
 
 
+class GroceryListItemQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips save(), so fill blank units here, in one query
+        objs = list(objs)
+        GroceryListItem.fill_default_units(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class LiveGroceryListItemManager(models.Manager.from_queryset(GroceryListItemQuerySet)):
+    """List items that are not soft-deleted; deleting a list stamps its items"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class GroceryListItem(models.Model):
     grocery_list = models.ForeignKey(
         GroceryList, on_delete=models.CASCADE, related_name="items"
@@ -79,6 +130,10 @@ class GroceryListItem(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = LiveGroceryListItemManager()
+    all_objects = GroceryListItemQuerySet.as_manager()
 
     class Meta:
         ordering = ["is_checked", "item__name"]
@@ -90,5 +145,240 @@ class GroceryListItem(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.unit:
-            self.unit = self.item.default_unit
+            GroceryListItem.fill_default_units([self])
         super().save(*args, **kwargs)
+
+    @staticmethod
+    def fill_default_units(list_items):
+        """
+        Give list items without a unit their item's default unit. Items that
+        are already loaded are used as they are; the rest are looked up in a
+        single query that reads only ``default_unit``.
+        """
+        missing = set()
+        for list_item in list_items:
+            if list_item.unit:
+                continue
+            if GroceryListItem.item.is_cached(list_item):
+                list_item.unit = list_item.item.default_unit
+            else:
+                missing.add(list_item.item_id)
+        if not missing:
+            return
+        units = dict(
+            Item.objects.filter(pk__in=missing)
+            .order_by()
+            .values_list("id", "default_unit")
+        )
+        for list_item in list_items:
+            if not list_item.unit and list_item.item_id in units:
+                list_item.unit = units[list_item.item_id]
+
+
+class ArchivedGroceryList(models.Model):
+    """
+    A grocery list moved out of the live tables by ``archive_lists``; same
+    columns and id as the ``GroceryList`` it was (see ``archiving``)
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=200)
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="archived_grocery_lists"
+    )
+    shared_with = models.ManyToManyField(
+        User, blank=True, related_name="archived_shared_grocery_lists"
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-updated_at"]
+
+    def __str__(self):
+        return f"{self.name} (by {self.owner.username}, archived)"
+
+
+class ArchivedGroceryListItem(models.Model):
+    """A ``GroceryListItem`` of an archived list"""
+
+    id = models.BigIntegerField(primary_key=True)
+    grocery_list = models.ForeignKey(
+        ArchivedGroceryList, on_delete=models.CASCADE, related_name="items"
+    )
+    item = models.ForeignKey(
+        Item, on_delete=models.CASCADE, related_name="archived_list_items"
+    )
+    custom_name = models.CharField(max_length=200, blank=True)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, default=1)
+    unit = models.CharField(max_length=20, blank=True)
+    notes = models.TextField(blank=True)
+    is_checked = models.BooleanField(default=False)
+    checked_at = models.DateTimeField(null=True, blank=True)
+    checked_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    added_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["is_checked", "item__name"]
+
+    def __str__(self):
+        return f"{self.quantity} {self.unit} of {self.item.name} (archived)"
+
+
+class Tombstone(models.Model):
+    """
+    Record that a list or list item was deleted, one per user who could see
+    it, so clients can drop it on their next sync (see ``deletion``)
+    """
+
+    LIST = "list"
+    ITEM = "item"
+    KIND_CHOICES = [(LIST, "List"), (ITEM, "List item")]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # Not a foreign key: the list is purged long before its tombstones
+    list_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["deleted_at", "id"]
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="tombstone_sync_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} deleted at {self.deleted_at}"
+
+
+class Task(models.Model):
+    """A queued call of a registered background task (see ``tasks``)"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Enqueueing twice with the same key returns the first task
+    idempotency_key = models.CharField(
+        max_length=200, unique=True, null=True, blank=True
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # The worker's claim query: due tasks, oldest first
+            models.Index(fields=["status", "run_at"], name="task_claim_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class SlowQuery(models.Model):
+    """Slow queries aggregated by normalized SQL (see ``slow_queries``)"""
+
+    fingerprint = models.CharField(max_length=40, unique=True)
+    normalized_sql = models.TextField()
+    example_sql = models.TextField()
+    example_params = models.TextField(blank=True)
+    view = models.CharField(max_length=200, blank=True)
+    calls = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    explain = models.TextField(blank=True)
+    explain_analyzed = models.BooleanField(default=False)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-total_ms"]
+        verbose_name_plural = "Slow queries"
+
+    def __str__(self):
+        return f"{self.calls}x {self.total_ms:.0f}ms {self.normalized_sql[:60]}"
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.calls if self.calls else 0
+
+
+class UserSearchIndex(models.Model):
+    """Normalized user fields for ``user_search``, kept in sync on save"""
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="search_index"
+    )
+    username = models.CharField(max_length=150)
+    first_name = models.CharField(max_length=150)
+    last_name = models.CharField(max_length=150)
+    search_text = models.CharField(max_length=452)
+
+    class Meta:
+        # Plain indexes rather than db_index=True, which would add unused
+        # varchar_pattern_ops indexes on PostgreSQL; migration 0005 gives
+        # these columns the "C" collation prefix ranges rely on
+        indexes = [
+            models.Index(fields=["username"], name="usersearch_username_idx"),
+            models.Index(fields=["first_name"], name="usersearch_first_name_idx"),
+            models.Index(fields=["last_name"], name="usersearch_last_name_idx"),
+        ]
+
+    def __str__(self):
+        return self.search_text
+
+
+class CollaboratorAffinity(models.Model):
+    """
+    Lists ``user`` and ``collaborator`` share, either way round; ranks the
+    share dialog suggestions (see ``collaborators``)
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="collaborator_affinities"
+    )
+    collaborator = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    shared_lists = models.PositiveIntegerField(default=0)
+    last_shared_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "collaborator"], name="unique_collaborator_affinity"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-shared_lists", "-last_shared_at"],
+                name="collaborator_ranking_idx",
+            )
+        ]
+        verbose_name_plural = "Collaborator affinities"
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.collaborator_id} ({self.shared_lists})"
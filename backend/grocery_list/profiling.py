@@ -0,0 +1,195 @@
+"""
+On-demand request profiling.
+
+``ProfilingMiddleware`` profiles a request when it carries a valid signed
+``X-Profile`` header (see ``manage.py profiling_token``) or is picked by
+``PROFILING_SAMPLE_RATE``. Two profilers are available:
+
+* ``sample`` - a statistical profiler that reads the request thread's stack
+  with ``sys._current_frames`` every ``PROFILING_INTERVAL_MS``. Overhead is
+  low and independent of how many calls the view makes.
+* ``cprofile`` - deterministic ``cProfile``, exact call counts but slower.
+
+Results are aggregated per route and process under ``PROFILING_DIR``: stack
+samples as folded stacks (``route.pid.folded``, one ``a;b;c count`` line per
+stack, ready for flamegraph tools) and cProfile data as pstats dumps
+(``route.pid.prof``). ``manage.py profiling_report`` merges and prints them.
+"""
+
+import cProfile
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+MODES = ("sample", "cprofile")
+HEADER = "HTTP_X_PROFILE"
+SIGNING_SALT = "grocery_list.profiling"
+
+_write_lock = threading.Lock()
+
+
+def make_token(mode="sample"):
+    """Return a signed ``X-Profile`` header value requesting ``mode``"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode {mode!r}")
+    return signing.dumps({"mode": mode}, salt=SIGNING_SALT)
+
+
+def read_token(value, max_age):
+    """Return the mode requested by a signed header value, or None"""
+    try:
+        mode = signing.loads(value, salt=SIGNING_SALT, max_age=max_age)["mode"]
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+    return mode if mode in MODES else None
+
+
+def frame_label(frame):
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}:{name}"
+
+
+class StackSampler:
+    """Count the stacks of one thread, sampled from a background thread"""
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(labels))] += 1
+
+
+def read_folded(path):
+    stacks = Counter()
+    with open(path) as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack:
+                stacks[stack] += int(count)
+    return stacks
+
+
+def write_folded(path, stacks):
+    # Write beside the target and rename so readers never see half a file
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    os.replace(tmp, path)
+
+
+def save_samples(directory, route, stacks):
+    path = Path(directory) / f"{route}.{os.getpid()}.folded"
+    with _write_lock:
+        if path.exists():
+            stacks = read_folded(path) + stacks
+        write_folded(path, stacks)
+    return path
+
+
+def save_profile(directory, route, profile):
+    path = Path(directory) / f"{route}.{os.getpid()}.prof"
+    with _write_lock:
+        stats = pstats.Stats(profile)
+        if path.exists():
+            stats.add(str(path))
+        stats.dump_stats(path)
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Profile selected requests and aggregate the results on disk.
+
+    Settings:
+
+    * ``PROFILING_DIR`` - where results go; profiling is off when unset
+    * ``PROFILING_SAMPLE_RATE`` - fraction of requests profiled without a
+      header (default 0)
+    * ``PROFILING_MODE`` - profiler for sampled requests (default ``sample``)
+    * ``PROFILING_INTERVAL_MS`` - stack sampling interval (default 5)
+    * ``PROFILING_TOKEN_MAX_AGE`` - seconds a signed header stays valid
+      (default 3600)
+    """
+
+    def __init__(self, get_response):
+        self.directory = getattr(settings, "PROFILING_DIR", None)
+        if not self.directory:
+            raise MiddlewareNotUsed
+        os.makedirs(self.directory, exist_ok=True)
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0)
+        self.default_mode = getattr(settings, "PROFILING_MODE", "sample")
+        self.interval = getattr(settings, "PROFILING_INTERVAL_MS", 5) / 1000
+        self.max_age = getattr(settings, "PROFILING_TOKEN_MAX_AGE", 3600)
+
+    def __call__(self, request):
+        mode = self.select_mode(request)
+        if mode is None:
+            return self.get_response(request)
+
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is already active in this thread
+                return self.get_response(request)
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            save_profile(self.directory, self.route(request), profiler)
+        else:
+            sampler = StackSampler(self.interval)
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            if sampler.stacks:
+                save_samples(self.directory, self.route(request), sampler.stacks)
+
+        response["X-Profiled"] = mode
+        return response
+
+    def select_mode(self, request):
+        header = request.META.get(HEADER)
+        if header:
+            return read_token(header, self.max_age)
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.default_mode
+        return None
+
+    def route(self, request):
+        match = request.resolver_match
+        return match.url_name if match and match.url_name else "unmatched"
@@ -0,0 +1,52 @@
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+else:
+    ORJSON_OPTIONS = (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """
+    Drop-in replacement for ``JSONRenderer`` that encodes with orjson.
+
+    The output is byte-for-byte what ``JSONRenderer`` produces for compact,
+    unicode output: datetimes, decimals, lazy strings and other non-native
+    values are handed to DRF's own encoder instead of orjson's formatting.
+    Pretty-printed responses, non-default ``COMPACT_JSON``/``UNICODE_JSON``
+    settings, values orjson rejects (e.g. integers above 64 bits) and
+    installs without orjson all fall back to the stdlib renderer. Floats are
+    the one known difference: orjson writes ``1e16`` where Python writes
+    ``1e+16``, and ``null`` for NaN where strict DRF raises.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        if (
+            orjson is None
+            or not self.compact
+            or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            # Let the stdlib renderer produce the result (or the error)
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Match JSONRenderer, which escapes these to stay a strict JS subset
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
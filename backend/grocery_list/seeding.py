@@ -0,0 +1,353 @@
+"""
+Synthetic data generator for building production-sized databases.
+
+Rows are written with ``bulk_create`` in batches (or PostgreSQL ``COPY`` for
+the high-volume tables), each batch in its own transaction, while users are
+processed in chunks so memory stays bounded however large the run is.
+
+The data is skewed the way real usage is: item popularity follows a Zipf
+distribution, list counts and list lengths vary around their means, and a
+share of lists is shared with other synthetic users.
+"""
+
+import io
+import itertools
+import random
+import time
+from bisect import bisect_left
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import user_search
+from .models import Category, GroceryList, GroceryListItem, Item, UserSearchIndex
+
+CATEGORY_NAMES = [
+    "Produce",
+    "Dairy & Eggs",
+    "Meat & Seafood",
+    "Bakery",
+    "Pantry",
+    "Frozen",
+    "Beverages",
+    "Snacks",
+    "Household",
+    "Health & Beauty",
+]
+ADJECTIVES = ["Organic", "Fresh", "Whole", "Low Fat", "Large", "Classic", "Spicy"]
+NOUNS = ["Apples", "Milk", "Bread", "Chicken", "Rice", "Coffee", "Soap", "Chips"]
+UNITS = ["piece", "lb", "kg", "bag", "box", "bottle", "can", "pack", "dozen"]
+
+PASSWORD = "password123"
+SHARED_LIST_RATIO = 0.2
+CHECKED_RATIO = 0.3
+
+
+class SeedStats:
+    """Row counts and timings per table"""
+
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+
+    def add(self, table, rows, seconds):
+        self.rows[table] = self.rows.get(table, 0) + rows
+        self.seconds[table] = self.seconds.get(table, 0.0) + seconds
+
+    @property
+    def total_rows(self):
+        return sum(self.rows.values())
+
+    @property
+    def total_seconds(self):
+        return sum(self.seconds.values())
+
+    def lines(self):
+        for table, rows in self.rows.items():
+            seconds = self.seconds[table]
+            rate = rows / seconds if seconds else 0
+            yield f"{table}: {rows} rows in {seconds:.1f}s ({rate:,.0f} rows/sec)"
+
+
+class SyntheticDataGenerator:
+    def __init__(
+        self,
+        users,
+        lists_per_user,
+        items_per_list,
+        catalog,
+        batch_size=5000,
+        use_copy=False,
+        seed=0,
+        prefix="synthetic",
+        progress=None,
+    ):
+        self.users = users
+        self.lists_per_user = lists_per_user
+        self.items_per_list = items_per_list
+        self.catalog = catalog
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+        self.random = random.Random(seed)
+        self.prefix = prefix
+        self.progress = progress or (lambda message: None)
+        self.stats = SeedStats()
+        self.now = timezone.now()
+
+    def run(self):
+        # Hashing is deliberately slow, so every synthetic user shares one hash
+        self.password = make_password(PASSWORD)
+        item_units = self.create_catalog()
+        # Zipf weights: the item at popularity rank r is picked ~1/r as often
+        item_ids = list(item_units)
+        self.random.shuffle(item_ids)
+        self.item_ids = item_ids
+        self.item_units = item_units
+        self.cum_weights = list(
+            itertools.accumulate(1 / rank for rank in range(1, len(item_ids) + 1))
+        )
+
+        user_chunk = max(1, self.batch_size // max(1, self.lists_per_user))
+        for start in range(0, self.users, user_chunk):
+            count = min(user_chunk, self.users - start)
+            user_ids = self.create_users(start, count)
+            self.create_lists(user_ids)
+            self.progress(
+                f"{start + count}/{self.users} users, "
+                f"{self.stats.total_rows} rows so far"
+            )
+        return self.stats
+
+    # Helpers
+
+    def timed_insert(self, table, rows, insert):
+        started = time.perf_counter()
+        with transaction.atomic():
+            result = insert()
+        self.stats.add(table, rows, time.perf_counter() - started)
+        return result
+
+    def bulk_create(self, model, objects):
+        return self.timed_insert(
+            model._meta.db_table,
+            len(objects),
+            lambda: model.objects.bulk_create(objects, batch_size=self.batch_size),
+        )
+
+    def copy(self, model, columns, rows):
+        """Load ``rows`` (tuples matching ``columns``) with PostgreSQL COPY"""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_value(value) for value in row))
+            buffer.write("\n")
+        buffer.seek(0)
+        sql = "COPY {} ({}) FROM STDIN".format(
+            connection.ops.quote_name(model._meta.db_table),
+            ", ".join(connection.ops.quote_name(column) for column in columns),
+        )
+
+        def insert():
+            with connection.cursor() as cursor:
+                cursor.copy_expert(sql, buffer)
+
+        self.timed_insert(model._meta.db_table, len(rows), insert)
+
+    def vary(self, mean):
+        """An integer >= 1 drawn around ``mean`` with a long upper tail"""
+        return max(1, int(self.random.expovariate(1 / mean) + 0.5))
+
+    def pick_items(self, count):
+        total = self.cum_weights[-1]
+        return [
+            self.item_ids[bisect_left(self.cum_weights, self.random.random() * total)]
+            for _ in range(count)
+        ]
+
+    # Tables
+
+    def create_catalog(self):
+        """Create the categories and ``catalog`` items; return {id: unit}"""
+        existing = set(Category.objects.values_list("name", flat=True))
+        self.bulk_create(
+            Category,
+            [Category(name=name) for name in CATEGORY_NAMES if name not in existing],
+        )
+        category_ids = list(
+            Category.objects.filter(name__in=CATEGORY_NAMES).values_list(
+                "id", flat=True
+            )
+        )
+
+        existing_items = Item.objects.filter(
+            name__startswith=f"{self.prefix.title()} "
+        ).values_list("name", "category_id")
+        taken = set(existing_items)
+
+        for start in range(0, self.catalog, self.batch_size):
+            items = []
+            for n in range(start, min(start + self.batch_size, self.catalog)):
+                name = (
+                    f"{self.prefix.title()} {self.random.choice(ADJECTIVES)} "
+                    f"{self.random.choice(NOUNS)} {n}"
+                )
+                category_id = category_ids[n % len(category_ids)]
+                unit = self.random.choice(UNITS)
+                if (name, category_id) not in taken:
+                    items.append(
+                        Item(name=name, category_id=category_id, default_unit=unit)
+                    )
+            self.bulk_create(Item, items)
+
+        return dict(
+            Item.objects.filter(
+                name__startswith=f"{self.prefix.title()} ", category_id__in=category_ids
+            ).values_list("id", "default_unit")
+        )
+
+    def create_users(self, start, count):
+        usernames = [f"{self.prefix}_{n:07d}" for n in range(start, start + count)]
+        users = [
+            User(
+                username=username,
+                email=f"{username}@example.com",
+                first_name="Synthetic",
+                last_name=username.rsplit("_", 1)[1],
+                password=self.password,
+            )
+            for username in usernames
+        ]
+        self.timed_insert(
+            User._meta.db_table,
+            len(users),
+            lambda: User.objects.bulk_create(users, ignore_conflicts=True),
+        )
+        rows = list(
+            User.objects.filter(username__in=usernames).values_list(
+                "id", "username", "first_name", "last_name"
+            )
+        )
+        # bulk_create skips post_save, so index the users for search here
+        self.timed_insert(
+            UserSearchIndex._meta.db_table,
+            len(rows),
+            lambda: user_search.index_users(rows, self.batch_size),
+        )
+        return [row[0] for row in rows]
+
+    def create_lists(self, user_ids):
+        lists = [
+            GroceryList(name=f"List {n + 1}", owner_id=user_id)
+            for user_id in user_ids
+            for n in range(self.vary(self.lists_per_user))
+        ]
+        lists = self.bulk_create(GroceryList, lists)
+
+        shares = []
+        for grocery_list in lists:
+            if len(user_ids) > 1 and self.random.random() < SHARED_LIST_RATIO:
+                others = [pk for pk in user_ids if pk != grocery_list.owner_id]
+                for user_id in self.random.sample(others, min(len(others), 2)):
+                    shares.append((grocery_list.id, user_id))
+        self.create_shares(shares)
+
+        rows = []
+        for grocery_list in lists:
+            for item_id in self.pick_items(self.vary(self.items_per_list)):
+                rows.append(self.list_item_row(grocery_list, item_id))
+                if len(rows) >= self.batch_size:
+                    self.create_list_items(rows)
+                    rows = []
+        if rows:
+            self.create_list_items(rows)
+
+    def create_shares(self, shares):
+        through = GroceryList.shared_with.through
+        if self.use_copy:
+            self.copy(through, ["grocerylist_id", "user_id"], shares)
+        else:
+            self.bulk_create(
+                through,
+                [
+                    through(grocerylist_id=list_id, user_id=user_id)
+                    for list_id, user_id in shares
+                ],
+            )
+
+    def list_item_row(self, grocery_list, item_id):
+        checked = self.random.random() < CHECKED_RATIO
+        return (
+            grocery_list.id,
+            item_id,
+            self.random.choice([1, 1, 1, 2, 2, 3, 6]),
+            self.item_units[item_id],
+            checked,
+            self.now if checked else None,
+            grocery_list.owner_id if checked else None,
+            grocery_list.owner_id,
+        )
+
+    def create_list_items(self, rows):
+        if self.use_copy:
+            self.copy(
+                GroceryListItem,
+                [
+                    "grocery_list_id",
+                    "item_id",
+                    "quantity",
+                    "unit",
+                    "is_checked",
+                    "checked_at",
+                    "checked_by_id",
+                    "added_by_id",
+                    "custom_name",
+                    "notes",
+                    "created_at",
+                    "updated_at",
+                ],
+                [row + ("", "", self.now, self.now) for row in rows],
+            )
+            return
+
+        self.bulk_create(
+            GroceryListItem,
+            [
+                GroceryListItem(
+                    grocery_list_id=list_id,
+                    item_id=item_id,
+                    quantity=quantity,
+                    unit=unit,
+                    is_checked=is_checked,
+                    checked_at=checked_at,
+                    checked_by_id=checked_by_id,
+                    added_by_id=added_by_id,
+                )
+                for (
+                    list_id,
+                    item_id,
+                    quantity,
+                    unit,
+                    is_checked,
+                    checked_at,
+                    checked_by_id,
+                    added_by_id,
+                ) in rows
+            ],
+        )
+
+
+def _copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
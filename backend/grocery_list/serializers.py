@@ -1,29 +1,163 @@
+from operator import itemgetter
+
 from django.contrib.auth.models import User
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import (
+    Aggregate,
+    BooleanField,
+    Case,
+    CharField,
+    Count,
+    Max,
+    Q,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, NullIf
 
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+from . import timing
+from .models import (
+    ArchivedGroceryList,
+    Category,
+    GroceryList,
+    GroceryListItem,
+    Item,
+    Task,
+    Tombstone,
+)
+
+SPARSE_FIELDSET_PARAMS = ("fields", "omit", "compact")
+
+
+def _split_param(value):
+    return {name.strip() for name in (value or "").split(",") if name.strip()}
+
+
+def sparse_fieldset(request, available, compact_fields=None):
+    """
+    Return the names from ``available`` selected by the read-only query
+    parameters ``?fields=a,b``, ``?omit=a,b`` and ``?compact=1`` (which
+    selects ``compact_fields``), or None when the response is unrestricted.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+
+    params = request.query_params
+    include = _split_param(params.get("fields"))
+    omit = _split_param(params.get("omit"))
+    if compact_fields and params.get("compact") in ("1", "true"):
+        include = include & set(compact_fields) if include else set(compact_fields)
+    if not include and not omit:
+        return None
+
+    return [
+        name
+        for name in available
+        if (not include or name in include) and name not in omit
+    ]
+
+
+class TimedSerializerMixin:
+    """Count a ModelSerializer's output as the request's "serialize" phase"""
+
+    def to_representation(self, instance):
+        with timing.measure("serialize"):
+            return super().to_representation(instance)
+
+
+class SparseFieldsetMixin(TimedSerializerMixin):
+    """
+    Trim a ModelSerializer's output on read requests with ``?fields=``,
+    ``?omit=`` or ``?compact=1``, and narrow the queryset to match.
+
+    ``Meta.method_field_sources`` lists the model paths each
+    SerializerMethodField reads so that ``restrict_queryset`` can work out
+    the joins and columns the remaining fields need.
+    """
+
+    compact_fields = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = sparse_fieldset(
+            self.context.get("request"), list(self.fields), self.compact_fields
+        )
+        if self.sparse_fields is not None:
+            for name in set(self.fields) - set(self.sparse_fields):
+                self.fields.pop(name)
+
+    def get_source_paths(self, name, field):
+        if field.source == "*":
+            return getattr(self.Meta, "method_field_sources", {}).get(name)
+        return ["__".join(field.source_attrs)]
 
-from .models import Category, GroceryList, GroceryListItem, Item
+    def restrict_queryset(self, queryset):
+        """Load only the relations and columns the selected fields read"""
+        if self.sparse_fields is None:
+            return queryset
 
+        only, select_related, prefetch_related = set(), set(), set()
+        for name, field in self.fields.items():
+            paths = self.get_source_paths(name, field)
+            if paths is None:
+                return queryset
+            for path in paths:
+                model, parts = queryset.model, path.split("__")
+                for depth, part in enumerate(parts, start=1):
+                    try:
+                        model_field = model._meta.get_field(part)
+                    except FieldDoesNotExist:
+                        # A property or other computed attribute
+                        return queryset
+                    prefix = "__".join(parts[:depth])
+                    if model_field.many_to_many or model_field.one_to_many:
+                        prefetch_related.add(prefix)
+                        break
+                    only.add(prefix)
+                    if not model_field.is_relation or depth == len(parts):
+                        break
+                    select_related.add(prefix)
+                    model = model_field.related_model
+
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .select_related(*select_related)
+            .prefetch_related(*prefetch_related)
+            .only(queryset.model._meta.pk.name, *only)
+        )
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    compact_fields = ["id", "username"]
 
-class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "first_name", "last_name"]
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     item_count = serializers.SerializerMethodField()
+    compact_fields = ["id", "name"]
 
     class Meta:
         model = Category
         fields = ["id", "name", "description", "item_count", "created_at", "updated_at"]
+        method_field_sources = {"item_count": []}
 
     def get_item_count(self, obj):
-        return obj.items.count()
+        # Viewsets annotate the count; fall back for freshly saved objects
+        item_count = getattr(obj, "item_count", None)
+        return obj.items.count() if item_count is None else item_count
 
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source="category.name", read_only=True)
+    compact_fields = ["id", "name", "category", "default_unit"]
 
     class Meta:
         model = Item
@@ -40,7 +174,7 @@ class ItemSerializer(serializers.ModelSerializer):
         ]
 
 
-class GroceryListItemSerializer(serializers.ModelSerializer):
+class GroceryListItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     item_name = serializers.CharField(source="item.name", read_only=True)
     item_category = serializers.CharField(source="item.category.name", read_only=True)
     added_by_username = serializers.CharField(
@@ -50,6 +184,7 @@ class GroceryListItemSerializer(serializers.ModelSerializer):
         source="checked_by.username", read_only=True
     )
     display_name = serializers.SerializerMethodField()
+    compact_fields = ["id", "display_name", "quantity", "unit", "is_checked"]
 
     class Meta:
         model = GroceryListItem
@@ -73,6 +208,7 @@ class GroceryListItemSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        method_field_sources = {"display_name": ["custom_name", "item__name"]}
 
     def get_display_name(self, obj):
         """Return custom name if set, otherwise fall back to item name"""
@@ -80,11 +216,12 @@ class GroceryListItemSerializer(serializers.ModelSerializer):
 
 
 # Simplified serializers for list views (without nested data)
-class GroceryListSimpleSerializer(serializers.ModelSerializer):
+class GroceryListSimpleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     owner_username = serializers.CharField(source="owner.username", read_only=True)
     shared_with = UserSerializer(many=True, read_only=True)
     item_count = serializers.SerializerMethodField()
     owner = serializers.PrimaryKeyRelatedField(read_only=True)
+    compact_fields = ["id", "name", "is_active", "item_count"]
 
     class Meta:
         model = GroceryList
@@ -99,6 +236,267 @@ class GroceryListSimpleSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        method_field_sources = {"item_count": []}
 
     def get_item_count(self, obj):
-        return obj.items.count()
+        # Viewsets annotate the count; fall back for freshly saved objects
+        item_count = getattr(obj, "item_count", None)
+        return obj.items.count() if item_count is None else item_count
+
+
+class ArchivedGroceryListSerializer(GroceryListSimpleSerializer):
+    class Meta(GroceryListSimpleSerializer.Meta):
+        model = ArchivedGroceryList
+        fields = GroceryListSimpleSerializer.Meta.fields + ["archived_at"]
+
+
+class TombstoneSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Tombstone
+        fields = ["kind", "object_id", "list_id", "deleted_at"]
+
+
+class TaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = [
+            "id",
+            "name",
+            "kwargs",
+            "idempotency_key",
+            "status",
+            "attempts",
+            "max_attempts",
+            "run_at",
+            "result",
+            "last_error",
+            "created_at",
+            "finished_at",
+        ]
+        read_only_fields = [
+            "status",
+            "attempts",
+            "max_attempts",
+            "run_at",
+            "result",
+            "last_error",
+            "created_at",
+            "finished_at",
+        ]
+        # Idempotency is enqueue()'s business, not the unique validator's
+        extra_kwargs = {"idempotency_key": {"validators": []}}
+
+    def validate_kwargs(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of arguments")
+        return value
+
+
+# Read-only serializers over ``.values()`` rows for hot list endpoints. They
+# produce exactly the dicts of the ModelSerializers above without building
+# model instances or resolving dotted sources field by field.
+SKIP = object()
+
+format_datetime = serializers.DateTimeField().to_representation
+format_quantity = serializers.DecimalField(
+    max_digits=10, decimal_places=2
+).to_representation
+
+
+def column(lookup, to_representation=None):
+    """Output a single ``.values()`` column, optionally formatted"""
+    if to_representation is None:
+        return (lookup,), itemgetter(lookup)
+    return (lookup,), lambda row: to_representation(row[lookup])
+
+
+def nullable_related(lookup):
+    """
+    Output a column reached through a nullable relation. Like a dotted
+    ``source`` on a ModelSerializer, the key is left out when the relation
+    is empty.
+    """
+    return (lookup,), lambda row: SKIP if row[lookup] is None else row[lookup]
+
+
+class ValuesSerializer:
+    """
+    Minimal serializer interface (``Serializer(rows, many=True).data``) for
+    rows produced by ``get_values(queryset)``. Subclasses declare ``fields``
+    as an ordered mapping of output key to ``(lookups, getter)``; passing
+    ``fields=[...]`` selects a subset, and only the lookups those need are
+    queried.
+    """
+
+    fields = {}
+    compact_fields = None
+
+    def __init__(self, instance=None, many=False, fields=None):
+        self.instance = instance
+        self.many = many
+        self.selected = self.select(fields)
+
+    @classmethod
+    def select(cls, fields=None):
+        if fields is None:
+            return cls.fields
+        return {name: spec for name, spec in cls.fields.items() if name in fields}
+
+    @classmethod
+    def get_values(cls, queryset, fields=None):
+        lookups = dict.fromkeys(
+            lookup for lookups, _ in cls.select(fields).values() for lookup in lookups
+        )
+        return queryset.values(*lookups)
+
+    def to_representation(self, row):
+        ret = {}
+        for name, (_, getter) in self.selected.items():
+            value = getter(row)
+            if value is not SKIP:
+                ret[name] = value
+        return ret
+
+    @property
+    def data(self):
+        with timing.measure("serialize"):
+            if self.many:
+                return [self.to_representation(row) for row in self.instance]
+            return self.to_representation(self.instance)
+
+
+class ItemValuesSerializer(ValuesSerializer):
+    """Read-only counterpart of ``ItemSerializer``"""
+
+    compact_fields = ItemSerializer.compact_fields
+
+    fields = {
+        "id": column("id"),
+        "name": column("name"),
+        "category": column("category_id"),
+        "category_name": column("category__name"),
+        "description": column("description"),
+        "barcode": column("barcode"),
+        "default_unit": column("default_unit"),
+        "created_at": column("created_at", format_datetime),
+        "updated_at": column("updated_at", format_datetime),
+    }
+
+
+class GroceryListItemValuesSerializer(ValuesSerializer):
+    """Read-only counterpart of ``GroceryListItemSerializer``"""
+
+    compact_fields = GroceryListItemSerializer.compact_fields
+
+    fields = {
+        "id": column("id"),
+        "grocery_list": column("grocery_list_id"),
+        "item": column("item_id"),
+        "item_name": column("item__name"),
+        "item_category": column("item__category__name"),
+        "custom_name": column("custom_name"),
+        "display_name": (
+            ("custom_name", "item__name"),
+            lambda row: row["custom_name"] or row["item__name"],
+        ),
+        "quantity": column("quantity", format_quantity),
+        "unit": column("unit"),
+        "notes": column("notes"),
+        "is_checked": column("is_checked"),
+        "checked_at": column("checked_at", format_datetime),
+        "checked_by": column("checked_by_id"),
+        "checked_by_username": nullable_related("checked_by__username"),
+        "added_by": column("added_by_id"),
+        "added_by_username": column("added_by__username"),
+        "created_at": column("created_at", format_datetime),
+        "updated_at": column("updated_at", format_datetime),
+    }
+
+
+class GroupConcat(Aggregate):
+    """Join the group's non-null strings: ``GROUP_CONCAT``/``STRING_AGG``"""
+
+    function = "GROUP_CONCAT"
+    output_field = CharField()
+
+    def __init__(self, expression, separator=",", **extra):
+        super().__init__(expression, Value(separator), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="STRING_AGG", **extra_context)
+
+
+class ConsolidatedItemValuesSerializer(ValuesSerializer):
+    """
+    List items of the same list, item and unit merged into one row by the
+    database: quantities summed, notes joined, and checked only when every
+    merged row is. ``ids`` lists the merged rows so each can still be
+    toggled or edited.
+    """
+
+    group_by = ["grocery_list_id", "item_id", "unit"]
+    aggregates = {
+        "row_ids": GroupConcat(Cast("id", CharField())),
+        "total_quantity": Sum("quantity"),
+        "joined_notes": GroupConcat(NullIf("notes", Value("")), separator="; "),
+        "custom_name": Max("custom_name"),
+        "row_count": Count("id"),
+        "checked_count": Count("id", filter=Q(is_checked=True)),
+    }
+    compact_fields = ["ids", "display_name", "quantity", "unit", "is_checked"]
+
+    fields = {
+        "ids": (
+            ("row_ids",),
+            lambda row: sorted(int(pk) for pk in row["row_ids"].split(",")),
+        ),
+        "grocery_list": column("grocery_list_id"),
+        "item": column("item_id"),
+        "item_name": column("item__name"),
+        "item_category": column("item__category__name"),
+        "display_name": (
+            ("custom_name", "item__name"),
+            lambda row: row["custom_name"] or row["item__name"],
+        ),
+        "quantity": column("total_quantity", format_quantity),
+        "unit": column("unit"),
+        "notes": (("joined_notes",), lambda row: row["joined_notes"] or ""),
+        "count": column("row_count"),
+        "is_checked": (
+            ("row_count", "checked_count"),
+            lambda row: row["checked_count"] == row["row_count"],
+        ),
+        "any_checked": (("checked_count",), lambda row: row["checked_count"] > 0),
+    }
+
+    @classmethod
+    def get_values(cls, queryset, fields=None):
+        lookups = dict.fromkeys(
+            lookup for lookups, _ in cls.select(fields).values() for lookup in lookups
+        )
+        # The group is always the full key, whichever fields are selected;
+        # related columns depend on it and are grouped on as well
+        columns = cls.group_by + [
+            lookup
+            for lookup in lookups
+            if lookup not in cls.aggregates and lookup not in cls.group_by
+        ]
+        # Like the list's Meta.ordering: unchecked first, then by item name
+        all_checked = Case(
+            When(unchecked_count=0, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+        return (
+            queryset.order_by()
+            .values(*columns)
+            .annotate(
+                unchecked_count=Count("id", filter=Q(is_checked=False)),
+                **{
+                    name: aggregate
+                    for name, aggregate in cls.aggregates.items()
+                    if name in lookups
+                },
+            )
+            .order_by(all_checked, "item__name", "item_id", "unit", "grocery_list_id")
+        )
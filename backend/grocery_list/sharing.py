@@ -0,0 +1,130 @@
+"""
+Share and unshare a list with several users in one statement.
+
+On PostgreSQL ``share`` and ``unshare`` are a single data-modifying CTE
+each: it looks the usernames up, inserts the through rows with ``ON
+CONFLICT DO NOTHING`` (or deletes them with ``RETURNING``) and reports per
+user whether anything changed, so concurrent requests can neither
+double-share nor misreport. Other backends look the users up first and
+then issue one write with ``RETURNING`` (SQLite 3.35+), so what changed is
+still what the write reported rather than what the lookup saw.
+"""
+
+from dataclasses import dataclass, field
+from typing import List
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from .models import GroceryList
+
+Shares = GroceryList.shared_with.through
+USER_FIELDS = ["id", "username", "email", "first_name", "last_name"]
+
+
+@dataclass
+class ShareResult:
+    """User dicts that changed, usernames that did not, and unknown usernames"""
+
+    changed: List[dict] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+
+def _result(usernames, rows):
+    """Build a ShareResult from ``USER_FIELDS + [changed]`` rows"""
+    result = ShareResult()
+    found = set()
+    for *values, changed in rows:
+        user = dict(zip(USER_FIELDS, values))
+        found.add(user["username"])
+        if changed:
+            result.changed.append(user)
+        else:
+            result.unchanged.append(user["username"])
+    result.missing = [name for name in usernames if name not in found]
+    return result
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(name) for name in USER_FIELDS)
+    return quote(User._meta.db_table), quote(Shares._meta.db_table), columns
+
+
+def share(list_id, owner_id, usernames):
+    """Share the list with ``usernames``; the owner counts as already shared"""
+    if connection.vendor == "postgresql":
+        users, shares, columns = _tables()
+        sql = f"""
+            WITH requested AS (
+                SELECT {columns} FROM {users} WHERE username = ANY(%s)
+            ), inserted AS (
+                INSERT INTO {shares} (grocerylist_id, user_id)
+                SELECT %s, id FROM requested WHERE id <> %s
+                ON CONFLICT (grocerylist_id, user_id) DO NOTHING
+                RETURNING user_id
+            )
+            SELECT r.*, i.user_id IS NOT NULL
+            FROM requested r LEFT JOIN inserted i ON i.user_id = r.id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [list(usernames), list_id, owner_id])
+            return _result(usernames, cursor.fetchall())
+
+    rows = _lookup(usernames)
+    user_ids = [row[0] for row in rows if row[0] != owner_id]
+    inserted = set()
+    if user_ids:
+        users, shares, columns = _tables()
+        inserted = _returned_ids(
+            f"INSERT INTO {shares} (grocerylist_id, user_id) "
+            f"VALUES {', '.join(['(%s, %s)'] * len(user_ids))} "
+            f"ON CONFLICT (grocerylist_id, user_id) DO NOTHING RETURNING user_id",
+            [value for user_id in user_ids for value in (list_id, user_id)],
+        )
+    return _result(usernames, [(*row, row[0] in inserted) for row in rows])
+
+
+def unshare(list_id, usernames):
+    """Stop sharing the list with ``usernames``"""
+    if connection.vendor == "postgresql":
+        users, shares, columns = _tables()
+        sql = f"""
+            WITH requested AS (
+                SELECT {columns} FROM {users} WHERE username = ANY(%s)
+            ), removed AS (
+                DELETE FROM {shares}
+                WHERE grocerylist_id = %s AND user_id IN (SELECT id FROM requested)
+                RETURNING user_id
+            )
+            SELECT r.*, d.user_id IS NOT NULL
+            FROM requested r LEFT JOIN removed d ON d.user_id = r.id
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [list(usernames), list_id])
+            return _result(usernames, cursor.fetchall())
+
+    rows = _lookup(usernames)
+    user_ids = [row[0] for row in rows]
+    removed = set()
+    if user_ids:
+        users, shares, columns = _tables()
+        removed = _returned_ids(
+            f"DELETE FROM {shares} WHERE grocerylist_id = %s "
+            f"AND user_id IN ({', '.join(['%s'] * len(user_ids))}) RETURNING user_id",
+            [list_id, *user_ids],
+        )
+    return _result(usernames, [(*row, row[0] in removed) for row in rows])
+
+
+def _lookup(usernames):
+    """``USER_FIELDS`` rows for the existing usernames"""
+    return list(User.objects.filter(username__in=usernames).values_list(*USER_FIELDS))
+
+
+def _returned_ids(sql, params):
+    """Run a share write and return the user ids it reported back"""
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
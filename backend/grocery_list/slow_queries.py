@@ -0,0 +1,254 @@
+"""
+Opt-in slow query log.
+
+With ``SLOW_QUERY_LOG_MS`` set, every database connection gets a
+``SlowQueryLogger`` execute wrapper. Queries slower than the threshold are
+logged on ``grocery_list.slow_queries`` with the view that issued them and
+aggregated into ``SlowQuery`` rows by fingerprint (the SQL with literals
+and parameters replaced). The first occurrence of each fingerprint stores
+its ``EXPLAIN`` plan; with ``SLOW_QUERY_ANALYZE_RATE`` a sample of slow
+SELECTs is re-run under ``EXPLAIN ANALYZE`` instead, on backends that
+support it. ``manage.py slow_queries`` prints the top offenders.
+
+Inside a transaction the rows are not written straight away: holding the
+``calls`` row lock until the caller commits would serialize every request
+that hits the same slow query, and a rollback would take the entry with
+it. The logger buffers them instead and writes them once the connection
+is outside any transaction: on commit, at the next query run outside one
+(after a rollback), or when ``SlowQueryMiddleware`` finishes the request.
+"""
+
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+logger = logging.getLogger("grocery_list.slow_queries")
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDERS = re.compile(r"%s|\?")
+IN_LISTS = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+# Slow queries buffered per connection while a transaction is open
+MAX_PENDING = 1000
+
+# The view handling the current request, set by SlowQueryMiddleware
+current_view = ContextVar("slow_query_view", default="")
+# Set while a slow query is being recorded, so that work is not recorded
+_recording = ContextVar("slow_query_recording", default=False)
+
+
+def normalize_sql(sql):
+    """Replace literals and placeholders so similar queries compare equal"""
+    sql = PLACEHOLDERS.sub("?", LITERALS.sub("?", sql))
+    return IN_LISTS.sub("(?, ...)", " ".join(sql.split()))
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()
+
+
+def enabled():
+    return getattr(settings, "SLOW_QUERY_LOG_MS", None) is not None
+
+
+class SlowQueryLogger:
+    """``execute_wrapper`` recording queries slower than ``threshold_ms``"""
+
+    def __init__(self, threshold_ms, analyze_rate=0.0, store_params=True):
+        self.threshold_ms = threshold_ms
+        self.analyze_rate = analyze_rate
+        self.store_params = store_params
+        self.pending = []
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            threshold_ms=settings.SLOW_QUERY_LOG_MS,
+            analyze_rate=getattr(settings, "SLOW_QUERY_ANALYZE_RATE", 0.0),
+            store_params=getattr(settings, "SLOW_QUERY_LOG_PARAMS", True),
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        if _recording.get():
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        connection = context["connection"]
+        if elapsed_ms >= self.threshold_ms:
+            view = current_view.get()
+            self.log(sql, elapsed_ms, view)
+            if len(self.pending) < MAX_PENDING:
+                self.pending.append((sql, params, many, elapsed_ms, view))
+            if connection.in_atomic_block:
+                transaction.on_commit(
+                    lambda: self.flush(connection), using=connection.alias
+                )
+        if self.pending and not connection.in_atomic_block:
+            self.flush(connection)
+        return result
+
+    def log(self, sql, elapsed_ms, view):
+        normalized = normalize_sql(sql)
+        logger.warning(
+            "slow query %.1fms view=%s fingerprint=%s sql=%s",
+            elapsed_ms,
+            view or "-",
+            hashlib.sha1(normalized.encode()).hexdigest()[:12],
+            normalized,
+            extra={"slow_query": {"ms": elapsed_ms, "view": view, "sql": sql}},
+        )
+
+    def flush(self, connection):
+        """Write the buffered slow queries on ``connection``"""
+        pending, self.pending = self.pending, []
+        token = _recording.set(True)
+        try:
+            for entry in pending:
+                self.record(connection, *entry)
+        except DatabaseError:
+            # Never fail the request because of the log
+            logger.exception("Could not record slow query")
+        finally:
+            _recording.reset(token)
+
+    def record(self, connection, sql, params, many, elapsed_ms, view):
+        from .models import SlowQuery
+
+        normalized = normalize_sql(sql)
+        key = hashlib.sha1(normalized.encode()).hexdigest()
+        queries = SlowQuery.objects.using(connection.alias)
+        analyze = bool(
+            not many
+            and self.analyze_rate
+            and sql.lstrip().upper().startswith("SELECT")
+            and random.random() < self.analyze_rate
+        )
+        existing = (
+            queries.filter(fingerprint=key)
+            .values("explain", "explain_analyzed")
+            .first()
+        )
+
+        if existing is None:
+            plan, analyzed = self.explain(connection, sql, params, many, analyze)
+            try:
+                with transaction.atomic(using=connection.alias):
+                    queries.create(
+                        fingerprint=key,
+                        normalized_sql=normalized,
+                        example_sql=sql,
+                        example_params=self.format_params(params),
+                        view=view[:200],
+                        calls=1,
+                        total_ms=elapsed_ms,
+                        max_ms=elapsed_ms,
+                        explain=plan,
+                        explain_analyzed=analyzed,
+                    )
+                return
+            except IntegrityError:
+                # Another connection recorded this fingerprint first
+                existing = {"explain": "", "explain_analyzed": False}
+
+        queries.filter(fingerprint=key).update(
+            calls=F("calls") + 1,
+            total_ms=F("total_ms") + elapsed_ms,
+            max_ms=Greatest("max_ms", Value(elapsed_ms)),
+        )
+        # Keep the first plan unless a sampled ANALYZE can improve on it
+        if existing["explain"] and (existing["explain_analyzed"] or not analyze):
+            return
+        plan, analyzed = self.explain(connection, sql, params, many, analyze)
+        if plan:
+            queries.filter(fingerprint=key).update(
+                example_sql=sql,
+                example_params=self.format_params(params),
+                view=view[:200],
+                explain=plan,
+                explain_analyzed=analyzed,
+            )
+
+    def explain(self, connection, sql, params, many, analyze):
+        """Return ``(plan, analyzed)``; the plan is empty if it cannot be had"""
+        if many or not sql.lstrip().upper().startswith(EXPLAINABLE):
+            return "", False
+        for with_analyze in [True, False] if analyze else [False]:
+            try:
+                options = {"analyze": True} if with_analyze else {}
+                prefix = connection.ops.explain_query_prefix(**options)
+            except ValueError:
+                continue  # EXPLAIN ANALYZE is not supported by this backend
+            try:
+                with transaction.atomic(using=connection.alias):
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"{prefix} {sql}", params)
+                        rows = cursor.fetchall()
+                    if with_analyze:
+                        # ANALYZE executes the query; keep nothing it did
+                        transaction.set_rollback(True, using=connection.alias)
+            except DatabaseError:
+                return "", False
+            return "\n".join(" ".join(map(str, row)) for row in rows), with_analyze
+        return "", False
+
+    def format_params(self, params):
+        if not self.store_params or params is None:
+            return ""
+        return json.dumps(params, default=str)[:2000]
+
+
+def flush_pending():
+    """Write what the loggers buffered, on connections outside a transaction"""
+    for connection in connections.all(initialized_only=True):
+        if connection.in_atomic_block:
+            continue
+        for wrapper in connection.execute_wrappers:
+            if isinstance(wrapper, SlowQueryLogger) and wrapper.pending:
+                wrapper.flush(connection)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """``connection_created`` receiver adding the logger to new connections"""
+    if not any(isinstance(w, SlowQueryLogger) for w in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryLogger.from_settings())
+
+
+class SlowQueryMiddleware:
+    """Remember which view is running so slow queries can name it"""
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set(f"{request.method} {request.path}")
+        try:
+            return self.get_response(request)
+        finally:
+            current_view.reset(token)
+            flush_pending()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None)
+        if view_class is not None:
+            action = getattr(view_func, "actions", {}).get(request.method.lower())
+            name = f"{view_class.__module__}.{view_class.__name__}"
+            if action:
+                name = f"{name}.{action}"
+        else:
+            name = f"{view_func.__module__}.{view_func.__name__}"
+        current_view.set(f"{name} {request.method} {request.path}")
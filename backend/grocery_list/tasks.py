@@ -0,0 +1,233 @@
+"""
+Background tasks queued in the database.
+
+Functions decorated with ``@task`` can be queued with ``enqueue(name,
+kwargs)`` from a view or anywhere else; the call is stored as a ``Task``
+row (keyword arguments as JSON) and ``manage.py run_worker`` runs it on a
+thread or process pool. No broker is needed: workers claim due tasks with
+``SELECT ... FOR UPDATE SKIP LOCKED`` on PostgreSQL, so any number of them
+can poll the same table without handing out a task twice; other backends
+fall back to a conditional ``UPDATE`` per task. A failing task is retried
+up to ``max_attempts`` times with exponential backoff. Workers send a
+heartbeat for the tasks they run; a task whose worker died is queued again
+by the next worker that notices, or failed if it has no attempts left. An
+``idempotency_key`` makes enqueueing safe to repeat: a second call with the
+same key returns the existing task instead of queueing another one.
+"""
+
+import inspect
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import archiving, collaborators, dedupe, deletion
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = {}
+RETRY_DELAY = timedelta(seconds=30)
+# Workers refresh ``locked_at`` of the tasks they run this often; a running
+# task not refreshed for ``STALE_AFTER`` has lost its worker
+HEARTBEAT_INTERVAL = timedelta(seconds=30)
+STALE_AFTER = timedelta(minutes=5)
+
+
+def task(name=None, max_attempts=3):
+    """
+    Register a function as a background task under ``name``. Give it
+    explicit keyword parameters: ``enqueue`` checks arguments against them.
+    """
+
+    def register(func):
+        func.task_name = name or func.__name__
+        func.max_attempts = max_attempts
+        REGISTRY[func.task_name] = func
+        return func
+
+    return register
+
+
+def enqueue(name, kwargs=None, key=None, run_at=None, max_attempts=None):
+    """
+    Queue ``name`` to be called with the ``kwargs`` dict. With a ``key``, a
+    task already queued under that key is returned instead of a new one.
+    Raises ValueError for unknown tasks or arguments the task does not take.
+    """
+    if callable(name):
+        name = name.task_name
+    if name not in REGISTRY:
+        raise ValueError(f"Unknown task {name!r}")
+    kwargs = kwargs or {}
+    try:
+        inspect.signature(REGISTRY[name]).bind(**kwargs)
+    except TypeError as error:
+        raise ValueError(f"Invalid arguments for {name!r}: {error}") from error
+    fields = {
+        "name": name,
+        "kwargs": kwargs,
+        "max_attempts": max_attempts or REGISTRY[name].max_attempts,
+        "run_at": run_at or timezone.now(),
+    }
+    if key is None:
+        return Task.objects.create(**fields)
+    task, created = Task.objects.get_or_create(idempotency_key=key, defaults=fields)
+    return task
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim(worker, limit=1):
+    """Mark up to ``limit`` due tasks as running for ``worker``; returns ids"""
+    now = timezone.now()
+    due = Task.objects.filter(status=Task.QUEUED, run_at__lte=now).order_by(
+        "run_at", "id"
+    )
+    # Counted on claim, not when the run ends: a task that takes its worker
+    # down with it has used up an attempt all the same
+    running = {
+        "status": Task.RUNNING,
+        "locked_by": worker,
+        "locked_at": now,
+        "attempts": F("attempts") + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            # Rows another worker is claiming are skipped, not waited for
+            ids = list(
+                due.select_for_update(skip_locked=True).values_list("id", flat=True)[
+                    :limit
+                ]
+            )
+            Task.objects.filter(pk__in=ids).update(**running)
+        return ids
+    # Without row locks, a conditional UPDATE per task picks the one worker
+    # that gets it; each commits on its own, so SQLite never has to upgrade
+    # a read lock while other workers write
+    return [
+        task_id
+        for task_id in list(due.values_list("id", flat=True)[:limit])
+        if Task.objects.filter(pk=task_id, status=Task.QUEUED).update(**running)
+    ]
+
+
+def heartbeat(task_ids):
+    """Refresh the lock of running tasks, so they are not taken as stale"""
+    return Task.objects.filter(pk__in=task_ids, status=Task.RUNNING).update(
+        locked_at=timezone.now()
+    )
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """
+    Recover the running tasks whose worker stopped sending heartbeats:
+    queue them again, or fail those that have used up their attempts.
+    Returns ``(requeued, failed)``.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=now - stale_after)
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Task.FAILED,
+        locked_by="",
+        locked_at=None,
+        finished_at=now,
+        last_error="The worker running the task stopped responding",
+    )
+    requeued = stale.update(status=Task.QUEUED, locked_by="", locked_at=None)
+    return requeued, failed
+
+
+def execute(task_id):
+    """Run a task taken by ``claim`` and record the outcome; returns the status"""
+    task = Task.objects.get(pk=task_id)
+    func = REGISTRY.get(task.name)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task {task.name!r}")
+        task.result = func(**task.kwargs)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if func is not None and task.attempts < task.max_attempts:
+            task.status = Task.QUEUED
+            task.run_at = timezone.now() + RETRY_DELAY * 2 ** (task.attempts - 1)
+        else:
+            task.status = Task.FAILED
+            task.finished_at = timezone.now()
+        logger.warning("Task %s failed (attempt %s)", task, task.attempts)
+    else:
+        task.status = Task.DONE
+        task.finished_at = timezone.now()
+    task.locked_by, task.locked_at = "", None
+    task.save()
+    return task.status
+
+
+def execute_in_pool(task_id):
+    """
+    ``execute`` for pool workers. Module level, so process pools can pickle
+    it; each worker thread or process holds its own connection, closed here
+    so none outlives ``CONN_MAX_AGE``.
+    """
+    try:
+        return execute(task_id)
+    finally:
+        close_old_connections()
+
+
+@task("dedupe_items", max_attempts=1)
+def dedupe_items(
+    threshold=dedupe.DEFAULT_THRESHOLD,
+    window=dedupe.DEFAULT_WINDOW,
+    batch_size=500,
+    category_ids=None,
+):
+    result = dedupe.run(
+        dry_run=False,
+        threshold=threshold,
+        window=window,
+        batch_size=batch_size,
+        category_ids=category_ids,
+    )
+    return {
+        "scanned": result.scanned,
+        "groups": result.groups,
+        "merged": result.merged,
+        "repointed": result.repointed,
+    }
+
+
+@task("purge_deleted")
+def purge_deleted(
+    grace_minutes=deletion.DEFAULT_GRACE_MINUTES,
+    tombstone_days=deletion.DEFAULT_TOMBSTONE_DAYS,
+    batch_size=1000,
+):
+    result = deletion.purge(grace_minutes, tombstone_days, batch_size)
+    return {
+        "lists": result.lists,
+        "items": result.items,
+        "tombstones": result.tombstones,
+    }
+
+
+@task("archive_lists")
+def archive_lists(
+    days=archiving.DEFAULT_DAYS,
+    inactive_days=archiving.DEFAULT_INACTIVE_DAYS,
+    batch_size=500,
+):
+    result = archiving.archive_stale(days, inactive_days, batch_size)
+    return {"lists": result.lists, "items": result.items}
+
+
+@task("rebuild_collaborators")
+def rebuild_collaborators(user_ids=None):
+    return {"rows": collaborators.rebuild(user_ids)}
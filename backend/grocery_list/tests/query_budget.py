@@ -0,0 +1,53 @@
+from collections import Counter
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from grocery_list.slow_queries import normalize_sql
+
+
+def duplicated_sql(queries):
+    """Return ``[(count, sql)]`` for every statement shape run more than once."""
+    counts = Counter(normalize_sql(query["sql"]) for query in queries)
+    return [(count, sql) for sql, count in counts.most_common() if count > 1]
+
+
+def query_report(queries):
+    """Describe captured queries, repeated statements first."""
+    total = sum(float(query["time"]) for query in queries)
+    lines = [f"{len(queries)} queries in {total * 1000:.1f}ms"]
+    duplicates = duplicated_sql(queries)
+    if duplicates:
+        lines.append("Duplicated SQL:")
+        lines.extend(f"  {count}x {sql}" for count, sql in duplicates)
+    lines.append("All queries:")
+    lines.extend(f"  {n}. {query['sql']}" for n, query in enumerate(queries, start=1))
+    return "\n".join(lines)
+
+
+@contextmanager
+def query_budget(max_queries, max_time=None, label="block"):
+    """
+    Fail when the block runs more than ``max_queries`` queries or spends
+    more than ``max_time`` seconds in the database.
+
+    The failure message lists repeated statement shapes, which is usually
+    all it takes to spot an N+1.
+    """
+    with CaptureQueriesContext(connection) as context:
+        yield context
+
+    queries = context.captured_queries
+    elapsed = sum(float(query["time"]) for query in queries)
+    problems = []
+    if len(queries) > max_queries:
+        problems.append(f"{len(queries)} queries, budget is {max_queries}")
+    if max_time is not None and elapsed > max_time:
+        problems.append(
+            f"{elapsed * 1000:.1f}ms in queries, budget is {max_time * 1000:.0f}ms"
+        )
+    if problems:
+        raise AssertionError(
+            f"{label} over budget: {'; '.join(problems)}\n{query_report(queries)}"
+        )
@@ -0,0 +1,202 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import archiving, dedupe, deletion
+from grocery_list.models import (
+    ArchivedGroceryList,
+    ArchivedGroceryListItem,
+    GroceryList,
+    GroceryListItem,
+)
+from grocery_list.tests.factories import (
+    GroceryListFactory,
+    GroceryListItemFactory,
+    ItemFactory,
+    UserFactory,
+)
+
+
+def age(grocery_list, days):
+    """Backdate a list and its items, bypassing auto_now"""
+    updated_at = timezone.now() - timedelta(days=days)
+    GroceryList.objects.filter(pk=grocery_list.pk).update(updated_at=updated_at)
+    GroceryListItem.objects.filter(grocery_list=grocery_list).update(
+        updated_at=updated_at
+    )
+
+
+@pytest.fixture
+def old_list(db):
+    """A year-old list, shared, with two items."""
+    grocery_list = GroceryListFactory(name="Last year")
+    grocery_list.shared_with.add(UserFactory())
+    GroceryListItemFactory.create_batch(2, grocery_list=grocery_list)
+    age(grocery_list, 400)
+    return grocery_list
+
+
+@pytest.mark.integration
+class TestStaleLists:
+    """Test cases for picking the lists to archive."""
+
+    def test_old_and_old_inactive_lists_are_stale(self, old_list):
+        """Test the two age limits."""
+        inactive = GroceryListFactory(is_active=False)
+        age(inactive, 40)
+        recent_inactive = GroceryListFactory(is_active=False)
+        age(recent_inactive, 5)
+        active = GroceryListFactory()
+        age(active, 40)
+
+        stale = set(archiving.stale_lists().values_list("id", flat=True))
+
+        assert {old_list.id, inactive.id} <= stale
+        assert not {recent_inactive.id, active.id} & stale
+
+    def test_recently_updated_items_keep_a_list(self, old_list):
+        """Test that checking an item off counts as using its list."""
+        list_item = old_list.items.first()
+        list_item.is_checked = True
+        list_item.save()
+
+        assert not archiving.stale_lists().filter(pk=old_list.pk).exists()
+
+
+@pytest.mark.integration
+class TestArchive:
+    """Test cases for moving lists to the archive and back."""
+
+    def test_archive_moves_list_shares_and_items(self, old_list):
+        """Test that the rows leave the live tables with their ids."""
+        item_ids = set(old_list.items.values_list("id", flat=True))
+        shared_ids = set(old_list.shared_with.values_list("id", flat=True))
+
+        assert archiving.archive([old_list.id]) == (1, 2)
+
+        assert not GroceryList.objects.filter(pk=old_list.pk).exists()
+        assert not GroceryListItem.objects.filter(pk__in=item_ids).exists()
+        archived = ArchivedGroceryList.objects.get(pk=old_list.pk)
+        assert (archived.name, archived.owner_id) == ("Last year", old_list.owner_id)
+        assert set(archived.items.values_list("id", flat=True)) == item_ids
+        assert set(archived.shared_with.values_list("id", flat=True)) == shared_ids
+
+    def test_deleted_items_are_not_archived(self, old_list):
+        """Test that soft-deleted items are dropped instead of archived."""
+        deletion.delete_item(old_list.items.first())
+
+        assert archiving.archive([old_list.id]) == (1, 1)
+        assert not GroceryListItem.all_objects.filter(grocery_list=old_list).exists()
+
+    def test_restore_moves_them_back(self, old_list):
+        """Test that a restored list is live again and not stale."""
+        item_ids = set(old_list.items.values_list("id", flat=True))
+        archiving.archive([old_list.id])
+
+        assert archiving.restore([old_list.id]) == (1, 2)
+
+        restored = GroceryList.objects.get(pk=old_list.pk)
+        assert set(restored.items.values_list("id", flat=True)) == item_ids
+        assert restored.shared_with.count() == 1
+        assert not ArchivedGroceryList.objects.filter(pk=old_list.pk).exists()
+        assert not archiving.stale_lists().filter(pk=old_list.pk).exists()
+
+    def test_dedupe_repoints_archived_items(self, old_list):
+        """Test that merging catalog items keeps archived items valid."""
+        list_item = old_list.items.first()
+        kept = ItemFactory(
+            name=list_item.item.name.upper(), category=list_item.item.category
+        )
+        GroceryListItemFactory.create_batch(2, item=kept)
+        archiving.archive([old_list.id])
+
+        dedupe.run(dry_run=False, category_ids=[kept.category_id])
+
+        assert ArchivedGroceryListItem.objects.get(pk=list_item.pk).item_id == kept.id
+
+    def test_command_archives_in_batches(self, db, capsys):
+        """Test archive_lists in dry run and batched modes."""
+        lists = GroceryListFactory.create_batch(3)
+        for grocery_list in lists:
+            GroceryListItemFactory(grocery_list=grocery_list)
+            age(grocery_list, 400)
+        ids = [grocery_list.id for grocery_list in lists]
+
+        call_command("archive_lists", "--dry-run")
+        report = capsys.readouterr().out
+        call_command("archive_lists", "--batch-size", "2")
+
+        assert "Dry run:" in report
+        assert not GroceryList.objects.filter(pk__in=ids).exists()
+        assert ArchivedGroceryList.objects.filter(pk__in=ids).count() == 3
+        assert "Archived" in capsys.readouterr().out
+
+
+@pytest.mark.api
+class TestArchivedListsView:
+    """Test cases for ?archived=1 on /api/grocery-lists/."""
+
+    @pytest.fixture
+    def authenticated_client(self, old_list):
+        token, created = Token.objects.get_or_create(user=old_list.owner)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        archiving.archive([old_list.id])
+        return client
+
+    def test_archived_lists_are_hidden_by_default(self, authenticated_client, old_list):
+        """Test that the default listing only reads live lists."""
+        response = authenticated_client.get("/api/grocery-lists/")
+
+        assert old_list.id not in [row["id"] for row in response.data["results"]]
+
+    def test_archived_lists_are_listed_on_request(self, authenticated_client, old_list):
+        """Test that ?archived=1 lists and retrieves archived lists."""
+        response = authenticated_client.get("/api/grocery-lists/?archived=1")
+        detail = authenticated_client.get(
+            f"/api/grocery-lists/{old_list.id}/?archived=1"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        (row,) = response.data["results"]
+        assert (row["id"], row["item_count"]) == (old_list.id, 2)
+        assert row["archived_at"] is not None
+        assert detail.data["name"] == "Last year"
+
+    def test_add_item_to_list_archived_meanwhile(
+        self, authenticated_client, old_list, mocker
+    ):
+        """Test that add_item answers 404 when the list is archived under it."""
+        archiving.restore([old_list.id])
+        live_list = GroceryList.objects.get(pk=old_list.pk)
+
+        def archived_after_lookup():
+            archiving.archive([old_list.id])
+            return live_list
+
+        mocker.patch(
+            "grocery_list.views.GroceryListViewSet.get_object",
+            side_effect=archived_after_lookup,
+        )
+        response = authenticated_client.post(
+            f"/api/grocery-lists/{old_list.id}/add_item/",
+            {"item_id": ItemFactory().id},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert not GroceryListItem.all_objects.filter(grocery_list=old_list).exists()
+
+    def test_archived_lists_are_read_only(self, authenticated_client, old_list):
+        """Test that writes through ?archived=1 are refused."""
+        response = authenticated_client.patch(
+            f"/api/grocery-lists/{old_list.id}/?archived=1", {"name": "New"}
+        )
+
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
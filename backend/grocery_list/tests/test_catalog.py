@@ -0,0 +1,240 @@
+import gzip
+import json
+
+from django.core.cache import caches
+from django.db import transaction
+
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import catalog
+from grocery_list.catalog import brotli, get_snapshot
+from grocery_list.models import Category, Item
+from grocery_list.tests.factories import CategoryFactory, ItemFactory, UserFactory
+
+SNAPSHOT_URL = "/api/catalog/snapshot/"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    caches["local"].clear()
+    yield
+    caches["local"].clear()
+
+
+@pytest.fixture
+def authenticated_client(db):
+    """Return an authenticated API client."""
+    user = UserFactory()
+    token, created = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def decode(snapshot):
+    return json.loads(snapshot.body)
+
+
+@pytest.mark.unit
+class TestCatalogSnapshot:
+    """Test cases for building and maintaining the catalog snapshot."""
+
+    def test_snapshot_contains_catalog(self, db):
+        """Test that the snapshot holds every category and item."""
+        Item.objects.all().delete()
+        Category.objects.all().delete()
+        dairy = CategoryFactory(name="Dairy")
+        ItemFactory(name="Milk", category=dairy, default_unit="gallon", barcode="1")
+
+        data = decode(get_snapshot())
+
+        assert data["categories"] == [[dairy.id, "Dairy"]]
+        assert data["item_fields"] == [
+            "id",
+            "name",
+            "category",
+            "default_unit",
+            "barcode",
+        ]
+        assert len(data["items"]) == 1
+        assert data["items"][0][1:] == ["Milk", dairy.id, "gallon", "1"]
+
+    def test_snapshot_is_cached(self, db, django_assert_num_queries):
+        """Test that a freshly checked snapshot is served without queries."""
+        ItemFactory()
+        first = get_snapshot()
+
+        with django_assert_num_queries(0):
+            second = get_snapshot()
+
+        assert first == second
+
+    def test_item_change_patches_snapshot(
+        self, db, mocker, django_assert_num_queries, django_capture_on_commit_callbacks
+    ):
+        """Test that saving an item re-reads only that item."""
+        item = ItemFactory(name="Bread")
+        before = get_snapshot()
+        load_rows = mocker.spy(catalog, "load_rows")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            item.name = "Sourdough"
+            item.save()
+
+        # The version, the change log and the changed item
+        with django_assert_num_queries(3):
+            after = get_snapshot()
+
+        load_rows.assert_not_called()
+        assert after.version != before.version
+        names = [row[1] for row in decode(after)["items"]]
+        assert "Sourdough" in names
+        assert "Bread" not in names
+
+    def test_item_delete_removes_row(self, db, django_capture_on_commit_callbacks):
+        """Test that deleting an item drops it from the snapshot."""
+        item = ItemFactory()
+        get_snapshot()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            item_id = item.id
+            item.delete()
+
+        ids = [row[0] for row in decode(get_snapshot())["items"]]
+        assert item_id not in ids
+
+    def test_change_from_another_process_is_seen(self, db, mocker):
+        """Test writes that send no signal to this process's cache."""
+        item = ItemFactory(name="Butter")
+        other = ItemFactory(name="Lard", category=item.category)
+        before = get_snapshot()
+        load_rows = mocker.spy(catalog, "load_rows")
+
+        # What another worker's writes look like from here: a delete and an
+        # insert leave the row count alone, and nothing in this process is
+        # told about any of them
+        Item.objects.filter(pk=item.pk).update(name="Margarine")
+        Item.objects.filter(pk=other.pk).delete()
+        Item.objects.bulk_create([Item(name="Ghee", category=item.category)])
+        assert get_snapshot() == before
+
+        caches["local"].delete(catalog.CHECKED_CACHE_KEY)  # the interval passes
+        after = get_snapshot()
+
+        load_rows.assert_not_called()
+        names = {row[1] for row in decode(after)["items"]}
+        assert {"Margarine", "Ghee"} <= names
+        assert not {"Butter", "Lard"} & names
+        assert after.version != before.version
+
+    def test_version_moves_with_the_writing_transaction(self, db):
+        """Test that the counter is bumped inside the write's transaction."""
+        start = catalog.current_version()
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                ItemFactory()
+                assert catalog.current_version() > start
+                raise RuntimeError
+
+        assert catalog.current_version() == start
+
+    def test_long_gap_reloads_everything(self, db, mocker):
+        """Test that too many changes fall back to a full reload."""
+        mocker.patch.object(catalog, "INCREMENTAL_LIMIT", 1)
+        category = CategoryFactory()
+        get_snapshot()
+        load_rows = mocker.spy(catalog, "load_rows")
+
+        ItemFactory.create_batch(2, category=category)
+        caches["local"].delete(catalog.CHECKED_CACHE_KEY)
+        get_snapshot()
+
+        load_rows.assert_called_once()
+
+    def test_identical_content_has_identical_version(self, db):
+        """Test that the version is a pure content hash."""
+        ItemFactory()
+        first = get_snapshot()
+        caches["local"].clear()
+
+        assert get_snapshot() == first
+
+
+@pytest.mark.api
+class TestCatalogSnapshotView:
+    """Test cases for the catalog snapshot endpoint."""
+
+    def test_requires_authentication(self, db):
+        """Test that the snapshot is not public."""
+        response = APIClient().get(SNAPSHOT_URL)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_plain_response(self, authenticated_client):
+        """Test fetching the uncompressed snapshot."""
+        ItemFactory(name="Eggs")
+
+        response = authenticated_client.get(SNAPSHOT_URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "application/json"
+        assert "Content-Encoding" not in response
+        assert response["ETag"] == f'"{response["X-Catalog-Version"]}"'
+        assert response["Cache-Control"] == "private, no-cache"
+        assert "Accept-Encoding" in response["Vary"]
+        names = [row[1] for row in json.loads(response.content)["items"]]
+        assert "Eggs" in names
+
+    def test_gzip_response(self, authenticated_client):
+        """Test that gzip is served to clients that accept it."""
+        ItemFactory()
+
+        response = authenticated_client.get(
+            SNAPSHOT_URL, HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+
+        assert response["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == get_snapshot().body
+
+    @pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+    def test_brotli_preferred(self, authenticated_client):
+        """Test that brotli wins over gzip when both are accepted."""
+        ItemFactory()
+
+        response = authenticated_client.get(
+            SNAPSHOT_URL, HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+
+        assert response["Content-Encoding"] == "br"
+        assert brotli.decompress(response.content) == get_snapshot().body
+
+    def test_if_none_match_returns_not_modified(self, authenticated_client):
+        """Test conditional requests with the snapshot ETag."""
+        ItemFactory()
+        etag = authenticated_client.get(SNAPSHOT_URL)["ETag"]
+
+        response = authenticated_client.get(SNAPSHOT_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.content == b""
+
+    def test_versioned_url_is_immutable(self, authenticated_client):
+        """Test that requests pinned to the current hash are cached long-term."""
+        ItemFactory()
+        version = get_snapshot().version
+
+        response = authenticated_client.get(f"{SNAPSHOT_URL}?v={version}")
+
+        assert "immutable" in response["Cache-Control"]
+
+    def test_stale_version_is_revalidated(self, authenticated_client):
+        """Test that an outdated hash does not get long-lived caching."""
+        ItemFactory()
+
+        response = authenticated_client.get(f"{SNAPSHOT_URL}?v=outdated")
+
+        assert response["Cache-Control"] == "private, no-cache"
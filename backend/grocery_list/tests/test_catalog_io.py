@@ -0,0 +1,259 @@
+import json
+
+from django.core.cache import caches
+from django.core.management import call_command
+
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import catalog_io
+from grocery_list.catalog import get_snapshot
+from grocery_list.models import Category, Item
+from grocery_list.tests.factories import CategoryFactory, ItemFactory, UserFactory
+
+IMPORT_URL = "/api/catalog/import/"
+EXPORT_URL = "/api/catalog/export/"
+
+CSV = """name,category,default_unit,barcode,description
+Apples,Produce,lb,111,Crisp
+Milk,Dairy,gallon,,
+Bread,Bakery,,222,Sourdough
+"""
+
+
+def lines(text):
+    return text.splitlines(keepends=True)
+
+
+def catalog():
+    return set(
+        Item.objects.values_list(
+            "name", "category__name", "default_unit", "barcode", "description"
+        )
+    )
+
+
+def client_for(user):
+    token, created = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+@pytest.mark.unit
+class TestCatalogImport:
+    """Test cases for upserting catalog files."""
+
+    def test_import_creates_items_and_categories(self, db):
+        """Test that rows and their new categories are created."""
+        CategoryFactory(name="Produce")
+
+        result = catalog_io.import_catalog(lines(CSV))
+
+        assert (result.imported, result.skipped, result.categories_created) == (
+            3,
+            0,
+            2,
+        )
+        assert {
+            ("Apples", "Produce", "lb", "111", "Crisp"),
+            ("Milk", "Dairy", "gallon", None, ""),
+            ("Bread", "Bakery", "piece", "222", "Sourdough"),
+        } <= catalog()
+
+    def test_categories_created_meanwhile_are_not_counted(self, db):
+        """Test that only the categories this import inserted are counted."""
+        produce = CategoryFactory(name="Produce")
+        result = catalog_io.ImportResult()
+        chunk = [
+            catalog_io.clean(record) for _, record in catalog_io.read_csv(lines(CSV))
+        ]
+
+        # As if another import created Produce after this one loaded the map
+        catalog_io._upsert(chunk, {}, result)
+
+        assert result.categories_created == 2
+        assert Item.objects.get(name="Apples").category == produce
+
+    def test_import_updates_existing_items(self, db):
+        """Test that rows matching name and category update in place."""
+        produce = CategoryFactory(name="Produce")
+        apples = ItemFactory(name="Apples", category=produce, default_unit="piece")
+        csv = "name,category,default_unit\nApples,Produce,kg\nApples,Produce,box\n"
+
+        catalog_io.import_catalog(lines(csv), batch_size=10)
+
+        apples.refresh_from_db()
+        assert apples.default_unit == "box"
+        assert Item.objects.filter(name="Apples", category=produce).count() == 1
+
+    def test_import_reports_rejected_lines(self, db):
+        """Test that invalid rows are skipped with their line numbers."""
+        csv = "name,category\nGood,Produce\n,Produce\nNo category,\n"
+
+        result = catalog_io.import_catalog(lines(csv))
+
+        assert (result.imported, result.skipped) == (1, 2)
+        assert result.errors == [
+            {"line": 3, "error": "Missing name"},
+            {"line": 4, "error": "Missing category"},
+        ]
+
+    def test_import_jsonl(self, db):
+        """Test that JSON Lines records are imported and bad lines rejected."""
+        records = [
+            json.dumps({"name": "Tea", "category": "Drinks", "barcode": 333}),
+            "",
+            "not json",
+            json.dumps({"name": "Coffee", "category": "Drinks"}),
+        ]
+
+        result = catalog_io.import_catalog(
+            [line + "\n" for line in records], format="jsonl"
+        )
+
+        assert result.imported == 2
+        assert result.errors == [{"line": 3, "error": "Not a JSON object"}]
+        assert Item.objects.get(name="Tea").barcode == "333"
+
+    def test_import_writes_chunks_as_it_reads(self, db):
+        """Test that earlier chunks are stored before the input is exhausted."""
+        stored_while_reading = []
+
+        def rows():
+            yield "name,category\n"
+            for n in range(10):
+                stored_while_reading.append(
+                    Item.objects.filter(name__startswith="Row").count()
+                )
+                yield f"Row {n},Streaming\n"
+
+        catalog_io.import_catalog(rows(), batch_size=4)
+
+        assert stored_while_reading == [0, 0, 0, 0, 4, 4, 4, 4, 8, 8]
+        assert Item.objects.filter(name__startswith="Row").count() == 10
+
+    def test_import_refreshes_snapshot(self, db, django_capture_on_commit_callbacks):
+        """Test that the cached catalog snapshot sees imported items."""
+        caches["local"].clear()
+        get_snapshot()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            catalog_io.import_catalog(lines(CSV))
+
+        names = {row[1] for row in json.loads(get_snapshot().body)["items"]}
+        assert {"Apples", "Milk", "Bread"} <= names
+        caches["local"].clear()
+
+    def test_unknown_format_is_rejected(self, db):
+        """Test that only CSV and JSON Lines are accepted."""
+        with pytest.raises(ValueError):
+            catalog_io.import_catalog([], format="xml")
+
+
+@pytest.mark.unit
+class TestCatalogExport:
+    """Test cases for streaming the catalog out."""
+
+    @pytest.mark.parametrize("format", catalog_io.FORMATS)
+    def test_export_round_trips(self, db, format):
+        """Test that an exported catalog imports back to the same rows."""
+        catalog_io.import_catalog(lines(CSV))
+        before = catalog()
+
+        exported = b"".join(catalog_io.export_catalog(format, chunk_size=2))
+        Item.objects.all().delete()
+        catalog_io.import_catalog(
+            catalog_io.decode_lines(exported.splitlines(keepends=True)), format
+        )
+
+        assert catalog() == before
+
+    def test_export_yields_one_chunk_per_batch(self, db):
+        """Test that the export is produced incrementally."""
+        category = CategoryFactory()
+        ItemFactory.create_batch(5, category=category)
+
+        chunks = list(catalog_io.export_catalog("jsonl", chunk_size=2))
+
+        assert len(chunks) == (Item.objects.count() + 1) // 2
+
+
+@pytest.mark.api
+class TestCatalogImportExportViews:
+    """Test cases for the catalog import and export endpoints."""
+
+    def test_import_requires_staff(self, db):
+        """Test that regular users cannot bulk import."""
+        response = client_for(UserFactory()).generic(
+            "POST", IMPORT_URL, CSV, content_type="text/csv"
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_import_csv_body(self, db):
+        """Test that staff can upsert a CSV body."""
+        staff = UserFactory(is_staff=True)
+
+        response = client_for(staff).generic(
+            "POST", IMPORT_URL, CSV.encode(), content_type="text/csv; charset=utf-8"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert (data["imported"], data["skipped"], data["errors"]) == (3, 0, [])
+        assert Category.objects.filter(name="Bakery").exists()
+
+    def test_import_rejects_other_content_types(self, db):
+        """Test that JSON bodies are refused with 415."""
+        staff = UserFactory(is_staff=True)
+
+        response = client_for(staff).post(IMPORT_URL, {"name": "x"}, format="json")
+
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    def test_export_streams_jsonl(self, db):
+        """Test that the export is a streamed attachment."""
+        ItemFactory(name="Exported", category=CategoryFactory(name="Things"))
+
+        response = client_for(UserFactory()).get(EXPORT_URL, {"output": "jsonl"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/x-ndjson"
+        assert "catalog.jsonl" in response["Content-Disposition"]
+        records = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        assert {"name": "Exported", "category": "Things"}.items() <= next(
+            record for record in records if record["name"] == "Exported"
+        ).items()
+
+    def test_export_rejects_unknown_output(self, db):
+        """Test that an unknown output format is a 400."""
+        response = client_for(UserFactory()).get(EXPORT_URL, {"output": "xml"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.integration
+class TestCatalogCommands:
+    """Test cases for the import_catalog and export_catalog commands."""
+
+    def test_commands_round_trip(self, db, tmp_path, capsys):
+        """Test that an exported file can be imported again."""
+        source = tmp_path / "catalog.csv"
+        source.write_text(CSV)
+        call_command("import_catalog", str(source))
+        before = catalog()
+
+        exported = tmp_path / "catalog.jsonl"
+        call_command("export_catalog", "--output", str(exported))
+        Item.objects.all().delete()
+        call_command("import_catalog", str(exported))
+
+        assert catalog() == before
+        assert "Imported" in capsys.readouterr().out
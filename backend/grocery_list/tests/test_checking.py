@@ -0,0 +1,85 @@
+import threading
+
+from django.db import connection
+
+import pytest
+
+from grocery_list import checking
+from grocery_list.models import GroceryListItem
+from grocery_list.tests.factories import (
+    GroceryListFactory,
+    GroceryListItemFactory,
+    UserFactory,
+)
+
+TOGGLES_PER_SHOPPER = 10
+
+
+@pytest.mark.integration
+class TestToggleChecked:
+    """Test cases for toggling an item's checked state in one statement."""
+
+    def test_toggle_sets_and_clears_checker(self, db):
+        """Test that checking records who checked and unchecking clears it."""
+        owner = UserFactory()
+        item = GroceryListItemFactory(grocery_list=GroceryListFactory(owner=owner))
+
+        checked = checking.toggle_checked(item.id, owner)
+        item.refresh_from_db()
+        assert checked["is_checked"] is True
+        assert (item.is_checked, item.checked_by_id) == (True, owner.id)
+        assert item.checked_at == checked["checked_at"]
+
+        unchecked = checking.toggle_checked(item.id, owner)
+        item.refresh_from_db()
+        assert unchecked["is_checked"] is False
+        assert (item.is_checked, item.checked_by_id, item.checked_at) == (
+            False,
+            None,
+            None,
+        )
+
+    def test_toggle_requires_access(self, db):
+        """Test that strangers cannot toggle and shared users can."""
+        owner, friend, stranger = UserFactory.create_batch(3)
+        grocery_list = GroceryListFactory(owner=owner)
+        grocery_list.shared_with.add(friend)
+        item = GroceryListItemFactory(grocery_list=grocery_list)
+
+        assert checking.toggle_checked(item.id, stranger) is None
+        assert checking.toggle_checked(item.id, friend)["checked_by"] == friend.id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_toggles_are_not_lost(self):
+        """Test that two shoppers toggling the same item never lose a flip."""
+        owner, friend = UserFactory.create_batch(2)
+        grocery_list = GroceryListFactory(owner=owner)
+        grocery_list.shared_with.add(friend)
+        item = GroceryListItemFactory(grocery_list=grocery_list, is_checked=False)
+
+        start = threading.Barrier(2)
+        results = []
+        errors = []
+
+        def shop(user):
+            try:
+                start.wait()
+                for _ in range(TOGGLES_PER_SHOPPER):
+                    results.append(checking.toggle_checked(item.id, user)["is_checked"])
+            except Exception as error:  # pragma: no cover - reported below
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=shop, args=(u,)) for u in (owner, friend)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        # Every flip was applied once, so the states returned alternate and
+        # an even number of toggles leaves the item as it started
+        assert len(results) == 2 * TOGGLES_PER_SHOPPER
+        assert results.count(True) == TOGGLES_PER_SHOPPER
+        assert GroceryListItem.objects.get(pk=item.pk).is_checked is False
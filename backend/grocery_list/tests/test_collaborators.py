@@ -0,0 +1,134 @@
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import collaborators
+from grocery_list.models import CollaboratorAffinity
+from grocery_list.tests.factories import GroceryListFactory, UserFactory
+
+
+def affinities():
+    return set(
+        CollaboratorAffinity.objects.values_list(
+            "user_id", "collaborator_id", "shared_lists"
+        )
+    )
+
+
+@pytest.mark.integration
+class TestCollaboratorAffinity:
+    """Test cases for maintaining collaborator affinities."""
+
+    def test_shares_count_both_ways(self, db):
+        """Test that each share counts for both users of the pair."""
+        owner, friend = UserFactory.create_batch(2)
+
+        collaborators.record_shares(owner.id, [friend.id])
+        collaborators.record_shares(owner.id, [friend.id])
+
+        assert affinities() == {(owner.id, friend.id, 2), (friend.id, owner.id, 2)}
+
+    def test_unshares_decrement_and_drop_empty_pairs(self, db):
+        """Test that a pair disappears with its last shared list."""
+        owner, friend = UserFactory.create_batch(2)
+        collaborators.record_shares(owner.id, [friend.id])
+        collaborators.record_shares(owner.id, [friend.id])
+
+        collaborators.record_unshares(owner.id, [friend.id])
+        assert affinities() == {(owner.id, friend.id, 1), (friend.id, owner.id, 1)}
+
+        collaborators.record_unshares(owner.id, [friend.id])
+        assert affinities() == set()
+
+    def test_rebuild_matches_list_shares(self, db):
+        """Test that rebuild derives the same counts from shared_with."""
+        alice, bob, carol = UserFactory.create_batch(3)
+        GroceryListFactory(owner=alice).shared_with.add(bob, carol)
+        GroceryListFactory(owner=bob).shared_with.add(alice)
+        # Stale row for a pair that no longer shares anything
+        collaborators.record_shares(carol.id, [bob.id])
+
+        collaborators.rebuild([alice.id, bob.id, carol.id])
+
+        assert affinities() == {
+            (alice.id, bob.id, 2),
+            (bob.id, alice.id, 2),
+            (alice.id, carol.id, 1),
+            (carol.id, alice.id, 1),
+        }
+
+
+@pytest.mark.api
+class TestSuggestedCollaborators:
+    """Test cases for the users/suggested/ endpoint."""
+
+    @pytest.fixture
+    def user(self, db):
+        return UserFactory(username="suggest_owner")
+
+    @pytest.fixture
+    def authenticated_client(self, user):
+        """Return an authenticated API client."""
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    def share(self, client, grocery_list, username, action="share_with"):
+        response = client.post(
+            f"/api/grocery-lists/{grocery_list.id}/{action}/",
+            {"username": username},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_ranked_by_shared_lists(self, authenticated_client, user):
+        """Test that the most frequent collaborator comes first."""
+        lists = GroceryListFactory.create_batch(2, owner=user)
+        often = UserFactory(username="suggest_often")
+        once = UserFactory(username="suggest_once")
+        self.share(authenticated_client, lists[0], "suggest_once")
+        self.share(authenticated_client, lists[0], "suggest_often")
+        self.share(authenticated_client, lists[1], "suggest_often")
+
+        response = authenticated_client.get("/api/users/suggested/")
+
+        assert response.status_code == status.HTTP_200_OK
+        results = response.json()["results"]
+        assert [u["username"] for u in results] == ["suggest_often", "suggest_once"]
+        assert results[0]["id"] == often.id
+        assert results[0]["shared_lists"] == 2
+        assert results[1]["id"] == once.id
+
+    def test_unshare_is_seen_at_once(self, authenticated_client, user):
+        """Test that the next request reflects a removed collaborator."""
+        grocery_list = GroceryListFactory(owner=user)
+        UserFactory(username="suggest_friend")
+        self.share(authenticated_client, grocery_list, "suggest_friend")
+        response = authenticated_client.get("/api/users/suggested/")
+        assert response.json()["results"][0]["username"] == "suggest_friend"
+
+        self.share(authenticated_client, grocery_list, "suggest_friend", "remove_user")
+
+        response = authenticated_client.get("/api/users/suggested/")
+        assert response.json()["results"] == []
+
+    def test_deleting_a_list_forgets_its_shares(self, authenticated_client, user):
+        """Test that list deletion counts as removing its collaborators."""
+        grocery_list = GroceryListFactory(owner=user)
+        friend = UserFactory()
+        self.share(authenticated_client, grocery_list, friend.username)
+
+        authenticated_client.delete(f"/api/grocery-lists/{grocery_list.id}/")
+
+        assert not CollaboratorAffinity.objects.filter(user=friend).exists()
+
+    def test_inactive_collaborators_are_hidden(self, authenticated_client, user):
+        """Test that deactivated users are not suggested."""
+        friend = UserFactory(is_active=False)
+        collaborators.record_shares(user.id, [friend.id])
+
+        response = authenticated_client.get("/api/users/suggested/")
+
+        assert response.json()["results"] == []
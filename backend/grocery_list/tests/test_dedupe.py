@@ -0,0 +1,128 @@
+from django.core.management import call_command
+
+import pytest
+
+from grocery_list import dedupe
+from grocery_list.models import GroceryListItem, Item
+from grocery_list.tests.factories import (
+    CategoryFactory,
+    GroceryListItemFactory,
+    ItemFactory,
+)
+
+
+def groups_by_name(category):
+    return sorted(
+        sorted(group.names.values())
+        for group in dedupe.find_duplicates(category_ids=[category.id])
+    )
+
+
+@pytest.mark.unit
+class TestItemKey:
+    """Test cases for the duplicate key of item names."""
+
+    @pytest.mark.parametrize(
+        "name, key",
+        [
+            ("Milk", "milk"),
+            ("  MILK. ", "milk"),
+            ("Crème  Fraîche", "creme fraiche"),
+            ("Eggs", "egg"),
+            ("Swiss Cheese", "swiss cheese"),
+            ("Ground-Beef", "ground beef"),
+        ],
+    )
+    def test_item_key(self, name, key):
+        """Test that case, accents, punctuation and plurals are folded."""
+        assert dedupe.item_key(name) == key
+
+
+@pytest.mark.integration
+class TestFindDuplicates:
+    """Test cases for finding duplicate candidates."""
+
+    def test_exact_and_near_matches_are_grouped(self, db):
+        """Test that normalized, reordered and misspelled names are grouped."""
+        dairy = CategoryFactory()
+        for name in [
+            "Milk",
+            "milk ",
+            "Whole Milk",
+            "Milk, Whole",
+            "Cheddar Cheese",
+            "Chedar Cheese",
+            "Butter",
+        ]:
+            ItemFactory(name=name, category=dairy)
+
+        assert groups_by_name(dairy) == [
+            ["Chedar Cheese", "Cheddar Cheese"],
+            ["Milk", "milk "],
+            ["Milk, Whole", "Whole Milk"],
+        ]
+
+    def test_categories_are_not_mixed(self, db):
+        """Test that equal names in different categories stay apart."""
+        produce, frozen = CategoryFactory.create_batch(2)
+        ItemFactory(name="Peas", category=produce)
+        ItemFactory(name="Peas", category=frozen)
+
+        assert groups_by_name(produce) == []
+
+
+@pytest.mark.integration
+class TestMerge:
+    """Test cases for merging duplicates."""
+
+    def test_merge_keeps_most_referenced_and_repoints(self, db):
+        """Test that list items move to the kept item and the rest go."""
+        dairy = CategoryFactory()
+        first = ItemFactory(name="milk", category=dairy)
+        popular = ItemFactory(name="Milk", category=dairy)
+        GroceryListItemFactory(item=first)
+        GroceryListItemFactory.create_batch(2, item=popular)
+
+        result = dedupe.run(dry_run=False, category_ids=[dairy.id])
+
+        assert (result.groups, result.merged, result.repointed) == (1, 1, 1)
+        assert not Item.objects.filter(pk=first.pk).exists()
+        assert GroceryListItem.objects.filter(item=popular).count() == 3
+
+    def test_dry_run_changes_nothing(self, db):
+        """Test that the default run only reports."""
+        dairy = CategoryFactory()
+        ItemFactory(name="Milk", category=dairy)
+        ItemFactory(name="MILK", category=dairy)
+
+        result = dedupe.run(category_ids=[dairy.id])
+
+        assert (result.groups, result.merged, result.repointed) == (1, 1, 0)
+        assert Item.objects.filter(category=dairy).count() == 2
+
+    def test_merges_span_batches(self, db):
+        """Test that groups are merged in several transactions."""
+        dairy = CategoryFactory()
+        for name in ["Milk", "MILK", "Butter", "butter", "Cream", "cream"]:
+            ItemFactory(name=name, category=dairy)
+
+        result = dedupe.run(dry_run=False, batch_size=1, category_ids=[dairy.id])
+
+        assert result.merged == 3
+        assert sorted(
+            Item.objects.filter(category=dairy).values_list("name", flat=True)
+        ) == ["Butter", "Cream", "Milk"]
+
+    def test_command_reports_and_applies(self, db, capsys):
+        """Test the dedupe_items command in both modes."""
+        dairy = CategoryFactory()
+        ItemFactory(name="Milk", category=dairy)
+        ItemFactory(name="milk", category=dairy)
+
+        call_command("dedupe_items", "--category", str(dairy.id))
+        report = capsys.readouterr().out
+        call_command("dedupe_items", "--category", str(dairy.id), "--apply")
+
+        assert "keep 'Milk'" in report and "Dry run: 1 items" in report
+        assert "items/sec" in report
+        assert Item.objects.filter(category=dairy).count() == 1
@@ -0,0 +1,160 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import deletion
+from grocery_list.models import GroceryList, GroceryListItem, Tombstone
+from grocery_list.tests.factories import (
+    GroceryListFactory,
+    GroceryListItemFactory,
+    UserFactory,
+)
+
+
+def client_for(user):
+    token, created = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def backdate(model, days, **filters):
+    """Move ``deleted_at`` back, as if deleted ``days`` ago"""
+    model.all_objects.filter(**filters).update(
+        deleted_at=timezone.now() - timedelta(days=days)
+    )
+
+
+@pytest.fixture
+def shared_list(db):
+    """A list shared with one collaborator, with three items."""
+    grocery_list = GroceryListFactory()
+    grocery_list.shared_with.add(UserFactory())
+    GroceryListItemFactory.create_batch(3, grocery_list=grocery_list)
+    return grocery_list
+
+
+@pytest.mark.integration
+class TestSoftDelete:
+    """Test cases for flagging lists and items as deleted."""
+
+    def test_deleted_list_and_its_items_are_hidden(self, shared_list):
+        """Test that the default managers skip a deleted list's rows."""
+        deletion.delete_list(shared_list)
+
+        assert not GroceryList.objects.filter(pk=shared_list.pk).exists()
+        assert not GroceryListItem.objects.filter(grocery_list=shared_list).exists()
+        assert GroceryListItem.all_objects.filter(grocery_list=shared_list).count() == 3
+
+    def test_items_are_hidden_without_joining_the_lists(self, shared_list):
+        """Test that a deleted list's items carry its deletion time."""
+        deletion.delete_list(shared_list)
+
+        deleted_at = GroceryList.all_objects.get(pk=shared_list.pk).deleted_at
+        assert set(
+            GroceryListItem.all_objects.filter(grocery_list=shared_list).values_list(
+                "deleted_at", flat=True
+            )
+        ) == {deleted_at}
+        lists_table = f'"{GroceryList._meta.db_table}"'
+        assert lists_table not in str(GroceryListItem.objects.all().query)
+
+    def test_tombstones_for_owner_and_collaborators(self, shared_list):
+        """Test that everyone who could see the list gets a tombstone."""
+        collaborator = shared_list.shared_with.get()
+        list_item = shared_list.items.first()
+
+        deletion.delete_item(list_item)
+
+        assert set(
+            Tombstone.objects.filter(object_id=list_item.pk).values_list(
+                "user_id", "kind", "list_id"
+            )
+        ) == {
+            (shared_list.owner_id, "item", shared_list.pk),
+            (collaborator.id, "item", shared_list.pk),
+        }
+        assert shared_list.items.count() == 2
+
+
+@pytest.mark.integration
+class TestPurge:
+    """Test cases for physically removing deleted rows."""
+
+    def test_purge_removes_rows_after_the_grace_period(self, shared_list):
+        """Test that only rows deleted long enough ago are removed."""
+        kept = GroceryListItemFactory()
+        deletion.delete_item(kept)
+        deletion.delete_list(shared_list)
+        backdate(GroceryList, 1, pk=shared_list.pk)
+
+        result = deletion.purge(batch_size=2)
+
+        assert (result.lists, result.items) == (1, 3)
+        assert not GroceryList.all_objects.filter(pk=shared_list.pk).exists()
+        assert GroceryListItem.all_objects.filter(pk=kept.pk).exists()
+        assert Tombstone.objects.filter(list_id=shared_list.pk).count() == 2
+
+    def test_purge_drops_old_tombstones(self, shared_list):
+        """Test that tombstones expire and the command reports counts."""
+        deletion.delete_list(shared_list)
+        Tombstone.objects.filter(list_id=shared_list.pk).update(
+            deleted_at=timezone.now() - timedelta(days=60)
+        )
+
+        call_command("purge_deleted", "--grace-minutes", "0")
+
+        assert not Tombstone.objects.filter(list_id=shared_list.pk).exists()
+
+
+@pytest.mark.api
+class TestSoftDeleteViews:
+    """Test cases for DELETE and /api/tombstones/."""
+
+    def test_delete_list_flags_it(self, shared_list):
+        """Test that DELETE answers 204 and leaves the rows for the purge."""
+        response = client_for(shared_list.owner).delete(
+            f"/api/grocery-lists/{shared_list.id}/"
+        )
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert GroceryList.all_objects.get(pk=shared_list.pk).deleted_at is not None
+
+    def test_deleted_items_do_not_count_or_toggle(self, shared_list):
+        """Test that a deleted item leaves the count and cannot be toggled."""
+        client = client_for(shared_list.owner)
+        list_item = shared_list.items.first()
+        client.delete(f"/api/grocery-list-items/{list_item.id}/")
+
+        detail = client.get(f"/api/grocery-lists/{shared_list.id}/")
+        toggle = client.post(f"/api/grocery-list-items/{list_item.id}/toggle_checked/")
+
+        assert detail.data["item_count"] == 2
+        assert toggle.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_tombstones_since(self, shared_list):
+        """Test that a collaborator syncs deletions after a timestamp."""
+        collaborator = shared_list.shared_with.get()
+        client = client_for(collaborator)
+        first, second = shared_list.items.all()[:2]
+        deletion.delete_item(first)
+        since = timezone.now()
+        deletion.delete_item(second)
+
+        everything = client.get("/api/tombstones/")
+        recent = client.get("/api/tombstones/", {"since": since.isoformat()})
+        invalid = client.get("/api/tombstones/", {"since": "yesterday"})
+
+        assert [row["object_id"] for row in everything.data["results"]] == [
+            first.id,
+            second.id,
+        ]
+        assert [row["object_id"] for row in recent.data["results"]] == [second.id]
+        assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+        assert not client_for(UserFactory()).get("/api/tombstones/").data["results"]
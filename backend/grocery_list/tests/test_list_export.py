@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import archiving, deletion, list_export
+from grocery_list.models import GroceryListItem
+from grocery_list.tests.factories import (
+    GroceryListFactory,
+    GroceryListItemFactory,
+    ItemFactory,
+    UserFactory,
+)
+
+EXPORT_URL = "/api/grocery-lists/export/"
+
+
+def client_for(user):
+    token, created = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+def body(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.fixture
+def shopper(db):
+    """A user with an own list of two items, an empty list and a shared list."""
+    user = UserFactory(username="shopper")
+    weekly = GroceryListFactory(owner=user, name="Weekly")
+    GroceryListItemFactory(
+        grocery_list=weekly, item=ItemFactory(name="Milk"), quantity=2, unit="l"
+    )
+    GroceryListItemFactory(grocery_list=weekly, item=ItemFactory(name="Eggs"))
+    GroceryListFactory(owner=user, name="Empty")
+    party = GroceryListFactory(name="Party")
+    party.shared_with.add(user)
+    GroceryListItemFactory(grocery_list=party)
+    # Not visible to the shopper
+    GroceryListItemFactory(grocery_list=GroceryListFactory(name="Private"))
+    return user
+
+
+@pytest.mark.unit
+class TestListExport:
+    """Test cases for streaming a user's lists."""
+
+    def test_csv_has_a_row_per_item_and_per_empty_list(self, shopper):
+        """Test the flat CSV layout."""
+        output = b"".join(list_export.export_lists(shopper, "csv")).decode()
+
+        rows = list(csv.DictReader(io.StringIO(output)))
+        assert [row["list_name"] for row in rows].count("Weekly") == 2
+        assert {row["list_name"] for row in rows} == {"Weekly", "Empty", "Party"}
+        milk = next(row for row in rows if row["item"] == "Milk")
+        assert (milk["quantity"], milk["unit"], milk["owner"]) == (
+            "2.00",
+            "l",
+            "shopper",
+        )
+        empty = next(row for row in rows if row["list_name"] == "Empty")
+        assert empty["item_id"] == ""
+
+    def test_jsonl_nests_items_under_their_list(self, shopper):
+        """Test that each JSON line is one list with its items."""
+        output = b"".join(list_export.export_lists(shopper, "jsonl")).decode()
+
+        lists = {
+            document["name"]: document
+            for document in map(json.loads, output.splitlines())
+        }
+        assert set(lists) == {"Weekly", "Empty", "Party"}
+        assert sorted(item["item"] for item in lists["Weekly"]["items"]) == [
+            "Eggs",
+            "Milk",
+        ]
+        assert lists["Empty"]["items"] == []
+
+    def test_deleted_items_are_left_out(self, shopper):
+        """Test that soft-deleted items are not exported."""
+        deletion.delete_item(GroceryListItem.objects.get(item__name="Eggs"))
+
+        output = b"".join(list_export.export_lists(shopper, "csv")).decode()
+
+        rows = list(csv.DictReader(io.StringIO(output)))
+        assert [row["item"] for row in rows if row["list_name"] == "Weekly"] == ["Milk"]
+
+    def test_archived_lists_are_included(self, shopper):
+        """Test that archived lists are exported and marked as archived."""
+        weekly = shopper.grocery_lists.get(name="Weekly")
+        archiving.archive([weekly.id])
+
+        output = b"".join(list_export.export_lists(shopper, "csv")).decode()
+
+        rows = list(csv.DictReader(io.StringIO(output)))
+        archived = [row for row in rows if row["list_name"] == "Weekly"]
+        assert sorted(row["item"] for row in archived) == ["Eggs", "Milk"]
+        assert {row["archived"] for row in archived} == {"True"}
+        assert {row["archived"] for row in rows if row["list_name"] != "Weekly"} == {
+            "False"
+        }
+
+        output = b"".join(list_export.export_lists(shopper, "jsonl")).decode()
+        lists = {
+            document["name"]: document
+            for document in map(json.loads, output.splitlines())
+        }
+        assert lists["Weekly"]["archived"] is True
+        assert len(lists["Weekly"]["items"]) == 2
+        assert lists["Party"]["archived"] is False
+
+    def test_output_is_flushed_in_chunks(self, shopper, monkeypatch):
+        """Test that large exports are yielded piece by piece."""
+        monkeypatch.setattr(list_export, "CHUNK_BYTES", 1)
+
+        chunks = list(list_export.export_lists(shopper, "csv"))
+
+        # One chunk per row; the header goes out with the first
+        assert len(chunks) == 4
+
+
+@pytest.mark.api
+class TestListExportView:
+    """Test cases for GET /api/grocery-lists/export/."""
+
+    def test_export_streams_csv(self, shopper):
+        """Test that the default export is a streamed CSV attachment."""
+        response = client_for(shopper).get(EXPORT_URL)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "text/csv"
+        assert 'filename="grocery-lists-shopper.csv"' in response["Content-Disposition"]
+        assert "Private" not in body(response)
+
+    def test_export_jsonl(self, shopper):
+        """Test that ?output=jsonl streams JSON Lines."""
+        response = client_for(shopper).get(EXPORT_URL, {"output": "jsonl"})
+
+        assert response["Content-Type"] == "application/x-ndjson"
+        assert len(body(response).splitlines()) == 3
+
+    def test_export_rejects_unknown_output(self, shopper):
+        """Test that an unknown output format is a 400."""
+        response = client_for(shopper).get(EXPORT_URL, {"output": "xml"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_staff_can_export_another_user(self, shopper):
+        """Test that support staff can export a user's lists."""
+        staff = UserFactory(is_staff=True)
+
+        response = client_for(staff).get(EXPORT_URL, {"user": shopper.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "Weekly" in body(response)
+
+    def test_users_cannot_export_others(self, shopper):
+        """Test that ?user= is refused for regular users."""
+        response = client_for(UserFactory()).get(EXPORT_URL, {"user": shopper.id})
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
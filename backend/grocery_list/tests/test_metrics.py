@@ -0,0 +1,99 @@
+from django.test import override_settings
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import metrics
+from grocery_list.tests.factories import GroceryListFactory, UserFactory
+
+pytestmark = pytest.mark.skipif(
+    not metrics.enabled(), reason="prometheus_client is not installed"
+)
+
+
+def sample(name, **labels):
+    """Return the current value of a sample in the default registry."""
+    return metrics.prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.mark.api
+class TestMetrics:
+    """Test cases for the Prometheus metrics endpoint."""
+
+    @pytest.fixture
+    def authenticated_client(self, db):
+        """Return an authenticated API client."""
+        user = UserFactory()
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        client.user = user
+        return client
+
+    def test_request_metrics_are_labelled_by_route(self, authenticated_client):
+        """Test that action routes get their URL name as the label."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        name = "grocery_http_request_duration_seconds_count"
+        labels = {"route": "grocerylist-add-item", "method": "POST", "status": "404"}
+        before = sample(name, **labels)
+
+        authenticated_client.post(
+            f"/api/grocery-lists/{grocery_list.id}/add_item/",
+            {"item_id": 0},
+            format="json",
+        )
+
+        assert sample(name, **labels) == before + 1
+        assert sample(
+            "grocery_http_request_db_queries_count", route="grocerylist-add-item"
+        )
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self, authenticated_client, client):
+        """Test the text exposition, including scrape-time gauges."""
+        authenticated_client.get("/api/auth/me/")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("text/plain")
+        body = response.content.decode()
+        assert "grocery_http_request_duration_seconds_bucket{" in body
+        assert f"grocery_auth_tokens {float(Token.objects.count())}" in body
+        assert "grocery_http_requests_in_progress" in body
+
+    def test_cache_lookups(self, authenticated_client):
+        """Test that snapshot cache hits and misses are counted."""
+        name = "grocery_cache_lookups_total"
+        hits = sample(name, cache="catalog_snapshot", result="hit")
+
+        authenticated_client.get("/api/catalog/snapshot/")
+        authenticated_client.get("/api/catalog/snapshot/")
+
+        assert sample(name, cache="catalog_snapshot", result="hit") >= hits + 1
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_metrics_token(self, client, db):
+        """Test that a configured token is required."""
+        assert client.get("/metrics").status_code == 401
+        response = client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        assert response.status_code == 200
+
+    @override_settings(DEBUG=False, METRICS_TOKEN="")
+    def test_token_required_without_debug(self, client, db):
+        """Test that production without a token does not serve metrics."""
+        assert client.get("/metrics").status_code == 403
+
+    @override_settings(DEBUG=True)
+    def test_multiprocess_mode(self, client, db, monkeypatch, tmp_path):
+        """Test that scrapes aggregate the shared sample directory."""
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        body = response.content.decode()
+        assert "grocery_auth_tokens" in body
+        # Only the multiprocess collector runs, so no per-process metrics
+        assert "process_cpu_seconds_total" not in body
@@ -0,0 +1,231 @@
+import gzip
+import logging
+import zlib
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, override_settings
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import deletion, timing
+from grocery_list.middleware import (
+    APICompressionMiddleware,
+    brotli,
+    parse_accept_encoding,
+    zstandard,
+)
+from grocery_list.tests.factories import (
+    GroceryListFactory,
+    GroceryListItemFactory,
+    UserFactory,
+)
+
+BODY = b'{"results":[' + b'{"name":"Bananas","unit":"bunch"},' * 200 + b"{}]}"
+
+
+def run(response, path="/api/items/", accept_encoding="gzip", **settings):
+    """Pass ``response`` through a freshly configured middleware."""
+    with override_settings(**settings):
+        middleware = APICompressionMiddleware(lambda request: response)
+    request = RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+    return middleware(request)
+
+
+@pytest.mark.unit
+class TestAPICompressionMiddleware:
+    """Test cases for API response compression."""
+
+    def test_parse_accept_encoding(self):
+        """Test q-values and defaults are parsed."""
+        assert parse_accept_encoding("gzip, br;q=0.5, zstd;q=0") == {
+            "gzip": 1.0,
+            "br": 0.5,
+            "zstd": 0.0,
+        }
+
+    def test_gzip(self):
+        """Test that gzip-only clients get gzip."""
+        response = run(HttpResponse(BODY), API_COMPRESSION_ENCODINGS=["gzip"])
+
+        assert response["Content-Encoding"] == "gzip"
+        assert response["Vary"] == "Accept-Encoding"
+        assert int(response["Content-Length"]) == len(response.content)
+        assert gzip.decompress(response.content) == BODY
+
+    @pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+    def test_server_preference_order(self):
+        """Test that the server's preference wins among accepted encodings."""
+        response = run(
+            HttpResponse(BODY),
+            accept_encoding="gzip, br",
+            API_COMPRESSION_ENCODINGS=["br", "gzip"],
+        )
+
+        assert response["Content-Encoding"] == "br"
+        assert brotli.decompress(response.content) == BODY
+
+    @pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+    def test_zstd(self):
+        """Test zstd negotiation."""
+        response = run(HttpResponse(BODY), accept_encoding="zstd, gzip")
+
+        assert response["Content-Encoding"] == "zstd"
+        assert zstandard.ZstdDecompressor().decompress(response.content) == BODY
+
+    def test_rejected_encoding_is_skipped(self):
+        """Test that q=0 excludes an encoding."""
+        response = run(
+            HttpResponse(BODY),
+            accept_encoding="zstd;q=0, br;q=0, gzip",
+        )
+
+        assert response["Content-Encoding"] == "gzip"
+
+    def test_no_accept_encoding(self):
+        """Test that clients without Accept-Encoding get identity."""
+        response = run(HttpResponse(BODY), accept_encoding="")
+
+        assert not response.has_header("Content-Encoding")
+        assert response.content == BODY
+        assert response["Vary"] == "Accept-Encoding"
+
+    def test_small_responses_are_not_compressed(self):
+        """Test the minimum size threshold."""
+        response = run(HttpResponse(b'{"ok":true}'), API_COMPRESSION_MIN_SIZE=100)
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_non_api_paths_are_not_compressed(self):
+        """Test that only the API prefix is compressed."""
+        response = run(HttpResponse(BODY), path="/lists/")
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_pre_compressed_response_is_untouched(self):
+        """Test that responses with an existing encoding are passed through."""
+        original = HttpResponse(b"already compressed")
+        original["Content-Encoding"] = "br"
+
+        response = run(original)
+
+        assert response["Content-Encoding"] == "br"
+        assert response.content == b"already compressed"
+
+    def test_etag_is_weakened(self):
+        """Test that a strong ETag is weakened for the compressed variant."""
+        original = HttpResponse(BODY)
+        original["ETag"] = '"abc"'
+
+        response = run(original)
+
+        assert response["ETag"] == 'W/"abc"'
+
+    def test_streaming_response(self):
+        """Test that streaming bodies are compressed chunk by chunk."""
+        chunks = [BODY[:1000], BODY[1000:]]
+        response = run(
+            StreamingHttpResponse(iter(chunks)), API_COMPRESSION_ENCODINGS=["gzip"]
+        )
+
+        assert response["Content-Encoding"] == "gzip"
+        assert not response.has_header("Content-Length")
+        parts = list(response.streaming_content)
+        # Every chunk is flushed, so the first part is decodable on its own
+        assert zlib.decompressobj(31).decompress(parts[0]) == chunks[0]
+        assert gzip.decompress(b"".join(parts)) == BODY
+
+
+@pytest.mark.api
+def test_api_list_is_compressed(db):
+    """Test that large API responses are compressed end to end."""
+    user = UserFactory()
+    token, created = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    GroceryListItemFactory.create_batch(20, grocery_list=GroceryListFactory(owner=user))
+
+    response = client.get("/api/grocery-list-items/", HTTP_ACCEPT_ENCODING="gzip")
+
+    assert response["Content-Encoding"] == "gzip"
+    assert b'"results"' in gzip.decompress(response.content)
+
+
+@pytest.mark.api
+class TestPerformanceMiddleware:
+    """Test cases for per-request timing."""
+
+    @pytest.fixture
+    def authenticated_client(self, db):
+        """Return an authenticated API client."""
+        user = UserFactory()
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        client.user = user
+        return client
+
+    def test_server_timing_header(self, authenticated_client):
+        """Test that sampled API responses carry every phase."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        GroceryListItemFactory.create_batch(3, grocery_list=grocery_list)
+
+        response = authenticated_client.get("/api/grocery-lists/")
+
+        header = response["Server-Timing"]
+        assert "db;dur=" in header
+        assert 'desc="4 queries"' in header
+        for phase in ("serialize", "render", "total"):
+            assert f"{phase};dur=" in header
+
+    def test_plain_model_serializers_are_timed(self, authenticated_client):
+        """Test that serializers without sparse fieldsets are timed too."""
+        deletion.delete_list(GroceryListFactory(owner=authenticated_client.user))
+
+        response = authenticated_client.get("/api/tombstones/")
+
+        assert response.data["results"]
+        assert "serialize;dur=" in response["Server-Timing"]
+
+    def test_log_line_fields(self, authenticated_client, caplog):
+        """Test the structured log record of a sampled request."""
+        with caplog.at_level(logging.INFO, logger="grocery_list.perf"):
+            authenticated_client.get("/api/auth/me/")
+
+        record = caplog.records[-1]
+        assert record.levelno == logging.INFO
+        assert record.perf["route"] == "me"
+        assert record.perf["status"] == 200
+        assert record.perf["db_queries"] == 1
+        assert "route=me" in record.getMessage()
+
+    @override_settings(PERF_SAMPLE_RATE=0, PERF_SLOW_REQUEST_MS=0)
+    def test_unsampled_slow_request_is_logged(self, authenticated_client, caplog):
+        """Test that slow requests are reported even when not sampled."""
+        with caplog.at_level(logging.INFO, logger="grocery_list.perf"):
+            response = authenticated_client.get("/api/auth/me/")
+
+        assert not response.has_header("Server-Timing")
+        record = caplog.records[-1]
+        assert record.levelno == logging.WARNING
+        assert "db_queries" not in record.perf
+
+    def test_non_api_paths_are_not_timed(self, client, db):
+        """Test that only the API prefix is instrumented."""
+        response = client.get("/admin/login/")
+
+        assert not response.has_header("Server-Timing")
+
+    def test_nested_measure_counts_once(self):
+        """Test that nested serializer timing is not double counted."""
+        timings = timing.RequestTimings()
+        token = timing.activate(timings)
+        try:
+            with timing.measure("serialize"):
+                with timing.measure("serialize"):
+                    pass
+        finally:
+            timing.deactivate(token)
+
+        assert timings.counts["serialize"] == 1
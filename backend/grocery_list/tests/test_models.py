@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 
 import pytest
 
@@ -433,6 +434,62 @@ class TestGroceryListItemModel:
         assert grocery_list_item.unit == "kg"
         assert item.default_unit == "pieces"
 
+    def test_grocery_list_item_unit_uses_loaded_item(
+        self, db, django_assert_num_queries
+    ):
+        """Test that saving with a loaded item does not look the item up."""
+        item = ItemFactory(default_unit="bunch")
+        grocery_list = GroceryListFactory()
+        user = UserFactory()
+
+        with django_assert_num_queries(1):
+            grocery_list_item = GroceryListItem.objects.create(
+                grocery_list=grocery_list, item=item, added_by=user
+            )
+
+        assert grocery_list_item.unit == "bunch"
+
+    def test_grocery_list_item_unit_reads_only_default_unit(self, db):
+        """Test that saving with only item_id reads just the default unit."""
+        item = ItemFactory(default_unit="bag")
+        grocery_list = GroceryListFactory()
+        user = UserFactory()
+
+        with CaptureQueriesContext(connection) as queries:
+            grocery_list_item = GroceryListItem.objects.create(
+                grocery_list=grocery_list, item_id=item.id, added_by=user
+            )
+
+        assert grocery_list_item.unit == "bag"
+        assert not GroceryListItem.item.is_cached(grocery_list_item)
+        lookup = queries.captured_queries[0]["sql"]
+        assert '"default_unit"' in lookup and '"name"' not in lookup
+
+    def test_bulk_create_looks_units_up_once(self, db):
+        """Test that bulk creating 1000 list items does not query each item."""
+        items = ItemFactory.create_batch(5)
+        grocery_list = GroceryListFactory()
+        user = UserFactory()
+        list_items = [
+            GroceryListItem(
+                grocery_list=grocery_list,
+                item_id=items[n % len(items)].id,
+                added_by=user,
+            )
+            for n in range(1000)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            GroceryListItem.objects.bulk_create(list_items)
+
+        item_table = f'"{Item._meta.db_table}"'
+        lookups = [q for q in queries.captured_queries if item_table in q["sql"]]
+        assert len(lookups) == 1
+        assert {list_item.unit for list_item in list_items} == {
+            item.default_unit for item in items
+        }
+        assert grocery_list.items.filter(unit="").count() == 0
+
     def test_grocery_list_item_is_checked_default(self, db):
         """Test that is_checked defaults to False."""
         grocery_list_item = GroceryListItemFactory()
@@ -0,0 +1,151 @@
+import time
+from io import StringIO
+
+from django.core import signing
+from django.core.management import call_command
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list.profiling import StackSampler, make_token, read_folded, read_token
+from grocery_list.tests.factories import UserFactory
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.mark.unit
+class TestProfilingTokens:
+    """Test cases for signed X-Profile header values."""
+
+    def test_round_trip(self):
+        """Test that a signed token names its mode."""
+        assert read_token(make_token("cprofile"), max_age=60) == "cprofile"
+
+    def test_tampered_or_foreign_values_are_rejected(self):
+        """Test that only tokens signed for profiling are accepted."""
+        token = make_token("sample")
+
+        assert read_token(token[:-2] + "xx", max_age=60) is None
+        assert read_token("sample", max_age=60) is None
+        assert read_token(signing.dumps({"mode": "sample"}), max_age=60) is None
+
+    def test_expired_tokens_are_rejected(self):
+        """Test PROFILING_TOKEN_MAX_AGE."""
+        assert read_token(make_token(), max_age=-1) is None
+
+
+@pytest.mark.unit
+class TestStackSampler:
+    """Test cases for the statistical profiler."""
+
+    def test_samples_the_calling_thread(self):
+        """Test that samples are folded stacks of the profiled thread."""
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        busy(0.05)
+        sampler.stop()
+
+        assert sum(sampler.stacks.values()) > 0
+        stack = sampler.stacks.most_common(1)[0][0]
+        assert stack.split(";")[-1] == f"{__name__}:busy"
+
+
+@pytest.mark.integration
+class TestProfilingMiddleware:
+    """Test cases for request profiling."""
+
+    @pytest.fixture
+    def authenticated_client(self, db):
+        user = UserFactory()
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    @pytest.fixture
+    def profiling(self, settings, tmp_path):
+        settings.PROFILING_DIR = str(tmp_path)
+        settings.PROFILING_SAMPLE_RATE = 0
+        settings.PROFILING_INTERVAL_MS = 0.1
+        return tmp_path
+
+    def test_unprofiled_requests_are_untouched(self, authenticated_client, profiling):
+        """Test that nothing is profiled without a header or sample rate."""
+        response = authenticated_client.get("/api/categories/")
+
+        assert "X-Profiled" not in response
+        assert not list(profiling.iterdir())
+
+    def test_signed_header_runs_cprofile(self, authenticated_client, profiling):
+        """Test that a signed header profiles one request under its route."""
+        response = authenticated_client.get(
+            "/api/categories/", HTTP_X_PROFILE=make_token("cprofile")
+        )
+
+        assert response.status_code == 200
+        assert response["X-Profiled"] == "cprofile"
+        assert [path.name.split(".")[0] for path in profiling.iterdir()] == [
+            "category-list"
+        ]
+
+    def test_invalid_header_is_ignored(self, authenticated_client, profiling):
+        """Test that unsigned requests cannot turn the profiler on."""
+        response = authenticated_client.get("/api/categories/", HTTP_X_PROFILE="sample")
+
+        assert response.status_code == 200
+        assert "X-Profiled" not in response
+
+    def test_sampled_requests_aggregate_folded_stacks(
+        self, authenticated_client, profiling, settings
+    ):
+        """Test that the sample rate profiles requests into one folded file."""
+        settings.PROFILING_SAMPLE_RATE = 1.0
+
+        for _ in range(2):
+            response = authenticated_client.get("/api/categories/")
+            assert response["X-Profiled"] == "sample"
+
+        files = list(profiling.glob("category-list.*.folded"))
+        assert len(files) <= 1
+        for path in files:
+            stacks = read_folded(path)
+            assert all(count > 0 for count in stacks.values())
+
+
+@pytest.mark.integration
+def test_profiling_report_merges_profiles(tmp_path, settings):
+    """Test that folded stacks and cProfile dumps are merged and printed."""
+    (tmp_path / "item-list.1.folded").write_text("a;b;c 3\na;b 1\n")
+    (tmp_path / "item-list.2.folded").write_text("a;b;c 2\n")
+    (tmp_path / "me.1.folded").write_text("x;y 9\n")
+    merged = tmp_path / "merged.txt"
+    out = StringIO()
+
+    call_command(
+        "profiling_report",
+        dir=str(tmp_path),
+        route="item-list",
+        output=str(merged),
+        stdout=out,
+    )
+
+    assert "6 samples from 2 file(s)" in out.getvalue()
+    rows = [line.split() for line in out.getvalue().splitlines()[2:4]]
+    assert rows == [["83.3", "83.3", "c"], ["16.7", "100.0", "b"]]
+    assert merged.read_text() == "a;b;c 5\na;b 1\n"
+
+
+@pytest.mark.unit
+def test_profiling_token_command():
+    """Test that the printed header value is accepted."""
+    out = StringIO()
+
+    call_command("profiling_token", mode="cprofile", stdout=out)
+
+    header = out.getvalue().splitlines()[0]
+    assert read_token(header.split(": ", 1)[1], max_age=60) == "cprofile"
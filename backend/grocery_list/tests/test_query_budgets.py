@@ -0,0 +1,359 @@
+from collections import namedtuple
+
+from django.core.cache import caches
+from django.urls import URLResolver, get_resolver
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import archiving, deletion, tasks
+from grocery_list.tests.factories import (
+    CategoryFactory,
+    GroceryListFactory,
+    GroceryListItemFactory,
+    ItemFactory,
+    UserFactory,
+)
+from grocery_list.tests.query_budget import duplicated_sql, query_budget
+
+# Every request is run against a small and a larger dataset; the query
+# count has to be identical for both.
+SIZES = (2, 8)
+MAX_QUERY_TIME = 0.25
+PASSWORD = "budget-pass-123"
+
+Budget = namedtuple(
+    "Budget", "name method path data queries content_type", defaults=[None]
+)
+
+CATALOG_CSV = "name,category\nApples,Produce {size}\nMilk,Dairy {size}\n"
+
+# Query budgets per route. The token lookup of an authenticated request
+# counts as one query.
+BUDGETS = [
+    Budget("api-root", "get", "/api/", None, 1),
+    Budget("category-list", "get", "/api/categories/", None, 3),
+    Budget("category-list", "post", "/api/categories/", {"name": "Budget {size}"}, 4),
+    Budget("category-detail", "get", "/api/categories/{category}/", None, 2),
+    Budget(
+        "category-detail",
+        "patch",
+        "/api/categories/{category}/",
+        {"description": "Updated"},
+        3,
+    ),
+    Budget("category-detail", "delete", "/api/categories/{category}/", None, 7),
+    Budget("item-list", "get", "/api/items/", None, 3),
+    Budget("item-list", "get", "/api/items/?search=budget", None, 3),
+    Budget(
+        "item-list",
+        "post",
+        "/api/items/",
+        {"name": "Budget item", "category": "{category}"},
+        4,
+    ),
+    Budget("item-detail", "get", "/api/items/{item}/", None, 2),
+    Budget("item-detail", "patch", "/api/items/{item}/", {"default_unit": "kg"}, 3),
+    Budget("item-detail", "delete", "/api/items/{item}/", None, 5),
+    Budget("grocerylist-list", "get", "/api/grocery-lists/", None, 4),
+    Budget("grocerylist-list", "get", "/api/grocery-lists/?archived=1", None, 4),
+    Budget("grocerylist-list", "post", "/api/grocery-lists/", {"name": "Budget"}, 4),
+    Budget("grocerylist-detail", "get", "/api/grocery-lists/{list}/", None, 3),
+    # One streamed query for the live lists, one for the archived ones
+    Budget("grocerylist-export", "get", "/api/grocery-lists/export/", None, 3),
+    Budget(
+        "grocerylist-export",
+        "get",
+        "/api/grocery-lists/export/?output=jsonl",
+        None,
+        3,
+    ),
+    Budget(
+        "grocerylist-detail",
+        "patch",
+        "/api/grocery-lists/{list}/",
+        {"name": "Renamed"},
+        5,
+    ),
+    # Stamps the list and its items with one UPDATE each, then the tombstones
+    Budget("grocerylist-detail", "delete", "/api/grocery-lists/{list}/", None, 10),
+    # The insert runs in a savepoint after locking the list row again
+    Budget(
+        "grocerylist-add-item",
+        "post",
+        "/api/grocery-lists/{list}/add_item/",
+        {"item_id": "{item}", "quantity": 2},
+        8,
+    ),
+    # Access check, user lookup, insert and affinity upsert; on PostgreSQL
+    # the lookup and insert are a single statement
+    Budget(
+        "grocerylist-share-with",
+        "post",
+        "/api/grocery-lists/{list}/share_with/",
+        {"username": "{stranger}"},
+        5,
+    ),
+    Budget(
+        "grocerylist-share-with",
+        "post",
+        "/api/grocery-lists/{list}/share_with/",
+        {"usernames": ["{stranger}", "{collaborator}", "nobody"]},
+        5,
+    ),
+    Budget(
+        "grocerylist-remove-user",
+        "post",
+        "/api/grocery-lists/{list}/remove_user/",
+        {"username": "{collaborator}"},
+        6,
+    ),
+    Budget("grocerylistitem-list", "get", "/api/grocery-list-items/", None, 3),
+    Budget(
+        "grocerylistitem-list",
+        "get",
+        "/api/grocery-list-items/?grocery_list={list}",
+        None,
+        3,
+    ),
+    Budget(
+        "grocerylistitem-list",
+        "get",
+        "/api/grocery-list-items/?grocery_list={list}&consolidate=1",
+        None,
+        3,
+    ),
+    Budget(
+        "grocerylistitem-detail",
+        "get",
+        "/api/grocery-list-items/{list_item}/",
+        None,
+        2,
+    ),
+    Budget(
+        "grocerylistitem-detail",
+        "patch",
+        "/api/grocery-list-items/{list_item}/",
+        {"quantity": "3.00"},
+        3,
+    ),
+    Budget(
+        "grocerylistitem-detail",
+        "delete",
+        "/api/grocery-list-items/{list_item}/",
+        None,
+        7,
+    ),
+    # Token lookup and one conditional UPDATE ... RETURNING
+    Budget(
+        "grocerylistitem-toggle-checked",
+        "post",
+        "/api/grocery-list-items/{list_item}/toggle_checked/",
+        None,
+        2,
+    ),
+    # One query per search tier that is still short of a full page
+    Budget("user-list", "get", "/api/users/?search=budget", None, 4),
+    Budget("user-suggested", "get", "/api/users/suggested/", None, 2),
+    Budget("user-detail", "get", "/api/users/{collaborator_id}/", None, 2),
+    Budget(
+        "login",
+        "post",
+        "/api/auth/login/",
+        {"username": "{username}", "password": PASSWORD},
+        3,
+    ),
+    Budget("logout", "post", "/api/auth/logout/", None, 2),
+    Budget(
+        "register",
+        "post",
+        "/api/auth/register/",
+        {"username": "budget_new_{size}", "password": PASSWORD},
+        7,
+    ),
+    Budget("me", "get", "/api/auth/me/", None, 1),
+    # Cold cache: the catalog version, then both tables; a warm one with a
+    # recent version check costs only the token
+    Budget("catalog-snapshot", "get", "/api/catalog/snapshot/", None, 4),
+    # Category map, then per chunk a savepoint around the new categories'
+    # insert and the item upsert; the categories are re-read only when another
+    # import created some of them first
+    Budget(
+        "catalog-import",
+        "post",
+        "/api/catalog/import/",
+        CATALOG_CSV,
+        6,
+        content_type="text/csv",
+    ),
+    Budget("catalog-export", "get", "/api/catalog/export/", None, 2),
+    Budget("task-list", "get", "/api/tasks/", None, 3),
+    Budget(
+        "task-list",
+        "post",
+        "/api/tasks/",
+        {"name": "rebuild_collaborators", "idempotency_key": "budget-{size}"},
+        5,
+    ),
+    Budget("task-detail", "get", "/api/tasks/{task}/", None, 2),
+    Budget("tombstone-list", "get", "/api/tombstones/", None, 3),
+    Budget(
+        "tombstone-list",
+        "get",
+        "/api/tombstones/?since=2020-01-01T00:00:00Z",
+        None,
+        3,
+    ),
+]
+
+
+def build_dataset(size):
+    """Create a user whose lists, items and collaborators all grow with ``size``."""
+    # Staff, so that admin-only endpoints can be measured too
+    owner = UserFactory(username=f"budget_owner_{size}", is_staff=True)
+    owner.set_password(PASSWORD)
+    owner.save()
+    token, created = Token.objects.get_or_create(user=owner)
+
+    categories = CategoryFactory.create_batch(size)
+    items = [
+        ItemFactory(name=f"budget item {n}", category=categories[0])
+        for n in range(size)
+    ]
+    collaborators = UserFactory.create_batch(size)
+
+    lists = GroceryListFactory.create_batch(size, owner=owner)
+    for grocery_list in lists:
+        grocery_list.shared_with.add(*collaborators)
+        for item in items:
+            GroceryListItemFactory(grocery_list=grocery_list, item=item, added_by=owner)
+    archived = GroceryListFactory.create_batch(size, owner=owner)
+    for grocery_list in archived:
+        grocery_list.shared_with.add(*collaborators)
+        GroceryListItemFactory(grocery_list=grocery_list, added_by=owner)
+    archiving.archive([grocery_list.id for grocery_list in archived])
+    for grocery_list in GroceryListFactory.create_batch(size, owner=owner):
+        grocery_list.shared_with.add(*collaborators)
+        deletion.delete_list(grocery_list)
+    for collaborator in collaborators:
+        shared = GroceryListFactory(owner=collaborator)
+        shared.shared_with.add(owner)
+        GroceryListItemFactory(grocery_list=shared, added_by=collaborator)
+
+    queued = [tasks.enqueue("rebuild_collaborators") for n in range(size)]
+
+    context = {
+        "size": size,
+        "token": token.key,
+        "username": owner.username,
+        "category": categories[0].id,
+        "item": items[0].id,
+        "list": lists[0].id,
+        "list_item": lists[0].items.first().id,
+        "collaborator": collaborators[0].username,
+        "collaborator_id": collaborators[0].id,
+        "stranger": UserFactory().username,
+        "task": queued[0].id,
+    }
+    return context
+
+
+def fill(value, context):
+    """Substitute ``{placeholders}`` in paths and request bodies."""
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill(item, context) for item in value]
+    if isinstance(value, str):
+        return value.format(**context)
+    return value
+
+
+def api_route_names(patterns=None, prefix=""):
+    """Yield the name of every URL pattern under ``api/``."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from api_route_names(pattern.url_patterns, route)
+        elif route.startswith("api/") and pattern.name:
+            yield pattern.name
+
+
+@pytest.mark.integration
+class TestQueryBudgets:
+    """Test that every API endpoint stays within its query budget."""
+
+    def test_every_api_route_has_a_budget(self):
+        """Test that new routes cannot be added without a budget."""
+        missing = set(api_route_names()) - {budget.name for budget in BUDGETS}
+
+        assert not missing, f"Add query budgets for: {sorted(missing)}"
+
+    @pytest.mark.parametrize(
+        "budget",
+        BUDGETS,
+        ids=[f"{budget.method}-{budget.path}" for budget in BUDGETS],
+    )
+    def test_endpoint_within_budget(self, db, budget):
+        """Test query count and time, and that the count does not scale."""
+        runs = []
+        for size in SIZES:
+            # Start every run cold so cached endpoints are measured alike
+            for cache in caches.all():
+                cache.clear()
+            context = build_dataset(size)
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Token {context['token']}")
+            path = fill(budget.path, context)
+
+            with query_budget(
+                budget.queries,
+                MAX_QUERY_TIME,
+                label=f"{budget.method.upper()} {path} with {size} rows",
+            ) as queries:
+                if budget.content_type:
+                    response = client.generic(
+                        budget.method.upper(),
+                        path,
+                        fill(budget.data, context),
+                        content_type=budget.content_type,
+                    )
+                else:
+                    response = getattr(client, budget.method)(
+                        path, fill(budget.data, context), format="json"
+                    )
+                if response.streaming:
+                    # Streamed bodies query the database as they are consumed
+                    b"".join(response.streaming_content)
+
+            assert response.status_code < 400, response.content
+            runs.append(queries.captured_queries)
+
+        small, large = runs[0], runs[-1]
+        assert len(small) == len(large), (
+            f"{budget.method.upper()} {budget.path}: {len(small)} queries with "
+            f"{SIZES[0]} rows but {len(large)} with {SIZES[-1]}. Repeated SQL:\n"
+            + "\n".join(f"  {count}x {sql}" for count, sql in duplicated_sql(large))
+        )
+
+
+@pytest.mark.unit
+class TestQueryBudgetHelper:
+    """Test cases for the query budget helper."""
+
+    def test_report_lists_duplicated_sql(self, db):
+        """Test that N+1 patterns are reported with their repeat count."""
+        users = UserFactory.create_batch(3)
+
+        with pytest.raises(AssertionError) as error:
+            with query_budget(1, label="loop"):
+                for user in users:
+                    list(user.grocery_lists.all())
+
+        message = str(error.value)
+        assert "loop over budget: 3 queries, budget is 1" in message
+        assert "3x SELECT" in message
+        assert '"owner_id" = ?' in message
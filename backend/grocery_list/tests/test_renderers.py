@@ -0,0 +1,96 @@
+import io
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.utils.translation import gettext_lazy
+
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from grocery_list.parsers import ORJSONParser
+from grocery_list.renderers import ORJSONRenderer
+from grocery_list.serializers import GroceryListItemSerializer
+from grocery_list.tests.factories import GroceryListItemFactory
+
+pytestmark = pytest.mark.unit
+
+PAYLOADS = [
+    {"message": "List shared with jane", "shared_user": {"id": 1}},
+    {"unicode": "crème brûlée 🥐", "separators": "a b c"},
+    {"datetime": datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)},
+    {"naive": datetime(2024, 5, 1, 9, 30), "decimal": Decimal("2.50")},
+    {"lazy": gettext_lazy("Not found."), "uuid": uuid.UUID(int=7)},
+    {1: "int key", "tuple": (1, 2), "nested": [{"a": None, "b": True}]},
+    [1, 2.5, "three", None, False],
+    {"huge": 2**70},
+]
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_renderer_matches_stdlib_output(payload):
+    """Test that ORJSONRenderer output is byte-identical to JSONRenderer."""
+    assert ORJSONRenderer().render(payload) == JSONRenderer().render(payload)
+
+
+def test_renderer_matches_serializer_output(db):
+    """Test byte compatibility for real grocery list item rows."""
+    rows = GroceryListItemFactory.create_batch(3)
+    data = GroceryListItemSerializer(rows, many=True).data
+
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_renderer_none_is_empty():
+    """Test that a None body renders to nothing, like JSONRenderer."""
+    assert ORJSONRenderer().render(None) == b""
+
+
+def test_renderer_indent_falls_back_to_stdlib():
+    """Test that pretty-printed output is still supported."""
+    payload = {"a": [1, 2]}
+    media_type = "application/json; indent=4"
+
+    assert ORJSONRenderer().render(payload, media_type) == JSONRenderer().render(
+        payload, media_type
+    )
+
+
+def test_renderer_unserializable_raises_like_stdlib():
+    """Test that unsupported values still raise TypeError."""
+    with pytest.raises(TypeError):
+        ORJSONRenderer().render({"value": object()})
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"username": "jane", "quantity": 2}',
+        '{"name": "Épicerie ☕"}'.encode(),
+        b"[1, 2.5, null, true]",
+    ],
+)
+def test_parser_matches_stdlib(body):
+    """Test that ORJSONParser returns the same data as JSONParser."""
+    assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(
+        io.BytesIO(body)
+    )
+
+
+def test_parser_rejects_invalid_json():
+    """Test that malformed bodies raise ParseError."""
+    with pytest.raises(ParseError):
+        ORJSONParser().parse(io.BytesIO(b"{not json"))
+
+
+def test_parser_non_utf8_falls_back_to_stdlib():
+    """Test that other request encodings are decoded by the stdlib parser."""
+    body = '{"name": "café"}'.encode("latin-1")
+
+    data = ORJSONParser().parse(
+        io.BytesIO(body), parser_context={"encoding": "latin-1"}
+    )
+
+    assert data == {"name": "café"}
@@ -0,0 +1,188 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+
+import pytest
+
+from grocery_list import archiving, deletion
+from grocery_list.management.commands.seed_data import Command
+from grocery_list.models import (
+    ArchivedGroceryList,
+    ArchivedGroceryListItem,
+    GroceryList,
+    GroceryListItem,
+    Item,
+)
+from grocery_list.seeding import SyntheticDataGenerator
+from grocery_list.tests.factories import (
+    GroceryListFactory,
+    GroceryListItemFactory,
+    UserFactory,
+)
+
+
+def seed(*args):
+    out = StringIO()
+    call_command("seed_data", *args, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.integration
+class TestSeedDataScaleMode:
+    """Test cases for the synthetic scale mode of seed_data."""
+
+    def test_scale_mode_creates_requested_volume(self, db):
+        """Test that scale mode creates users, catalog, lists and items."""
+        output = seed(
+            "--users",
+            "12",
+            "--lists-per-user",
+            "2",
+            "--items-per-list",
+            "5",
+            "--catalog",
+            "40",
+            "--batch-size",
+            "7",
+        )
+
+        users = User.objects.filter(username__startswith="synthetic_")
+        assert users.count() == 12
+        assert Item.objects.filter(name__startswith="Synthetic ").count() == 40
+        lists = GroceryList.objects.filter(owner__in=users)
+        assert lists.count() >= 12
+        assert GroceryListItem.objects.filter(grocery_list__in=lists).count() >= 12
+        assert "rows/sec" in output
+        # No demo fixtures in scale mode
+        assert not User.objects.filter(username="john_doe").exists()
+
+    def test_scale_mode_users_can_log_in(self, db):
+        """Test that synthetic users share a working password."""
+        seed("--users", "2", "--catalog", "5")
+
+        user = User.objects.get(username="synthetic_0000000")
+        assert user.check_password("password123")
+
+    def test_list_items_use_item_default_unit(self, db):
+        """Test that bulk-created rows carry the unit GroceryListItem.save sets."""
+        seed("--users", "3", "--catalog", "10", "--items-per-list", "4")
+
+        items = GroceryListItem.objects.filter(
+            grocery_list__owner__username__startswith="synthetic_"
+        )
+        assert items.exists()
+        assert not items.exclude(unit=F("item__default_unit")).exists()
+
+    def test_rerun_does_not_duplicate_users_or_catalog(self, db):
+        """Test that seeding twice reuses the same users and catalog."""
+        seed("--users", "3", "--catalog", "10")
+        seed("--users", "3", "--catalog", "10")
+
+        assert User.objects.filter(username__startswith="synthetic_").count() == 3
+        assert Item.objects.filter(name__startswith="Synthetic ").count() == 10
+
+    def test_item_popularity_is_skewed(self, db):
+        """Test that picks follow a Zipf-like distribution."""
+        generator = SyntheticDataGenerator(
+            users=0, lists_per_user=1, items_per_list=1, catalog=0
+        )
+        generator.item_ids = list(range(100))
+        generator.cum_weights = [
+            sum(1 / rank for rank in range(1, n + 2)) for n in range(100)
+        ]
+
+        picks = generator.pick_items(5000)
+
+        assert picks.count(0) > picks.count(50) * 10
+
+
+@pytest.mark.integration
+class TestSeedDataClean:
+    """Test cases for the batched demo data cleanup."""
+
+    @pytest.fixture(autouse=True)
+    def development_settings(self, settings):
+        settings.DEBUG = True
+
+    def test_clean_removes_only_demo_data(self, db):
+        """Test that --clean replaces demo lists and keeps other users' data."""
+        seed()
+        john = User.objects.get(username="john_doe")
+        old_list_ids = set(
+            GroceryList.objects.filter(owner=john).values_list("id", flat=True)
+        )
+        other = GroceryListFactory()
+        other_item = GroceryListItemFactory(grocery_list=other)
+
+        output = seed("--clean", "--batch-size", "4")
+
+        assert not GroceryList.objects.filter(id__in=old_list_ids).exists()
+        assert GroceryList.objects.filter(owner=john).exists()
+        assert GroceryListItem.objects.filter(id=other_item.id).exists()
+        assert "grocery list items deleted" in output
+        assert "rows/sec" in output
+        john.refresh_from_db()
+        assert john.check_password("password123")
+        assert john.email == "john_doe@example.com"
+
+    def test_clean_removes_deleted_and_archived_demo_lists(self, db):
+        """Test that soft-deleted and archived demo lists go as well."""
+        seed()
+        deleted, archived = GroceryList.objects.filter(
+            owner__username="john_doe"
+        ).order_by("id")[:2]
+        deletion.delete_list(deleted)
+        archiving.archive([archived.id])
+
+        seed("--clean")
+
+        assert not GroceryList.all_objects.filter(pk=deleted.pk).exists()
+        assert not GroceryListItem.all_objects.filter(grocery_list=deleted).exists()
+        assert not ArchivedGroceryList.objects.filter(
+            owner__username="john_doe"
+        ).exists()
+        assert not ArchivedGroceryListItem.objects.filter(
+            grocery_list=archived.pk
+        ).exists()
+
+    def test_items_of_archived_lists_are_not_orphans(self, db):
+        """Test that items only archived lists use survive the cleanup."""
+        seed()
+        archived_item = GroceryListItemFactory()
+        archiving.archive([archived_item.grocery_list_id])
+
+        seed("--clean")
+
+        assert Item.objects.filter(pk=archived_item.item_id).exists()
+        assert ArchivedGroceryListItem.objects.filter(pk=archived_item.pk).exists()
+
+    def test_delete_in_batches(self, db):
+        """Test that rows are removed in bounded primary-key ranges."""
+        grocery_list = GroceryListFactory()
+        GroceryListItemFactory.create_batch(5, grocery_list=grocery_list)
+        kept = GroceryListItemFactory()
+        command = Command(stdout=StringIO())
+
+        deleted = command.delete_in_batches(
+            GroceryListItem.objects.filter(grocery_list=grocery_list),
+            "grocery list items",
+            batch_size=2,
+            raw=True,
+        )
+
+        assert deleted == 5
+        assert "in 3 batch(es)" in command.stdout._out.getvalue()
+        assert list(GroceryListItem.objects.all()) == [kept]
+
+    def test_shared_lists_with_real_users_abort(self, db):
+        """Test that the sharing safety check still stops the cleanup."""
+        seed()
+        shared = GroceryList.objects.filter(owner__username="john_doe").first()
+        shared.shared_with.add(UserFactory())
+
+        output = seed("--clean")
+
+        assert "SAFETY ABORT" in output
+        assert "Deleted" not in output
@@ -1,11 +1,15 @@
+from decimal import Decimal
+
 import pytest
 
-from grocery_list.models import Category
+from grocery_list.models import Category, GroceryListItem, Item
 from grocery_list.serializers import (
     CategorySerializer,
     GroceryListItemSerializer,
+    GroceryListItemValuesSerializer,
     GroceryListSimpleSerializer,
     ItemSerializer,
+    ItemValuesSerializer,
     UserSerializer,
 )
 from grocery_list.tests.factories import (
@@ -578,3 +582,77 @@ class TestGroceryListSimpleSerializer:
         # Read-only fields should not be affected
         assert updated_list.owner.username != "should_be_ignored"
         assert updated_list.items.count() == original_item_count
+
+
+@pytest.mark.unit
+class TestValuesSerializers:
+    """Test that the read-only values serializers match the model serializers."""
+
+    def test_item_values_match_item_serializer(self, db):
+        """Test ItemValuesSerializer output equals ItemSerializer output."""
+        category = CategoryFactory(name="Bakery")
+        ItemFactory(name="Bagel", category=category, barcode=None)
+        ItemFactory(name="Croissant", category=category, description="Buttery")
+        queryset = Item.objects.filter(category=category).select_related("category")
+
+        expected = ItemSerializer(queryset, many=True).data
+        actual = ItemValuesSerializer(
+            ItemValuesSerializer.get_values(queryset), many=True
+        ).data
+
+        assert actual == expected
+        assert [list(row) for row in actual] == [list(row) for row in expected]
+
+    def test_grocery_list_item_values_match_serializer(self, db):
+        """Test GroceryListItemValuesSerializer output for mixed rows."""
+        owner = UserFactory()
+        shopper = UserFactory()
+        grocery_list = GroceryListFactory(owner=owner)
+        GroceryListItemFactory(
+            grocery_list=grocery_list,
+            added_by=owner,
+            custom_name="",
+            quantity=Decimal("1.5"),
+        )
+        GroceryListItemFactory(
+            grocery_list=grocery_list,
+            added_by=shopper,
+            custom_name="Oat milk",
+            quantity=Decimal("12"),
+            is_checked=True,
+            checked_by=shopper,
+        )
+        queryset = GroceryListItem.objects.filter(
+            grocery_list=grocery_list
+        ).select_related("item__category", "added_by", "checked_by")
+
+        expected = GroceryListItemSerializer(queryset, many=True).data
+        actual = GroceryListItemValuesSerializer(
+            GroceryListItemValuesSerializer.get_values(queryset), many=True
+        ).data
+
+        assert actual == expected
+        # Key order matters for byte-identical JSON
+        assert [list(row) for row in actual] == [list(row) for row in expected]
+
+    def test_unchecked_item_omits_checked_by_username(self, db):
+        """Test the empty relation is left out, as with dotted sources."""
+        list_item = GroceryListItemFactory(checked_by=None)
+        row = GroceryListItemValuesSerializer.get_values(
+            GroceryListItem.objects.filter(pk=list_item.pk)
+        ).get()
+
+        data = GroceryListItemValuesSerializer(row).data
+
+        assert "checked_by_username" not in data
+        assert data == GroceryListItemSerializer(list_item).data
+
+    def test_values_serializer_single_query(self, db, django_assert_num_queries):
+        """Test that serializing a page needs exactly one query."""
+        GroceryListItemFactory.create_batch(5)
+        queryset = GroceryListItemValuesSerializer.get_values(
+            GroceryListItem.objects.all()
+        )
+
+        with django_assert_num_queries(1):
+            GroceryListItemValuesSerializer(queryset, many=True).data
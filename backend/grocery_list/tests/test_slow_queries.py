@@ -0,0 +1,158 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list.models import SlowQuery
+from grocery_list.slow_queries import SlowQueryLogger, install, normalize_sql
+from grocery_list.tests.factories import UserFactory
+
+
+@pytest.mark.unit
+class TestNormalizeSql:
+    """Test cases for SQL fingerprint normalization."""
+
+    def test_literals_and_placeholders(self):
+        """Test that values do not change the normalized form."""
+        assert normalize_sql("SELECT * FROM t WHERE a = 'x''y' AND b = 42") == (
+            normalize_sql("SELECT * FROM t WHERE a = %s AND b = %s")
+        )
+
+    def test_in_lists_collapse(self):
+        """Test that IN lists of any length normalize alike."""
+        assert normalize_sql("WHERE id IN (%s, %s, %s)") == "WHERE id IN (?, ...)"
+        assert normalize_sql("WHERE id IN (1, 2)") == "WHERE id IN (?, ...)"
+
+
+@pytest.mark.integration
+class TestSlowQueryLogger:
+    """Test cases for recording slow queries."""
+
+    def test_queries_are_aggregated_by_fingerprint(
+        self, db, django_capture_on_commit_callbacks
+    ):
+        """Test that repeated shapes share one row with an EXPLAIN plan."""
+        users = UserFactory.create_batch(2)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with connection.execute_wrapper(SlowQueryLogger(threshold_ms=0)):
+                for user in users:
+                    list(User.objects.filter(id=user.id))
+
+        entry = SlowQuery.objects.get(normalized_sql__contains='FROM "auth_user"')
+        assert entry.calls == 2
+        assert entry.max_ms <= entry.total_ms
+        assert entry.explain
+        assert not entry.explain_analyzed
+        # The logger's own bookkeeping queries are not recorded
+        assert SlowQuery.objects.count() == 1
+
+    def test_fast_queries_are_ignored(self, db):
+        """Test the threshold."""
+        with connection.execute_wrapper(SlowQueryLogger(threshold_ms=10_000)):
+            list(User.objects.all()[:1])
+
+        assert not SlowQuery.objects.exists()
+
+    def test_parameters_can_be_left_out(self, db, django_capture_on_commit_callbacks):
+        """Test that SLOW_QUERY_LOG_PARAMS=False keeps values out of the log."""
+        logger = SlowQueryLogger(threshold_ms=0, store_params=False)
+        with django_capture_on_commit_callbacks(execute=True):
+            with connection.execute_wrapper(logger):
+                list(User.objects.filter(username="secret"))
+
+        assert SlowQuery.objects.get().example_params == ""
+
+    @override_settings(SLOW_QUERY_LOG_MS=0)
+    def test_originating_view_is_recorded(self, db, django_capture_on_commit_callbacks):
+        """Test that API queries name the viewset action that ran them."""
+        user = UserFactory()
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            with connection.execute_wrapper(SlowQueryLogger(threshold_ms=0)):
+                client.get("/api/users/?search=x")
+
+        views = set(SlowQuery.objects.values_list("view", flat=True))
+        assert "grocery_list.views.UserViewSet.list GET /api/users/" in views
+
+    def test_nothing_is_written_inside_the_transaction(
+        self, db, django_capture_on_commit_callbacks
+    ):
+        """Test that entries wait for the caller's transaction to end."""
+        with django_capture_on_commit_callbacks(execute=True):
+            with connection.execute_wrapper(SlowQueryLogger(threshold_ms=0)):
+                list(User.objects.filter(username="buffered"))
+                assert not SlowQuery.objects.exists()
+
+        assert SlowQuery.objects.filter(
+            normalized_sql__contains='FROM "auth_user"'
+        ).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_queries_are_still_recorded(self):
+        """Test that a rollback does not lose the entry."""
+        with connection.execute_wrapper(SlowQueryLogger(threshold_ms=0)):
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    list(User.objects.filter(username="rolled_back"))
+                    raise RuntimeError
+            # The next query outside a transaction writes the buffer
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        assert SlowQuery.objects.filter(
+            normalized_sql__contains='FROM "auth_user"'
+        ).exists()
+
+    @override_settings(SLOW_QUERY_LOG_MS=100)
+    def test_install_is_idempotent(self):
+        """Test that reconnecting does not stack loggers."""
+        before = list(connection.execute_wrappers)
+        try:
+            install(connection=connection)
+            install(connection=connection)
+
+            added = connection.execute_wrappers[len(before) :]
+            assert len(added) == 1
+            assert added[0].threshold_ms == 100
+        finally:
+            connection.execute_wrappers[:] = before
+
+
+@pytest.mark.integration
+def test_slow_queries_command(db):
+    """Test that the command ranks entries and prints plans."""
+    SlowQuery.objects.create(
+        fingerprint="a" * 40,
+        normalized_sql="SELECT slow",
+        example_sql="SELECT slow",
+        calls=2,
+        total_ms=300,
+        max_ms=200,
+        explain="SCAN big_table",
+    )
+    SlowQuery.objects.create(
+        fingerprint="b" * 40,
+        normalized_sql="SELECT frequent",
+        example_sql="SELECT frequent",
+        calls=50,
+        total_ms=500,
+        max_ms=20,
+    )
+    out = StringIO()
+
+    call_command("slow_queries", "--order", "max", "--explain", stdout=out)
+
+    output = out.getvalue()
+    assert output.index("SELECT slow") < output.index("SELECT frequent")
+    assert "SCAN big_table" in output
+    assert "(not available)" in output
@@ -0,0 +1,184 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from grocery_list.serializers import GroceryListItemSerializer, sparse_fieldset
+from grocery_list.tests.factories import (
+    GroceryListFactory,
+    GroceryListItemFactory,
+    UserFactory,
+)
+
+
+@pytest.fixture
+def authenticated_client(db):
+    """Return an authenticated API client."""
+    user = UserFactory()
+    token, created = Token.objects.get_or_create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    client.user = user
+    return client
+
+
+def drf_request(method, path):
+    """Build a DRF request the way a viewset would see it."""
+    request = getattr(APIRequestFactory(), method)(path)
+    return Request(request, parsers=[JSONParser()])
+
+
+@pytest.mark.unit
+class TestSparseFieldset:
+    """Test cases for resolving ?fields=, ?omit= and ?compact=."""
+
+    available = ["id", "name", "quantity", "unit", "notes"]
+
+    def test_no_params_is_unrestricted(self):
+        """Test that plain requests keep every field."""
+        assert sparse_fieldset(drf_request("get", "/"), self.available) is None
+
+    def test_fields_keeps_declared_order(self):
+        """Test that ?fields= keeps serializer order, not query order."""
+        request = drf_request("get", "/?fields=unit,id,unknown")
+
+        assert sparse_fieldset(request, self.available) == ["id", "unit"]
+
+    def test_omit(self):
+        """Test that ?omit= drops fields."""
+        request = drf_request("get", "/?omit=notes,name")
+
+        assert sparse_fieldset(request, self.available) == ["id", "quantity", "unit"]
+
+    def test_compact_with_fields(self):
+        """Test that ?compact=1 intersects with ?fields=."""
+        request = drf_request("get", "/?compact=1&fields=id,unit,notes")
+
+        assert sparse_fieldset(request, self.available, ["id", "unit"]) == [
+            "id",
+            "unit",
+        ]
+
+    def test_write_requests_are_unrestricted(self):
+        """Test that the parameters never trim fields on writes."""
+        request = drf_request("post", "/?fields=id")
+
+        assert sparse_fieldset(request, self.available) is None
+
+    def test_model_serializer_drops_fields(self, db):
+        """Test that ModelSerializers honour the request's fieldset."""
+        list_item = GroceryListItemFactory()
+        request = drf_request("get", "/?fields=id,display_name")
+
+        data = GroceryListItemSerializer(list_item, context={"request": request}).data
+
+        assert data == {"id": list_item.id, "display_name": list_item.custom_name}
+
+
+@pytest.mark.api
+class TestSparseFieldsetViews:
+    """Test cases for sparse fieldsets on the API."""
+
+    def test_list_items_with_fields(self, authenticated_client):
+        """Test that list rows contain only the requested keys."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        GroceryListItemFactory.create_batch(3, grocery_list=grocery_list)
+
+        response = authenticated_client.get(
+            "/api/grocery-list-items/?fields=id,quantity,is_checked"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        rows = response.json()["results"]
+        assert len(rows) == 3
+        assert all(list(row) == ["id", "quantity", "is_checked"] for row in rows)
+
+    def test_list_items_compact_skips_user_joins(self, authenticated_client):
+        """Test that compact rows do not join the users table."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        GroceryListItemFactory.create_batch(2, grocery_list=grocery_list)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(
+                f"/api/grocery-list-items/?grocery_list={grocery_list.id}&compact=1"
+            )
+
+        rows = response.json()["results"]
+        assert list(rows[0]) == [
+            "id",
+            "display_name",
+            "quantity",
+            "unit",
+            "is_checked",
+        ]
+        item_query = queries.captured_queries[-1]["sql"]
+        assert "auth_user" not in item_query
+        assert "notes" not in item_query
+
+    def test_list_items_omit(self, authenticated_client):
+        """Test omitting fields from list rows."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        GroceryListItemFactory(grocery_list=grocery_list)
+
+        response = authenticated_client.get(
+            "/api/grocery-list-items/?omit=notes,added_by_username"
+        )
+
+        row = response.json()["results"][0]
+        assert "notes" not in row
+        assert "added_by_username" not in row
+        assert "display_name" in row
+
+    def test_retrieve_item_with_fields_defers_columns(self, authenticated_client):
+        """Test that detail requests load only the selected columns."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        list_item = GroceryListItemFactory(grocery_list=grocery_list)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = authenticated_client.get(
+                f"/api/grocery-list-items/{list_item.id}/?fields=id,display_name"
+            )
+
+        assert response.json() == {
+            "id": list_item.id,
+            "display_name": list_item.custom_name,
+        }
+        item_query = queries.captured_queries[-1]["sql"]
+        assert "notes" not in item_query
+        assert "auth_user" not in item_query
+
+    def test_grocery_lists_omit_shared_with_skips_prefetch(self, authenticated_client):
+        """Test that omitting shared_with drops its prefetch query."""
+        user = authenticated_client.user
+        for _ in range(2):
+            GroceryListFactory(owner=user).shared_with.add(UserFactory())
+
+        with CaptureQueriesContext(connection) as full:
+            authenticated_client.get("/api/grocery-lists/")
+        with CaptureQueriesContext(connection) as sparse:
+            response = authenticated_client.get(
+                "/api/grocery-lists/?fields=id,name,owner_username"
+            )
+
+        rows = response.json()["results"]
+        assert all(list(row) == ["id", "name", "owner_username"] for row in rows)
+        assert all(row["owner_username"] == user.username for row in rows)
+        assert len(sparse) < len(full)
+        assert not any(
+            "_prefetch_related_val" in query["sql"] for query in sparse.captured_queries
+        )
+
+    def test_fields_ignored_on_create(self, authenticated_client):
+        """Test that write responses always carry the full representation."""
+        response = authenticated_client.post(
+            "/api/grocery-lists/?fields=id", {"name": "Weekend"}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["name"] == "Weekend"
+        assert "shared_with" in response.json()
@@ -0,0 +1,209 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from grocery_list import tasks
+from grocery_list.models import Task
+from grocery_list.tests.factories import UserFactory
+
+CALLS = []
+
+
+@tasks.task("test_record")
+def record(value):
+    CALLS.append(value)
+    return {"value": value}
+
+
+@tasks.task("test_flaky", max_attempts=2)
+def flaky():
+    raise RuntimeError("boom")
+
+
+@pytest.mark.integration
+class TestQueue:
+    """Test cases for enqueueing, claiming and running tasks."""
+
+    def test_idempotency_key_returns_the_first_task(self, db):
+        """Test that repeating an enqueue with a key queues one task."""
+        first = tasks.enqueue("test_record", {"value": 1}, key="weekly-1")
+        again = tasks.enqueue(record, {"value": 2}, key="weekly-1")
+
+        assert again.pk == first.pk
+        assert Task.objects.filter(idempotency_key="weekly-1").count() == 1
+
+    def test_unknown_task_is_refused(self, db):
+        """Test that only registered tasks can be queued."""
+        with pytest.raises(ValueError):
+            tasks.enqueue("no_such_task")
+
+    def test_arguments_must_fit_the_task(self, db):
+        """Test that arguments are checked against the task's signature."""
+        with pytest.raises(ValueError, match="Invalid arguments"):
+            tasks.enqueue("test_record", {"value": 1, "run_at": "tomorrow"})
+        with pytest.raises(ValueError, match="Invalid arguments"):
+            tasks.enqueue("test_record")
+        assert not Task.objects.exists()
+
+    def test_claim_takes_due_tasks_once(self, db):
+        """Test that claimed tasks are not handed out again."""
+        due = tasks.enqueue("test_record", {"value": 1})
+        tasks.enqueue("test_record", {"value": 2}, run_at=timezone.now() + timedelta(1))
+
+        assert tasks.claim("a", limit=5) == [due.pk]
+        assert tasks.claim("b", limit=5) == []
+        due.refresh_from_db()
+        assert (due.status, due.locked_by) == (Task.RUNNING, "a")
+
+    def test_execute_stores_the_result(self, db):
+        """Test a successful run."""
+        task = tasks.enqueue("test_record", {"value": 7})
+        tasks.claim("a")
+
+        assert tasks.execute(task.pk) == Task.DONE
+        task.refresh_from_db()
+        assert (task.result, task.attempts) == ({"value": 7}, 1)
+        assert 7 in CALLS
+
+    def test_failures_are_retried_then_failed(self, db):
+        """Test that a failing task backs off, then gives up."""
+        task = tasks.enqueue("test_flaky")
+        tasks.claim("a")
+
+        assert tasks.execute(task.pk) == Task.QUEUED
+        task.refresh_from_db()
+        assert task.run_at > timezone.now()
+        assert "RuntimeError: boom" in task.last_error
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        tasks.claim("a")
+        assert tasks.execute(task.pk) == Task.FAILED
+
+    def test_stale_running_tasks_are_requeued(self, db):
+        """Test that tasks of a dead worker go back to the queue."""
+        task = tasks.enqueue("test_record", {"value": 1})
+        tasks.claim("a")
+        Task.objects.filter(pk=task.pk).update(
+            locked_at=timezone.now() - timedelta(hours=2)
+        )
+
+        assert tasks.requeue_stale() == (1, 0)
+        task.refresh_from_db()
+        assert (task.status, task.attempts) == (Task.QUEUED, 1)
+
+    def test_task_that_kills_its_worker_runs_out_of_attempts(self, db):
+        """Test that a claim counts as an attempt even if the run never ends."""
+        task = tasks.enqueue("test_flaky")
+        for _ in range(2):
+            tasks.claim("a")
+            # The worker dies mid-run: no outcome is recorded
+            Task.objects.filter(pk=task.pk).update(
+                locked_at=timezone.now() - timedelta(hours=2)
+            )
+            tasks.requeue_stale()
+
+        task.refresh_from_db()
+        assert (task.status, task.attempts) == (Task.FAILED, 2)
+        assert "stopped responding" in task.last_error
+
+    def test_heartbeat_keeps_long_tasks_claimed(self, db):
+        """Test that a running task with fresh heartbeats is not requeued."""
+        task = tasks.enqueue("test_record", {"value": 1})
+        tasks.claim("a")
+        Task.objects.filter(pk=task.pk).update(
+            locked_at=timezone.now() - timedelta(hours=2)
+        )
+
+        tasks.heartbeat([task.pk])
+
+        assert tasks.requeue_stale() == (0, 0)
+        task.refresh_from_db()
+        assert (task.status, task.locked_by) == (Task.RUNNING, "a")
+
+
+@pytest.mark.integration
+@pytest.mark.django_db(transaction=True)
+class TestRunWorker:
+    """Test cases for the run_worker command."""
+
+    def test_worker_drains_the_queue_on_threads(self, capsys):
+        """Test that --once runs every due task on the pool and exits."""
+        queued = [tasks.enqueue("test_record", {"value": n}) for n in range(5)]
+
+        call_command("run_worker", "--once", "--concurrency", "2")
+
+        assert set(
+            Task.objects.filter(pk__in=[task.pk for task in queued]).values_list(
+                "status", flat=True
+            )
+        ) == {Task.DONE}
+        assert "5 done" in capsys.readouterr().out
+
+
+@pytest.mark.api
+class TestTaskViews:
+    """Test cases for /api/tasks/."""
+
+    @pytest.fixture
+    def authenticated_client(self, db):
+        token, created = Token.objects.get_or_create(user=UserFactory(is_staff=True))
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    def test_enqueue_and_poll(self, authenticated_client):
+        """Test that staff can queue a task and read its status."""
+        response = authenticated_client.post(
+            "/api/tasks/",
+            {"name": "test_record", "kwargs": {"value": 3}, "idempotency_key": "k"},
+            format="json",
+        )
+        again = authenticated_client.post(
+            "/api/tasks/",
+            {"name": "test_record", "kwargs": {"value": 4}, "idempotency_key": "k"},
+            format="json",
+        )
+        detail = authenticated_client.get(f"/api/tasks/{response.data['id']}/")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert again.data["id"] == response.data["id"]
+        assert (detail.data["status"], detail.data["kwargs"]) == (
+            "queued",
+            {"value": 3},
+        )
+
+    def test_arguments_that_do_not_fit_are_a_400(self, authenticated_client):
+        """Test that task arguments never reach enqueue's own parameters."""
+        for kwargs in ({"name": "x"}, {"value": 1, "max_attempts": 9}, {}):
+            response = authenticated_client.post(
+                "/api/tasks/",
+                {"name": "test_record", "kwargs": kwargs},
+                format="json",
+            )
+
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+            assert "kwargs" in response.data
+        assert not Task.objects.exists()
+
+    def test_unknown_task_is_a_400(self, authenticated_client):
+        """Test that only registered task names are accepted."""
+        response = authenticated_client.post(
+            "/api/tasks/", {"name": "rm_rf"}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_tasks_are_staff_only(self, db):
+        """Test that regular users cannot queue tasks."""
+        token, created = Token.objects.get_or_create(user=UserFactory())
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        response = client.post("/api/tasks/", {"name": "test_record"}, format="json")
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+
+import pytest
+
+from grocery_list import user_search
+from grocery_list.models import UserSearchIndex
+from grocery_list.tests.factories import UserFactory
+
+
+@pytest.mark.unit
+class TestNormalize:
+    """Test cases for search term normalization."""
+
+    def test_case_accents_and_whitespace(self):
+        """Test that spelling variants normalize alike."""
+        assert user_search.normalize("  ÉLODIE   Müller ") == "elodie muller"
+
+    def test_empty_values(self):
+        """Test that blank names normalize to an empty string."""
+        assert user_search.normalize(None) == ""
+        assert user_search.normalize("   ") == ""
+
+
+@pytest.mark.integration
+class TestUserSearchIndex:
+    """Test cases for keeping the search index in sync."""
+
+    def test_index_follows_user_changes(self, db):
+        """Test that saving a user refreshes its entry."""
+        user = UserFactory(username="Chloé", first_name="", last_name="Dupont")
+        user.first_name = "Anaïs"
+        user.save()
+
+        entry = UserSearchIndex.objects.get(user=user)
+        assert entry.username == "chloe"
+        assert entry.search_text == "chloe anais dupont"
+
+    def test_login_does_not_rewrite_the_entry(self, db, django_assert_num_queries):
+        """Test that saving unrelated fields skips the index."""
+        user = UserFactory()
+
+        with django_assert_num_queries(1):
+            user.save(update_fields=["last_login"])
+
+    def test_bulk_created_users_can_be_indexed(self, db):
+        """Test index_users for users created without signals."""
+        users = User.objects.bulk_create(
+            [User(username=f"bulk_search_{n}", last_name="Bulk") for n in range(3)]
+        )
+        rows = User.objects.filter(username__startswith="bulk_search_").values_list(
+            "id", "username", "first_name", "last_name"
+        )
+
+        assert user_search.index_users(rows) == len(users)
+        assert UserSearchIndex.objects.filter(last_name="bulk").count() == len(users)
+
+    def test_users_written_without_the_orm_are_indexed(self, db):
+        """Test that the database triggers cover bulk_create and update()."""
+        User.objects.bulk_create([User(username="Trigger_Bulk", first_name="Ana")])
+        User.objects.filter(username="Trigger_Bulk").update(last_name="Moreau")
+
+        entry = UserSearchIndex.objects.get(user__username="Trigger_Bulk")
+        assert entry.username == "trigger_bulk"
+        assert entry.search_text == "trigger_bulk ana moreau"
+        users = user_search.search(User.objects.all(), "moreau")
+        assert [user.username for user in users] == ["Trigger_Bulk"]
+
+
+@pytest.mark.integration
+class TestSearch:
+    """Test cases for ranked user search."""
+
+    def test_short_terms_only_match_prefixes(self, db):
+        """Test that substrings need MIN_SUBSTRING_LENGTH characters."""
+        UserFactory(username="xqprefix_user")
+        UserFactory(username="user_xqinside")
+        users = User.objects.all()
+
+        short = [user.username for user in user_search.search(users, "xq")]
+        longer = [user.username for user in user_search.search(users, "xqi")]
+
+        assert short == ["xqprefix_user"]
+        assert longer == ["user_xqinside"]
+
+    def test_stops_after_a_full_page(self, db, django_assert_num_queries):
+        """Test that later tiers are skipped once the limit is reached."""
+        for n in range(3):
+            UserFactory(username=f"pagefill_{n}")
+
+        with django_assert_num_queries(1):
+            users = user_search.search(User.objects.all(), "pagefill", limit=2)
+
+        assert [user.username for user in users] == ["pagefill_0", "pagefill_1"]
+
+    def test_like_wildcards_are_literal(self, db):
+        """Test that % and _ in the term do not act as wildcards."""
+        UserFactory(username="wild_card")
+        UserFactory(username="wildxcard")
+
+        users = user_search.search(User.objects.all(), "wild_c")
+
+        assert [user.username for user in users] == ["wild_card"]
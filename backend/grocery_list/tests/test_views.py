@@ -5,7 +5,14 @@ from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
-from grocery_list.models import Category, GroceryList, GroceryListItem, Item
+from grocery_list import sharing
+from grocery_list.models import (
+    Category,
+    CollaboratorAffinity,
+    GroceryList,
+    GroceryListItem,
+    Item,
+)
 from grocery_list.tests.factories import (
     CategoryFactory,
     GroceryListFactory,
@@ -1103,6 +1110,142 @@ class TestCustomActions:
 
         assert response.status_code == status.HTTP_404_NOT_FOUND
 
+    def test_toggle_checked_returns_changed_fields_only(self, authenticated_client, db):
+        """Test that toggling responds with the checked state, not the whole item."""
+        user = authenticated_client.user
+        grocery_list = GroceryListFactory(owner=user)
+        grocery_list_item = GroceryListItemFactory(
+            grocery_list=grocery_list, added_by=user, is_checked=False
+        )
+
+        url = f"/api/grocery-list-items/{grocery_list_item.id}/toggle_checked/"
+        response = authenticated_client.post(url)
+
+        response_data = response.json()
+        assert set(response_data) == {
+            "id",
+            "is_checked",
+            "checked_by",
+            "checked_by_username",
+            "checked_at",
+            "updated_at",
+        }
+        assert response_data["id"] == grocery_list_item.id
+        assert response_data["checked_by_username"] == user.username
+
+    def test_toggle_checked_leaves_other_columns_alone(self, authenticated_client, db):
+        """Test that a toggle does not overwrite a concurrent edit of the item."""
+        user = authenticated_client.user
+        grocery_list = GroceryListFactory(owner=user)
+        grocery_list_item = GroceryListItemFactory(
+            grocery_list=grocery_list, added_by=user, quantity=1, unit="kg"
+        )
+        GroceryListItem.objects.filter(pk=grocery_list_item.pk).update(
+            quantity=5, unit=""
+        )
+
+        url = f"/api/grocery-list-items/{grocery_list_item.id}/toggle_checked/"
+        authenticated_client.post(url)
+
+        grocery_list_item.refresh_from_db()
+        assert grocery_list_item.is_checked is True
+        assert grocery_list_item.quantity == 5
+        assert grocery_list_item.unit == ""
+
+
+@pytest.mark.api
+class TestConsolidatedListItems:
+    """Test cases for ?consolidate=1 on the list item listing."""
+
+    @pytest.fixture
+    def authenticated_client(self, db):
+        """Return an authenticated API client."""
+        user = UserFactory()
+        token, created = Token.objects.get_or_create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        client.user = user  # Store user for test access
+        return client
+
+    @pytest.fixture
+    def grocery_list(self, authenticated_client):
+        """A list shared with two users, holding eggs three times."""
+        user = authenticated_client.user
+        grocery_list = GroceryListFactory(owner=user)
+        grocery_list.shared_with.add(*UserFactory.create_batch(2))
+        eggs = ItemFactory(name="Eggs")
+        for quantity, notes, checked in [(6, "free range", True), (12, "", False)]:
+            GroceryListItemFactory(
+                grocery_list=grocery_list,
+                item=eggs,
+                quantity=quantity,
+                unit="piece",
+                notes=notes,
+                custom_name="",
+                is_checked=checked,
+            )
+        GroceryListItemFactory(
+            grocery_list=grocery_list,
+            item=eggs,
+            quantity=1,
+            unit="box",
+            notes="large",
+            custom_name="",
+            is_checked=True,
+        )
+        return grocery_list
+
+    def get(self, client, grocery_list, **params):
+        response = client.get(
+            "/api/grocery-list-items/",
+            {"grocery_list": grocery_list.id, "consolidate": "1", **params},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["results"]
+
+    def test_rows_of_same_item_and_unit_are_merged(
+        self, authenticated_client, grocery_list
+    ):
+        """Test that quantities are summed and notes joined per item and unit."""
+        rows = self.get(authenticated_client, grocery_list)
+
+        assert len(rows) == 2
+        pieces = next(row for row in rows if row["unit"] == "piece")
+        assert pieces["quantity"] == "18.00"
+        assert pieces["notes"] == "free range"
+        assert pieces["count"] == 2
+        assert len(pieces["ids"]) == 2
+        assert (pieces["is_checked"], pieces["any_checked"]) == (False, True)
+        assert pieces["display_name"] == "Eggs"
+
+    def test_sharing_does_not_inflate_sums(self, authenticated_client, grocery_list):
+        """Test that the shared_with join does not repeat rows."""
+        rows = self.get(authenticated_client, grocery_list)
+
+        assert sum(row["count"] for row in rows) == 3
+
+    def test_unchecked_groups_come_first(self, authenticated_client, grocery_list):
+        """Test that fully checked groups sort after the rest."""
+        rows = self.get(authenticated_client, grocery_list)
+
+        assert [row["is_checked"] for row in rows] == [False, True]
+
+    def test_compact_fields(self, authenticated_client, grocery_list):
+        """Test that ?compact=1 trims consolidated rows too."""
+        rows = self.get(authenticated_client, grocery_list, compact="1")
+
+        assert set(rows[0]) == {"ids", "display_name", "quantity", "unit", "is_checked"}
+
+    def test_other_users_lists_are_excluded(self, authenticated_client):
+        """Test that consolidation only sees visible lists."""
+        GroceryListItemFactory()
+
+        response = authenticated_client.get(
+            "/api/grocery-list-items/", {"consolidate": "1"}
+        )
+
+        assert response.json()["results"] == []
+
 
 @pytest.mark.api
 class TestGroceryListItemPatchUpdates:
@@ -1590,6 +1733,123 @@ class TestEnhancedSharingFeatures:
         assert response.status_code == status.HTTP_404_NOT_FOUND
         assert "User not found" in response.json()["error"]
 
+    def test_share_with_many_usernames(self, authenticated_client, db):
+        """Test sharing with several users reports each outcome."""
+        user = authenticated_client.user
+        grocery_list = GroceryListFactory(owner=user)
+        already = UserFactory(username="bulk_already")
+        grocery_list.shared_with.add(already)
+        UserFactory(username="bulk_new_1")
+        UserFactory(username="bulk_new_2")
+
+        url = f"/api/grocery-lists/{grocery_list.id}/share_with/"
+        data = {
+            "usernames": ["bulk_new_1", "bulk_already", "bulk_missing", "bulk_new_2"]
+        }
+
+        response = authenticated_client.post(url, data, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert sorted(u["username"] for u in body["shared"]) == [
+            "bulk_new_1",
+            "bulk_new_2",
+        ]
+        assert body["already_shared"] == ["bulk_already"]
+        assert body["not_found"] == ["bulk_missing"]
+        assert set(grocery_list.shared_with.values_list("username", flat=True)) == {
+            "bulk_already",
+            "bulk_new_1",
+            "bulk_new_2",
+        }
+
+    def test_share_with_owner_counts_as_already_shared(self, authenticated_client, db):
+        """Test that a collaborator cannot add the owner to shared_with."""
+        owner = UserFactory(username="bulk_owner")
+        grocery_list = GroceryListFactory(owner=owner)
+        grocery_list.shared_with.add(authenticated_client.user)
+
+        url = f"/api/grocery-lists/{grocery_list.id}/share_with/"
+        response = authenticated_client.post(
+            url, {"usernames": ["bulk_owner"]}, format="json"
+        )
+
+        assert response.json()["already_shared"] == ["bulk_owner"]
+        assert not grocery_list.shared_with.filter(id=owner.id).exists()
+
+    def test_share_with_rejects_malformed_usernames(self, authenticated_client, db):
+        """Test that usernames must be a bounded list of strings."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        url = f"/api/grocery-lists/{grocery_list.id}/share_with/"
+
+        for usernames in ["alice", [1, 2], [f"user{n}" for n in range(51)]]:
+            response = authenticated_client.post(
+                url, {"usernames": usernames}, format="json"
+            )
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_racing_share_is_counted_once(self, authenticated_client, db, mocker):
+        """Test that a share another request inserted first is not reported."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        friend = UserFactory(username="racing_friend")
+        lookup = sharing._lookup
+
+        def lookup_then_lose_the_race(usernames):
+            rows = lookup(usernames)
+            grocery_list.shared_with.add(friend)
+            return rows
+
+        mocker.patch.object(sharing, "_lookup", lookup_then_lose_the_race)
+        response = authenticated_client.post(
+            f"/api/grocery-lists/{grocery_list.id}/share_with/",
+            {"usernames": ["racing_friend"]},
+            format="json",
+        )
+
+        assert response.json()["already_shared"] == ["racing_friend"]
+        assert not CollaboratorAffinity.objects.filter(collaborator=friend).exists()
+
+    def test_racing_unshare_is_counted_once(self, authenticated_client, db, mocker):
+        """Test that a share another request removed first is not reported."""
+        grocery_list = GroceryListFactory(owner=authenticated_client.user)
+        friend = UserFactory(username="racing_friend")
+        grocery_list.shared_with.add(friend)
+        lookup = sharing._lookup
+
+        def lookup_then_lose_the_race(usernames):
+            rows = lookup(usernames)
+            grocery_list.shared_with.remove(friend)
+            return rows
+
+        mocker.patch.object(sharing, "_lookup", lookup_then_lose_the_race)
+        response = authenticated_client.post(
+            f"/api/grocery-lists/{grocery_list.id}/remove_user/",
+            {"usernames": ["racing_friend"]},
+            format="json",
+        )
+
+        assert response.json()["removed"] == []
+
+    def test_remove_many_usernames(self, authenticated_client, db):
+        """Test removing several users reports each outcome."""
+        user = authenticated_client.user
+        grocery_list = GroceryListFactory(owner=user)
+        shared = UserFactory(username="bulk_shared")
+        UserFactory(username="bulk_unshared")
+        grocery_list.shared_with.add(shared)
+
+        url = f"/api/grocery-lists/{grocery_list.id}/remove_user/"
+        data = {"usernames": ["bulk_shared", "bulk_unshared", "bulk_missing"]}
+
+        response = authenticated_client.post(url, data, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        body = response.json()
+        assert body["removed"] == ["bulk_shared"]
+        assert body["not_shared"] == ["bulk_unshared"]
+        assert body["not_found"] == ["bulk_missing"]
+        assert not grocery_list.shared_with.exists()
+
 
 @pytest.mark.api
 class TestUserViewSet:
@@ -1675,6 +1935,31 @@ class TestUserViewSet:
         last_names = [u["last_name"] for u in users]
         assert all(name == "Smith" for name in last_names)
 
+    def test_search_ranks_exact_then_prefix_then_substring(
+        self, authenticated_client, db
+    ):
+        """Test that closer matches come first, not alphabetical order."""
+        UserFactory(username="amy_pat", first_name="Amy", last_name="Patel")
+        UserFactory(username="pat_ryan", first_name="Ryan", last_name="Doe")
+        UserFactory(username="pat", first_name="Zed", last_name="Doe")
+        UserFactory(username="zack", first_name="Patricia", last_name="Ng")
+
+        response = authenticated_client.get("/api/users/?search=PAT")
+
+        usernames = [u["username"] for u in response.json()["results"]]
+        assert usernames == ["pat", "pat_ryan", "amy_pat", "zack"]
+
+    def test_search_ignores_accents_and_matches_full_names(
+        self, authenticated_client, db
+    ):
+        """Test accent folding and matching across first and last name."""
+        UserFactory(username="rmartin", first_name="Renée", last_name="Martín")
+
+        for term in ["renee", "Renée Mart", "martin"]:
+            response = authenticated_client.get("/api/users/", {"search": term})
+            usernames = [u["username"] for u in response.json()["results"]]
+            assert usernames == ["rmartin"], term
+
     def test_users_exclude_inactive_users(self, authenticated_client, db):
         """Test that inactive users are excluded from search."""
         UserFactory(username="active_user", is_active=True)
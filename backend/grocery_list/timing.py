@@ -0,0 +1,66 @@
+"""
+Per-request timing phases.
+
+``PerformanceMiddleware`` activates a ``RequestTimings`` for each sampled
+request; code anywhere below it adds to the active one with
+``measure("phase")`` or ``record("phase", seconds)``. Outside a sampled
+request both are no-ops, so instrumented code costs next to nothing.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """Accumulated seconds and call counts per phase for one request"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.active = set()
+
+    def add(self, phase, seconds):
+        self.seconds[phase] += seconds
+        self.counts[phase] += 1
+
+
+def activate(timings):
+    """Make ``timings`` the current request's; returns a token for ``deactivate``"""
+    return _current.set(timings)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record(phase, seconds):
+    timings = _current.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def measure(phase):
+    """
+    Time the block as ``phase``. Nested blocks of the same phase (a
+    serializer inside a serializer) only count once.
+    """
+    timings = _current.get()
+    if timings is None or phase in timings.active:
+        yield
+        return
+    timings.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.active.discard(phase)
+        timings.add(phase, time.perf_counter() - start)
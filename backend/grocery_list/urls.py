@@ -3,12 +3,14 @@ from django.views.generic import TemplateView
 
 from rest_framework.routers import DefaultRouter
 
-from . import auth_views
+from . import auth_views, catalog_views, metrics_views
 from .views import (
     CategoryViewSet,
     GroceryListItemViewSet,
     GroceryListViewSet,
     ItemViewSet,
+    TaskViewSet,
+    TombstoneViewSet,
     UserViewSet,
 )
 
@@ -20,6 +22,8 @@ router.register(
     r"grocery-list-items", GroceryListItemViewSet, basename="grocerylistitem"
 )
 router.register(r"users", UserViewSet, basename="user")
+router.register(r"tombstones", TombstoneViewSet, basename="tombstone")
+router.register(r"tasks", TaskViewSet)
 
 urlpatterns = [
     path("api/", include(router.urls)),
@@ -27,6 +31,10 @@ urlpatterns = [
     path("api/auth/logout/", auth_views.logout, name="logout"),
     path("api/auth/register/", auth_views.register, name="register"),
     path("api/auth/me/", auth_views.me, name="me"),
+    path("api/catalog/snapshot/", catalog_views.snapshot, name="catalog-snapshot"),
+    path("api/catalog/import/", catalog_views.import_items, name="catalog-import"),
+    path("api/catalog/export/", catalog_views.export_items, name="catalog-export"),
+    path("metrics", metrics_views.metrics_view, name="metrics"),
     path("", TemplateView.as_view(template_name="index.html"), name="home"),
     # Catch-all for Angular routes
     re_path(
@@ -0,0 +1,116 @@
+"""
+Ranked user search for the share dialog.
+
+``UserSearchIndex`` keeps a normalized (case- and accent-folded) copy of
+each user's username and names, so lookups compare plain indexed columns
+instead of running ``UPPER(...) LIKE '%term%'`` over all of ``auth_user``.
+Every user has an entry: ORM saves write it through ``user_saved``, and
+triggers from migration 0013 write a lower-cased one for users inserted or
+renamed without the ORM (``bulk_create``, ``update()``, raw SQL), until
+their next save or ``index_users`` call normalizes it fully.
+
+``search`` runs up to three queries, best tier first, and stops as soon as
+it has a page of results:
+
+1. username prefix, ordered by username (an exact match sorts first);
+2. first or last name prefix;
+3. substring of ``"username first last"``, only for terms of three or more
+   characters since trigrams need three.
+
+Prefixes are matched as ranges, which btree indexes answer together with
+the ordering in a short index scan. That needs byte-order comparison: the
+SQLite default, and the ``"C"`` collation migration 0005 gives the prefix
+columns on PostgreSQL, where ``search_text`` also gets a ``pg_trgm`` GIN
+index.
+"""
+
+import unicodedata
+
+from django.db.models import Q
+
+MIN_SUBSTRING_LENGTH = 3
+# Sorts after any character in byte order, closing prefix ranges
+PREFIX_END = "\U0010ffff"
+INDEXED_FIELDS = {"username", "first_name", "last_name"}
+
+
+def normalize(value):
+    """Case-fold, strip accents and collapse whitespace"""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(value.casefold().split())
+
+
+def index_entry(user_id, username, first_name, last_name):
+    from .models import UserSearchIndex
+
+    username, first_name, last_name = map(normalize, (username, first_name, last_name))
+    return UserSearchIndex(
+        user_id=user_id,
+        username=username,
+        first_name=first_name,
+        last_name=last_name,
+        search_text=" ".join(filter(None, (username, first_name, last_name))),
+    )
+
+
+def index_users(rows, batch_size=5000):
+    """
+    Create or refresh index entries from ``(id, username, first_name,
+    last_name)`` rows in one upsert per batch.
+    """
+    from .models import UserSearchIndex
+
+    entries = [index_entry(*row) for row in rows]
+    UserSearchIndex.objects.bulk_create(
+        entries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=["username", "first_name", "last_name", "search_text"],
+    )
+    return len(entries)
+
+
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """``post_save`` receiver for ``User``"""
+    # Logins save last_login only; nothing searchable changed
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+    index_users(
+        [(instance.pk, instance.username, instance.first_name, instance.last_name)]
+    )
+
+
+def prefix(field, term):
+    """
+    ``field`` starts with ``term``, written as a range rather than
+    ``LIKE 'term%'`` so any byte-ordered btree index can answer it
+    """
+    return Q(**{f"{field}__gte": term, f"{field}__lt": term + PREFIX_END})
+
+
+def search(queryset, query, limit=10):
+    """Return up to ``limit`` users from ``queryset`` matching ``query``"""
+    term = normalize(query)
+    if not term:
+        return list(queryset.order_by("username")[:limit])
+
+    tiers = [
+        prefix("search_index__username", term),
+        prefix("search_index__first_name", term)
+        | prefix("search_index__last_name", term),
+    ]
+    if len(term) >= MIN_SUBSTRING_LENGTH:
+        tiers.append(Q(search_index__search_text__contains=term))
+
+    users = []
+    for condition in tiers:
+        users += (
+            queryset.filter(condition)
+            .exclude(pk__in=[user.pk for user in users])
+            .order_by("search_index__username")[: limit - len(users)]
+        )
+        if len(users) >= limit:
+            break
+    return users
@@ -1,54 +1,197 @@
+import logging
+
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Q
-from django.utils import timezone
+from django.db import models, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.http import Http404, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 
-from rest_framework import status, viewsets
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import (
+    MethodNotAllowed,
+    PermissionDenied,
+    ValidationError,
+)
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
-from .models import Category, GroceryList, GroceryListItem, Item
+from . import (
+    catalog_io,
+    checking,
+    collaborators,
+    deletion,
+    list_export,
+    sharing,
+    tasks,
+    user_search,
+)
+from .models import (
+    ArchivedGroceryList,
+    Category,
+    GroceryList,
+    GroceryListItem,
+    Item,
+    Task,
+    Tombstone,
+)
 from .serializers import (
+    SPARSE_FIELDSET_PARAMS,
+    ArchivedGroceryListSerializer,
     CategorySerializer,
+    ConsolidatedItemValuesSerializer,
     GroceryListItemSerializer,
+    GroceryListItemValuesSerializer,
     GroceryListSimpleSerializer,
     ItemSerializer,
+    ItemValuesSerializer,
+    TaskSerializer,
+    TombstoneSerializer,
     UserSerializer,
+    sparse_fieldset,
 )
 
+logger = logging.getLogger(__name__)
+
+# Most users one share_with/remove_user call may name
+MAX_SHARE_USERNAMES = 50
+
+
+class SparseFieldsetViewMixin:
+    """
+    Narrow the queryset to the fields selected with ``?fields=``/``?omit=``/
+    ``?compact=1`` so that dropped fields also drop their joins and columns.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        if any(param in params for param in SPARSE_FIELDSET_PARAMS):
+            serializer = self.get_serializer()
+            if hasattr(serializer, "restrict_queryset"):
+                queryset = serializer.restrict_queryset(queryset)
+        return queryset
+
+
+class ValuesListMixin(SparseFieldsetViewMixin):
+    """
+    Serve ``list`` from ``.values()`` rows through ``values_serializer_class``
+    instead of building model instances for every row.
+    """
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    queryset = Category.objects.all()
+    values_serializer_class = None
+
+    def get_values_serializer_class(self):
+        return self.values_serializer_class
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_values_serializer_class()
+        fields = sparse_fieldset(
+            request, serializer_class.fields, serializer_class.compact_fields
+        )
+        queryset = serializer_class.get_values(
+            self.filter_queryset(self.get_queryset()), fields
+        )
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = serializer_class(page, many=True, fields=fields)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = serializer_class(queryset, many=True, fields=fields)
+        return Response(serializer.data)
+
+
+class CategoryViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    # Aggregation drops Meta.ordering, so the order is repeated here
+    queryset = Category.objects.annotate(item_count=Count("items")).order_by("name")
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
 
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = Item.objects.all().select_related("category")
     serializer_class = ItemSerializer
+    values_serializer_class = ItemValuesSerializer
     permission_classes = [IsAuthenticated]
     filterset_fields = ["category"]
     search_fields = ["name", "barcode"]
 
 
-class GroceryListViewSet(viewsets.ModelViewSet):
+class GroceryListViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     serializer_class = GroceryListSimpleSerializer
     permission_classes = [IsAuthenticated]
 
+    def archived(self):
+        """``?archived=1`` reads the lists moved out by ``archive_lists``"""
+        return self.request.query_params.get("archived") in ("1", "true")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.archived() and request.method not in SAFE_METHODS:
+            raise MethodNotAllowed(request.method, "Archived lists are read-only")
+
+    def get_serializer_class(self):
+        if self.archived():
+            return ArchivedGroceryListSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         user = self.request.user
+        if self.archived():
+            model, live_items = ArchivedGroceryList, None
+        else:
+            # Joins bypass the default manager, so skip deleted items here
+            model, live_items = GroceryList, models.Q(items__deleted_at__isnull=True)
         return (
-            GroceryList.objects.filter(
-                models.Q(owner=user) | models.Q(shared_with=user)
-            )
+            model.objects.filter(models.Q(owner=user) | models.Q(shared_with=user))
             .distinct()
+            .select_related("owner")
             .prefetch_related("shared_with")
+            # distinct=True because the shared_with join repeats list rows
+            .annotate(item_count=Count("items", filter=live_items, distinct=True))
+            .order_by("-updated_at")
         )
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
+    def perform_destroy(self, instance):
+        # shared_with is prefetched by get_queryset
+        shared_ids = [user.id for user in instance.shared_with.all()]
+        # Only flagged here; purge_deleted removes the list and its items
+        deletion.delete_list(instance, shared_ids)
+        collaborators.record_unshares(instance.owner_id, shared_ids)
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        """
+        Stream every list the user can see with its items, as
+        ``?output=csv`` (default) or ``?output=jsonl``. Staff can export
+        another user's lists with ``?user=<id>``.
+        """
+        format = request.query_params.get("output", "csv")
+        if format not in catalog_io.FORMATS:
+            return Response(
+                {"error": f"output must be one of {', '.join(catalog_io.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        user = request.user
+        if "user" in request.query_params:
+            if not user.is_staff:
+                raise PermissionDenied("Only staff can export other users' lists")
+            user = get_object_or_404(User, pk=request.query_params["user"])
+
+        response = StreamingHttpResponse(
+            list_export.export_lists(user, format),
+            content_type=catalog_io.CONTENT_TYPES[format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="grocery-lists-{user.username}.{format}"'
+        )
+        return response
+
     @action(detail=True, methods=["post"])
     def add_item(self, request, pk=None):
         grocery_list = self.get_object()
@@ -58,16 +201,27 @@ class GroceryListViewSet(viewsets.ModelViewSet):
         notes = request.data.get("notes", "")
 
         try:
-            item = Item.objects.get(id=item_id)
-            # Always create new grocery list item, even if same item exists
-            grocery_list_item = GroceryListItem.objects.create(
-                grocery_list=grocery_list,
-                item=item,
-                quantity=quantity,
-                unit=unit or item.default_unit,
-                notes=notes,
-                added_by=request.user,
-            )
+            item = Item.objects.select_related("category").get(id=item_id)
+            with transaction.atomic():
+                # Checked again under the row lock: an archive or delete of
+                # the list that is under way finishes first, and the insert
+                # would then point at a list that is gone
+                locked = (
+                    GroceryList.objects.select_for_update()
+                    .filter(pk=grocery_list.pk)
+                    .order_by()
+                )
+                if not locked.values_list("pk", flat=True):
+                    raise Http404
+                # Always create new grocery list item, even if same item exists
+                grocery_list_item = GroceryListItem.objects.create(
+                    grocery_list=grocery_list,
+                    item=item,
+                    quantity=quantity,
+                    unit=unit or item.default_unit,
+                    notes=notes,
+                    added_by=request.user,
+                )
 
             serializer = GroceryListItemSerializer(grocery_list_item)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -76,139 +230,291 @@ class GroceryListViewSet(viewsets.ModelViewSet):
                 {"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND
             )
 
+    def get_list_access(self):
+        """
+        ``(id, owner_id)`` of the URL's list if the user can see it, else 404.
+        One query, without get_object's joins, annotations and prefetches.
+        """
+        user = self.request.user
+        shared = GroceryList.shared_with.through.objects.filter(
+            grocerylist_id=OuterRef("pk"), user_id=user.id
+        )
+        return get_object_or_404(
+            GroceryList.objects.filter(models.Q(owner=user) | Exists(shared))
+            .order_by()
+            .values_list("id", "owner_id"),
+            pk=self.kwargs["pk"],
+        )
+
+    def get_usernames(self, request):
+        """
+        ``(usernames, many)`` from a ``username`` or a ``usernames`` list,
+        deduplicated; ``usernames`` is None if the list is malformed.
+        """
+        if "usernames" not in request.data:
+            username = request.data.get("username")
+            return ([username] if username else []), False
+
+        if hasattr(request.data, "getlist"):
+            usernames = request.data.getlist("usernames")
+        else:
+            usernames = request.data["usernames"]
+        if (
+            not isinstance(usernames, list)
+            or len(usernames) > MAX_SHARE_USERNAMES
+            or not all(isinstance(name, str) and name for name in usernames)
+        ):
+            return None, True
+        return list(dict.fromkeys(usernames)), True
+
+    def invalid_usernames(self):
+        return Response(
+            {
+                "error": f"usernames must be a list of at most "
+                f"{MAX_SHARE_USERNAMES} usernames"
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(detail=True, methods=["post"])
     def share_with(self, request, pk=None):
-        grocery_list = self.get_object()
-        username = request.data.get("username")
+        """Share with ``username``, or with every user in ``usernames``."""
+        list_id, owner_id = self.get_list_access()
+        usernames, many = self.get_usernames(request)
 
-        if not username:
+        if usernames is None:
+            return self.invalid_usernames()
+        if not usernames:
             return Response(
                 {"error": "Username is required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
         # Prevent sharing with self
-        if username == request.user.username:
+        if request.user.username in usernames:
             return Response(
                 {"error": "Cannot share list with yourself"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            user = User.objects.get(username=username)
-
-            # Check if already shared
-            if grocery_list.shared_with.filter(id=user.id).exists():
-                return Response(
-                    {"error": f"List is already shared with {username}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        result = sharing.share(list_id, owner_id, usernames)
+        collaborators.record_shares(owner_id, [user["id"] for user in result.changed])
 
-            grocery_list.shared_with.add(user)
+        if many:
             return Response(
                 {
-                    "message": f"List shared with {username}",
-                    "shared_user": {
-                        "id": user.id,
-                        "username": user.username,
-                        "first_name": user.first_name,
-                        "last_name": user.last_name,
-                    },
+                    "message": f"List shared with {len(result.changed)} user(s)",
+                    "shared": result.changed,
+                    "already_shared": result.unchanged,
+                    "not_found": result.missing,
                 }
             )
-        except User.DoesNotExist:
+
+        username = usernames[0]
+        if result.missing:
             return Response(
                 {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        if result.unchanged:
+            return Response(
+                {"error": f"List is already shared with {username}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        user = result.changed[0]
+        return Response(
+            {
+                "message": f"List shared with {username}",
+                "shared_user": {
+                    "id": user["id"],
+                    "username": user["username"],
+                    "first_name": user["first_name"],
+                    "last_name": user["last_name"],
+                },
+            }
+        )
 
     @action(detail=True, methods=["post"])
     def remove_user(self, request, pk=None):
-        grocery_list = self.get_object()
-        username = request.data.get("username")
+        """Stop sharing with ``username``, or with every user in ``usernames``."""
+        list_id, owner_id = self.get_list_access()
+        usernames, many = self.get_usernames(request)
 
-        if not username:
+        if usernames is None:
+            return self.invalid_usernames()
+        if not usernames:
             return Response(
                 {"error": "Username is required"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            user = User.objects.get(username=username)
+        result = sharing.unshare(list_id, usernames)
+        collaborators.record_unshares(owner_id, [user["id"] for user in result.changed])
 
-            # Check if user is actually shared with this list
-            if not grocery_list.shared_with.filter(id=user.id).exists():
-                return Response(
-                    {"error": f"List is not shared with {username}"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        if many:
+            return Response(
+                {
+                    "message": f"Removed {len(result.changed)} user(s) "
+                    f"from shared list",
+                    "removed": [user["username"] for user in result.changed],
+                    "not_shared": result.unchanged,
+                    "not_found": result.missing,
+                }
+            )
 
-            grocery_list.shared_with.remove(user)
-            return Response({"message": f"Removed {username} from shared list"})
-        except User.DoesNotExist:
+        username = usernames[0]
+        if result.missing:
             return Response(
                 {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        if result.unchanged:
+            return Response(
+                {"error": f"List is not shared with {username}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"message": f"Removed {username} from shared list"})
 
 
-class GroceryListItemViewSet(viewsets.ModelViewSet):
+class GroceryListItemViewSet(ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = GroceryListItemSerializer
+    values_serializer_class = GroceryListItemValuesSerializer
     permission_classes = [IsAuthenticated]
 
+    def consolidate(self):
+        return self.action == "list" and self.request.query_params.get(
+            "consolidate"
+        ) in ("1", "true")
+
+    def get_values_serializer_class(self):
+        if self.consolidate():
+            return ConsolidatedItemValuesSerializer
+        return super().get_values_serializer_class()
+
     def get_queryset(self):
         user = self.request.user
-        queryset = (
-            GroceryListItem.objects.filter(
-                models.Q(grocery_list__owner=user)
-                | models.Q(grocery_list__shared_with=user)
+        if self.consolidate():
+            # The shared_with join would repeat rows and inflate the sums, so
+            # restrict by list with a subquery rather than join + DISTINCT
+            lists = GroceryList.objects.filter(
+                models.Q(owner=user) | models.Q(shared_with=user)
+            )
+            queryset = GroceryListItem.objects.filter(
+                grocery_list__in=lists.values("pk")
+            )
+        else:
+            queryset = (
+                GroceryListItem.objects.filter(
+                    models.Q(grocery_list__owner=user)
+                    | models.Q(grocery_list__shared_with=user)
+                )
+                .distinct()
+                .select_related(
+                    "item__category", "grocery_list", "added_by", "checked_by"
+                )
             )
-            .distinct()
-            .select_related("item", "grocery_list", "added_by", "checked_by")
-        )
 
         # Filter by grocery_list query parameter if provided
         grocery_list_id = self.request.query_params.get("grocery_list")
-        print(f"DEBUG: grocery_list query param = {grocery_list_id}")  # Debug line
         if grocery_list_id:
-            print(f"DEBUG: Filtering by grocery_list = {grocery_list_id}")  # Debug line
+            logger.debug("Filtering list items by grocery_list=%s", grocery_list_id)
             queryset = queryset.filter(grocery_list=grocery_list_id)
 
         return queryset
 
+    def perform_destroy(self, instance):
+        deletion.delete_item(instance)
+
     @action(detail=True, methods=["post"])
     def toggle_checked(self, request, pk=None):
-        item = self.get_object()
-        item.is_checked = not item.is_checked
-        if item.is_checked:
-            item.checked_by = request.user
-            item.checked_at = timezone.now()
-        else:
-            item.checked_by = None
-            item.checked_at = None
-        item.save()
+        """Flip the checked state; responds with the changed fields only"""
+        try:
+            item_id = int(pk)
+        except (TypeError, ValueError):
+            raise Http404
+        changes = checking.toggle_checked(item_id, request.user)
+        if changes is None:
+            raise Http404
+
+        timestamp = serializers.DateTimeField()
+        for name in ("checked_at", "updated_at"):
+            if changes[name] is not None:
+                changes[name] = timestamp.to_representation(changes[name])
+        return Response(changes)
+
+
+class TombstoneViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    Lists and list items deleted since ``?since=<ISO 8601 timestamp>``, for
+    clients to drop from their local copies; oldest first
+    """
+
+    serializer_class = TombstoneSerializer
+    permission_classes = [IsAuthenticated]
 
-        serializer = self.get_serializer(item)
-        return Response(serializer.data)
+    def get_queryset(self):
+        queryset = Tombstone.objects.filter(user=self.request.user)
+        since = self.request.query_params.get("since")
+        if since:
+            try:
+                since = parse_datetime(since)
+            except ValueError:
+                since = None
+            if since is None:
+                raise ValidationError({"since": "Expected an ISO 8601 timestamp"})
+            queryset = queryset.filter(deleted_at__gt=since)
+        return queryset.order_by("deleted_at", "id")
+
+
+class TaskViewSet(
+    mixins.CreateModelMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """Queue background tasks for ``run_worker`` and follow their progress"""
+
+    queryset = Task.objects.all()
+    serializer_class = TaskSerializer
+    permission_classes = [IsAdminUser]
+    filterset_fields = ["name", "status"]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data["name"]
+        if name not in tasks.REGISTRY:
+            raise ValidationError(
+                {"name": f"Must be one of {', '.join(sorted(tasks.REGISTRY))}"}
+            )
+        try:
+            task = tasks.enqueue(
+                name,
+                kwargs=serializer.validated_data.get("kwargs", {}),
+                key=serializer.validated_data.get("idempotency_key"),
+            )
+        except ValueError as error:
+            raise ValidationError({"kwargs": str(error)})
+        return Response(self.get_serializer(task).data, status=status.HTTP_202_ACCEPTED)
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # Exclude the current user from search results
         queryset = User.objects.exclude(id=self.request.user.id).filter(is_active=True)
-
-        # Support search parameter
-        search = self.request.query_params.get("search")
-        if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search)
-                | Q(first_name__icontains=search)
-                | Q(last_name__icontains=search)
-            )
-
         return queryset.order_by("username")
 
     def list(self, request, *args, **kwargs):
-        """Override list to limit results to 10."""
-        queryset = self.filter_queryset(self.get_queryset())[:10]
-        serializer = self.get_serializer(queryset, many=True)
+        """Override list to limit results to 10, best search matches first."""
+        queryset = self.filter_queryset(self.get_queryset())
+        search = request.query_params.get("search")
+        if search:
+            users = user_search.search(queryset, search, limit=10)
+        else:
+            users = queryset[:10]
+        serializer = self.get_serializer(users, many=True)
         return Response({"results": serializer.data})
+
+    @action(detail=False, methods=["get"])
+    def suggested(self, request):
+        """Frequent collaborators, most shared lists first, before any search."""
+        return Response({"results": collaborators.suggestions(request.user.id)})
@@ -0,0 +1,30 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+
+Prometheus metrics run in multiprocess mode: each worker writes its
+samples to ``PROMETHEUS_MULTIPROC_DIR`` and ``/metrics`` aggregates the
+files, so a scrape sees every worker however requests were balanced.
+"""
+
+import os
+import shutil
+import tempfile
+
+# Must be set before any worker imports prometheus_client
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "grocery-prometheus"),
+)
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be aggregated as well
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from grocery_list.metrics import worker_exited
+
+    worker_exited(worker.pid)
@@ -160,8 +160,11 @@ export class GroceryListDetailComponent implements OnInit {
 
   onToggleItemChecked(item: GroceryListItem) {
     this.groceryService.toggleItemChecked(item.id).subscribe({
-      next: (updatedItem) => {
-        this.items.update((items) => items.map((i) => (i.id === item.id ? updatedItem : i)));
+      next: (changes) => {
+        // The response only carries the checked state fields
+        this.items.update((items) =>
+          items.map((i) => (i.id === item.id ? { ...i, ...changes } : i))
+        );
       },
       error: (err) => {
         this.handleError('Failed to update item', err);
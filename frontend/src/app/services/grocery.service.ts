@@ -133,8 +133,8 @@ export class GroceryService {
     return this.http.delete<void>(`${this.apiUrl}/grocery-list-items/${id}/`);
   }
 
-  toggleItemChecked(id: number): Observable<GroceryListItem> {
-    return this.http.post<GroceryListItem>(
+  toggleItemChecked(id: number): Observable<Partial<GroceryListItem>> {
+    return this.http.post<Partial<GroceryListItem>>(
       `${this.apiUrl}/grocery-list-items/${id}/toggle_checked/`,
       {}
     );